@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,8 +50,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'scheduler_app.middleware.ReplicaMiddleware',
+    'scheduler_app.middleware.QueryBudgetMiddleware',
 ]
 
+# Raise instead of logging a warning when a view issues more queries than its
+# declared @query_budget. The test runner turns it on for every test.
+QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'scheduler_app.runner.StrictBudgetRunner'
+
 ROOT_URLCONF = 'scheduler.urls'
 
 TEMPLATES = [
@@ -70,17 +79,117 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'scheduler.wsgi.application'
 
+# Serve the read-heavy pages from scheduler_app/async_views.py. asgi.py turns this on by default; under WSGI each
+# async view would need an event loop of its own, so the sync views stay.
+ASYNC_VIEWS = os.environ.get('SCHEDULER_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections stay open for SCHEDULER_CONN_MAX_AGE seconds between requests, so each request doesn't
+# reconnect and rerun SQLITE_PRAGMAS; 0 closes them after every request.
+# IMMEDIATE transactions take the write lock when atomic() begins. A deferred one that reads first has to
+# upgrade its lock to write, and SQLite fails that upgrade with "database is locked" without waiting out
+# busy_timeout whenever another writer got there first.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('SCHEDULER_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# SCHEDULER_REPLICA names a SQLite copy of the database, refreshed by sync_replica. GET and HEAD requests read
+# from it, except for REPLICA_PIN_SECONDS after their session writes, so users always see their own changes.
+if (replica := os.environ.get('SCHEDULER_REPLICA')):
+    DATABASES['replica'] = {**DATABASES['default'], 'NAME': replica, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['scheduler_app.database.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('SCHEDULER_REPLICA_PIN_SECONDS', 30))
+
+# Applied in order to every new SQLite connection (scheduler_app/database.py). busy_timeout comes first so
+# switching to WAL waits out a lock; WAL lets readers keep going while a write commits, and synchronous=normal
+# is durable under WAL except across a power loss. Negative cache_size is in KiB.
+# https://www.sqlite.org/pragma.html
+SQLITE_PRAGMAS = {
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024)),
+}
+
+
+# Caches
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+# SCHEDULER_CACHE picks the backend: locmem keeps entries per process, file shares them
+# between every worker on the host through SCHEDULER_CACHE_LOCATION.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+SCHEDULER_CACHE = os.environ.get('SCHEDULER_CACHE', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[SCHEDULER_CACHE],
+        'LOCATION': os.environ.get('SCHEDULER_CACHE_LOCATION',
+                                   os.path.join(tempfile.gettempdir(), 'scheduler-cache') if SCHEDULER_CACHE == 'file' else 'scheduler'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('SCHEDULER_CACHE_MAX_ENTRIES', 10000)),
+            'CULL_FREQUENCY': int(os.environ.get('SCHEDULER_CACHE_CULL_FREQUENCY', 3)),
+        },
+    }
+}
+
+# Seconds each app cache namespace keeps entries (None keeps them until culled).
+# Tune against the hit rates at /cache/stats/.
+APP_CACHE_TIMEOUTS = {
+    'requester': 5 * 60,
+    'plan': 10 * 60,
+}
+
+
+# Every request checks the logged-in account's role. A role change must reach every worker at once, so the
+# role and name are only cached with the shared file cache; with locmem they are read from the database.
+CACHE_REQUESTERS = SCHEDULER_CACHE == 'file'
+
+
+# Sessions
+# https://docs.djangoproject.com/en/3.2/topics/http/sessions/
+
+# cached_db answers most requests from the cache, only reading django_session on a miss. A logout must reach
+# every worker, so it is only the default with the shared file cache; locmem keeps a copy per process.
+# Run purge_sessions periodically to delete expired rows.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SCHEDULER_SESSIONS', 'cached_db' if SCHEDULER_CACHE == 'file' else 'db')]
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+
+PASSWORD_HASHERS = [
+    'scheduler_app.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# PBKDF2 cost; accounts hashed at any other cost are rehashed on their next login.
+# Size login workers with `manage.py bench_login`.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600000))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
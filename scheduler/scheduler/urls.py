@@ -18,28 +18,42 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
 
-from scheduler_app import views # type: ignore
+from scheduler_app import api, async_views, views # type: ignore
+
+# ASGI deployments serve the read-heavy pages and the schedule export from async views, so a slow query doesn't
+# hold a worker thread
+pages = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.HomepageView.as_view()),
+    path('', pages.HomepageView.as_view()),
     path('admin/', admin.site.urls),
+    path('api/v1/', include(api)),
     path('login/', views.LoginView.as_view()),
     path('logout/', views.LogoutView.as_view()),
-    path('users/', views.ListUsersView.as_view()),
+    path('cache/stats/', views.CacheStatsView.as_view()),
+    path('search/', views.SearchView.as_view()),
+    path('users/', pages.ListUsersView.as_view()),
     path('users/create/', views.CreateUserView.as_view()),
+    path('users/import/', views.ImportUsersView.as_view()),
     path('users/<int:account>/', views.ViewUserView.as_view()),
     path('users/<int:account>/delete/', views.DeleteUserView.as_view()),
-    path('courses/', views.ListCoursesView.as_view()),
+    path('courses/', pages.ListCoursesView.as_view()),
     path('courses/create/', views.CreateCourseView.as_view()),
-    path('courses/<int:course>/', views.ViewCourseView.as_view()),
+    path('courses/import/', views.ImportRosterView.as_view()),
+    path('courses/export/', pages.ExportScheduleView.as_view()),
+    path('courses/autoassign/', views.AutoAssignView.as_view()),
+    path('courses/<int:course>/', pages.ViewCourseView.as_view()),
     path('courses/<int:course>/assign/', views.AssignToCourseView.as_view()),
+    path('courses/<int:course>/assign/candidates/', views.AssignCandidatesView.as_view()),
     path('courses/<int:course>/unassign/<int:account>/', views.UnassignFromCourseView.as_view()),
     path('courses/<int:course>/membership/<int:account>/', views.EditMembershipView.as_view()),
     path('courses/<int:course>/edit/', views.EditCourseView.as_view()),
+    path('courses/<int:course>/autoassign/', views.AutoAssignView.as_view()),
     path('courses/<int:course>/delete/', views.DeleteCourseView.as_view()),
     path('courses/<int:course>/sections/<int:section>/assign/', views.AssignToSectionView.as_view()),
     path('courses/<int:course>/sections/<int:section>/unassign/', views.UnassignFromSectionView.as_view()),
     path('courses/<int:course>/sections/<int:section>/delete/', views.DeleteSectionView.as_view()),
+    path('courses/<int:course>/sections/<int:section>/meetings/', views.SectionMeetingsView.as_view()),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,124 @@
+from django.db.models import QuerySet
+from django.http.response import Http404, JsonResponse
+from django.urls import path
+from django.views import View
+
+from .classes import courses, resources
+from .classes.permissions import Requester, check_permissions
+from .classes.resources import Resource
+from .middleware import query_budget
+from .models import Account, CourseMembership, Section
+
+def get_filters(request, names: tuple[str, ...]) -> dict[str, int]:
+    try:
+        return {name: int(value) for name in names if (value := request.GET.get(name, ""))}
+    except ValueError:
+        raise ValueError(f"Please filter {', '.join(names)} by id!")
+
+def list_response(request, requester: Requester, resource: Resource, queryset: QuerySet, filters: tuple[str, ...] = ()) -> JsonResponse:
+    try:
+        fields, expand = resource.select(requester, request.GET.get("fields", ""), request.GET.get("expand", ""))
+        queryset = resource.queryset(queryset.filter(**get_filters(request, filters)), fields, expand)
+        rows, cursor = resources.paginate(queryset, request.GET.get("cursor", ""), resources.parse_limit(request.GET.get("limit", "")))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"results": [resource.serialize(requester, row, fields, expand) for row in rows], "next": cursor})
+
+def detail_response(request, requester: Requester, resource: Resource, queryset: QuerySet, pk: int, own: bool = False) -> JsonResponse:
+    try:
+        fields, expand = resource.select(requester, request.GET.get("fields", ""), request.GET.get("expand", ""), own)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        row = resource.queryset(queryset, fields, expand).get(pk=pk)
+    except resource.model.DoesNotExist:
+        raise Http404(f"{resource.model._meta.verbose_name.capitalize()} does not exist")
+
+    return JsonResponse(resource.serialize(requester, row, fields, expand))
+
+
+class IndexView(View):
+    @query_budget(0)
+    def get(self, request):
+        """Describe every endpoint, including the most queries it may issue whatever the page size or expansions."""
+
+        return JsonResponse({"endpoints": [{
+            "path": f"/api/v1/{pattern.pattern}",
+            "query_budget": view.get.query_budget,
+            "fields": list(view.resource.fields),
+            "supervisor_fields": list(view.resource.private),
+            "expand": list(view.resource.expansions),
+            "filters": list(view.filters),
+        } for pattern in urlpatterns if (view := pattern.callback.view_class) is not IndexView]})
+
+
+class CourseListView(View):
+    resource, filters = resources.COURSE, ()
+
+    @query_budget(5)
+    @check_permissions(check_supervisor=False, redirect_to_login=False)
+    def get(self, request, requester: Requester):
+        return list_response(request, requester, self.resource, courses.visible(requester))
+
+
+class CourseDetailView(View):
+    resource, filters = resources.COURSE, ()
+
+    @query_budget(5)
+    @check_permissions(check_supervisor=False, redirect_to_login=False)
+    def get(self, request, requester: Requester, course=0):
+        # Courses a user can't access are reported as missing rather than forbidden, saving a membership query
+        return detail_response(request, requester, self.resource, courses.visible(requester), course)
+
+
+class SectionListView(View):
+    resource, filters = resources.SECTION, ("course", "ta")
+
+    @query_budget(4)
+    @check_permissions(check_supervisor=False, redirect_to_login=False)
+    def get(self, request, requester: Requester):
+        visible = Section.objects.all() if requester.role == Account.Role.SUPERVISOR \
+                    else Section.objects.filter(course__in=courses.visible(requester))
+        return list_response(request, requester, self.resource, visible, self.filters)
+
+
+class MembershipListView(View):
+    resource, filters = resources.MEMBERSHIP, ("course", "account")
+
+    @query_budget(3)
+    @check_permissions(check_supervisor=False, redirect_to_login=False)
+    def get(self, request, requester: Requester):
+        visible = CourseMembership.objects.all() if requester.role == Account.Role.SUPERVISOR \
+                    else CourseMembership.objects.filter(course__in=courses.visible(requester))
+        return list_response(request, requester, self.resource, visible, self.filters)
+
+
+class AccountListView(View):
+    resource, filters = resources.ACCOUNT, ("role",)
+
+    @query_budget(3)
+    @check_permissions(check_supervisor=False, redirect_to_login=False)
+    def get(self, request, requester: Requester):
+        return list_response(request, requester, self.resource, Account.objects.all(), self.filters)
+
+
+class AccountDetailView(View):
+    resource, filters = resources.ACCOUNT, ()
+
+    @query_budget(3)
+    @check_permissions(check_supervisor=False, redirect_to_login=False)
+    def get(self, request, requester: Requester, account=0):
+        return detail_response(request, requester, self.resource, Account.objects.all(), account, own=account == requester.pk)
+
+
+urlpatterns = [
+    path('', IndexView.as_view()),
+    path('courses/', CourseListView.as_view()),
+    path('courses/<int:course>/', CourseDetailView.as_view()),
+    path('sections/', SectionListView.as_view()),
+    path('memberships/', MembershipListView.as_view()),
+    path('accounts/', AccountListView.as_view()),
+    path('accounts/<int:account>/', AccountDetailView.as_view()),
+]
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class SchedulerAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scheduler_app'
+
+    def ready(self):
+        # Connects the requester cache invalidation, version stamp and SQLite connection signals
+        from . import database  # noqa: F401
+        from .classes import permissions, versions  # noqa: F401
@@ -0,0 +1,154 @@
+from itertools import islice
+from typing import AsyncIterator, Union
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.paginator import Page, Paginator
+from django.db.models import QuerySet
+from django.http.response import Http404, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import render
+from django.utils.safestring import SafeString, mark_safe
+from django.views import View
+
+from . import views
+from .classes import courses, exports, sections, users, versions
+from .classes.permissions import Requester, check_permissions
+from .middleware import query_budget
+from .models import Account, Course, CourseMembership
+
+# Async versions of the read-heavy pages, routed in place of the views module's when ASYNC_VIEWS is on.
+# Templates can't query from async code, so each page loads everything it renders up front. Course fragments
+# that are already cached are fetched first and handed to the template, so cached pages still skip their queries.
+
+async def alist(queryset: QuerySet) -> list:
+    return [row async for row in queryset]
+
+async def apage(queryset: QuerySet, number: str, per_page: int) -> Page:
+    paginator = Paginator(queryset, per_page)
+    paginator.count = await queryset.acount()
+    page = paginator.get_page(number)
+    page.object_list = await alist(page.object_list)
+    return page
+
+async def aiterate(queryset: QuerySet, chunk_size: int) -> AsyncIterator:
+    # Django 5.2's aiterator() runs values_list() queries on the event loop, so chunks are fetched in a thread
+    # instead. Thread-sensitive calls share one thread, so every chunk comes from the same cursor.
+    rows = await sync_to_async(lambda: iter(queryset.iterator(chunk_size=chunk_size)))()
+    while (chunk := await sync_to_async(lambda: list(islice(rows, chunk_size)))()):
+        for row in chunk:
+            yield row
+
+async def acached(fragments: list[tuple[str, list]]) -> list[Union[SafeString, None]]:
+    # The template renders these rather than looking them up again, since one could be evicted in between and its
+    # {% cache %} block would then render the empty data loaded in its place
+    keys = [make_template_fragment_key(name, vary_on) for name, vary_on in fragments]
+    found = await cache.aget_many(keys)
+    return [None if (fragment := found.get(key)) is None else mark_safe(fragment) for key in keys]
+
+
+class HomepageView(View):
+    @query_budget(5)
+    @check_permissions(check_supervisor=False)
+    async def get(self, request, requester: Requester):
+        supervisor = requester.role == Account.Role.SUPERVISOR
+        course_list = [] if supervisor else await courses.adashboard(requester)
+
+        fragments = await acached([("homepage_course", [course.pk, course.version]) for course in course_list])
+        for course, fragment in zip(course_list, fragments):
+            course.fragment = fragment
+        if (uncached := [course for course in course_list if course.fragment is None]):
+            sections = await courses.aload_sections(uncached)
+            for course in uncached:
+                course.section_list = sections[course.pk]
+
+        return render(request, "homepage.html", {
+            "user": await Account.objects.aget(pk=requester.pk),
+            "supervisor": supervisor,
+            "courses": course_list,
+            "fragment_timeout": views.FRAGMENT_TIMEOUT,
+        })
+
+
+class ListUsersView(View):
+    @query_budget(6)
+    @check_permissions(check_supervisor=False)
+    @versions.conditional(lambda: [versions.ACCOUNTS, versions.COURSES])
+    async def get(self, request, requester: Requester):
+        return render(request, "users_list.html", {
+            "users": await apage(users.get(requester), request.GET.get("page"), views.USERS_PER_PAGE),
+            "supervisor": requester.role == Account.Role.SUPERVISOR,
+            "members": await alist(users.members(requester)),
+        })
+
+
+class ListCoursesView(View):
+    @query_budget(6)
+    @check_permissions(check_supervisor=False)
+    @versions.conditional(lambda: [versions.COURSES, versions.ACCOUNTS])
+    async def get(self, request, requester: Requester):
+        return render(request, "courses_list.html", {
+            "courses": [{"pk": course.pk, "name": course.name} for course in await alist(courses.visible(requester))],
+            "supervisor": requester.role == Account.Role.SUPERVISOR,
+            "instructors": await alist(Account.objects.filter(role=Account.Role.INSTRUCTOR).values("pk", "name")),
+            "TAs": await alist(Account.objects.filter(role=Account.Role.TA).values("pk", "name")),
+        })
+
+
+class ViewCourseView(View):
+    @query_budget(9)
+    @check_permissions(check_supervisor=False)
+    @versions.conditional(lambda course=0: [versions.course(course), versions.ACCOUNTS])
+    async def get(self, request, requester: Requester, course=0):
+        try:
+            course = await Course.objects.aget(pk=course)
+        except Course.DoesNotExist:
+            raise Http404("Course does not exist")
+
+        supervisor = requester.role == Account.Role.SUPERVISOR
+        instructor = requester.role == Account.Role.INSTRUCTOR
+
+        if not await courses.ahas_access(requester, course):
+            return HttpResponseForbidden("You do not have access to this course.")
+
+        variant = "supervisor" if supervisor else "instructor" if instructor else "member"
+        version = request.version
+        sections_fragment, members_fragment = await acached([
+            ("course_sections", [course.pk, version, variant]),
+            ("course_members", [course.pk, version, supervisor]),
+        ])
+
+        return render(request, "course.html", {
+            "course": course,
+            "supervisor": supervisor,
+            "instructor": instructor,
+            "variant": variant,
+            "version": version,
+            "fragment_timeout": views.FRAGMENT_TIMEOUT,
+            "sections_fragment": sections_fragment,
+            "members_fragment": members_fragment,
+            "sections": [] if sections_fragment else await alist(course.sections.select_related("ta").prefetch_related("meetings")),
+            "course_instructor": None if members_fragment else await course.members.filter(role=Account.Role.INSTRUCTOR).afirst(),
+            "tas": [] if members_fragment else await alist(
+                CourseMembership.objects.filter(account__role=Account.Role.TA, course=course).select_related("account")),
+        })
+
+    @query_budget(views.ViewCourseView.post.query_budget)
+    async def post(self, request, *args, **kwargs):
+        # A view can't mix sync and async handlers; creating a section stays on the sync path
+        return await sync_to_async(views.ViewCourseView().post)(request, *args, **kwargs)
+
+
+class ExportScheduleView(View):
+    # Streams from an async iterator, so ASGI sends each chunk of rows as it is fetched
+    @query_budget(views.ExportScheduleView.get.query_budget)
+    @check_permissions()
+    async def get(self, request, *args):
+        if (format := request.GET.get("format", "csv")) not in exports.FORMATS:
+            return HttpResponseBadRequest(f"Please choose one of {', '.join(exports.FORMATS)}!")
+
+        rows = aiterate(sections.schedule(), sections.SCHEDULE_CHUNK_SIZE)
+        response = StreamingHttpResponse(exports.alines(sections.SCHEDULE_FIELDS, rows, format),
+                                         content_type=exports.FORMATS[format])
+        response["Content-Disposition"] = f'attachment; filename="schedule.{format}"'
+        return response
@@ -0,0 +1,45 @@
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Union
+
+from django.db import connection
+
+@contextmanager
+def scratch_database(name: Union[str, None] = None):
+    # Benchmarks seed and migrate freely, so they always run against a throwaway test database.
+    # SQLite test databases live in memory unless named; concurrent writers need a real file to wait on its lock.
+    old_name, old_test_name = connection.settings_dict["NAME"], connection.settings_dict["TEST"].get("NAME")
+    if name is not None:
+        connection.settings_dict["TEST"]["NAME"] = name
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        connection.settings_dict["TEST"]["NAME"] = old_test_name
+
+def time_each(func: Callable[[Any], Any], args: Iterable[Any]) -> list[float]:
+    timings = []
+
+    for arg in args:
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+def summarize(values: list[float]) -> dict[str, float]:
+    return {
+        "n": len(values),
+        "mean": statistics.fmean(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
@@ -0,0 +1,123 @@
+import os
+import threading
+from collections import Counter
+from typing import Any, Callable, Iterable, Union
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+COUNTS = ("hits", "misses", "sets", "deletes")
+
+namespaces: dict[str, "Namespace"] = {}
+
+class Namespace:
+    """One kind of cached value, with its own key prefix, timeout and hit/miss counters.
+
+    A tag, such as a versions stamp, becomes part of the key, so bumping what the value was derived from
+    invalidates it without a delete; the stale entry simply ages out.
+    """
+
+    def __init__(self, name: str, timeout: Union[int, None] = 300):
+        self.name = name
+        self.default_timeout = timeout
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        namespaces[name] = self
+
+    @property
+    def timeout(self) -> Union[int, None]:
+        return getattr(settings, "APP_CACHE_TIMEOUTS", {}).get(self.name, self.default_timeout)
+
+    @property
+    def backend(self):
+        return caches["default"]
+
+    def key(self, key: Any, tag: Union[str, None] = None) -> str:
+        return f"{self.name}:{key}" if tag is None else f"{self.name}:{key}@{tag}"
+
+    def count(self, **counts: int):
+        with self.lock:
+            self.counts.update(counts)
+
+    def get(self, key: Any, tag: Union[str, None] = None) -> Any:
+        value = self.backend.get(self.key(key, tag))
+        self.count(**{"misses" if value is None else "hits": 1})
+        return value
+
+    def get_many(self, keys: Iterable[Any], tag: Union[str, None] = None) -> dict[Any, Any]:
+        names = {self.key(key, tag): key for key in keys}
+        found = self.backend.get_many(names)
+        self.count(hits=len(found), misses=len(names) - len(found))
+        return {names[name]: value for name, value in found.items()}
+
+    def set(self, key: Any, value: Any, tag: Union[str, None] = None, timeout=DEFAULT_TIMEOUT):
+        self.backend.set(self.key(key, tag), value, self.timeout if timeout is DEFAULT_TIMEOUT else timeout)
+        self.count(sets=1)
+
+    def set_many(self, values: dict[Any, Any], tag: Union[str, None] = None, timeout=DEFAULT_TIMEOUT):
+        self.backend.set_many({self.key(key, tag): value for key, value in values.items()},
+                              self.timeout if timeout is DEFAULT_TIMEOUT else timeout)
+        self.count(sets=len(values))
+
+    def add(self, key: Any, value: Any, tag: Union[str, None] = None, timeout=DEFAULT_TIMEOUT) -> bool:
+        added = self.backend.add(self.key(key, tag), value, self.timeout if timeout is DEFAULT_TIMEOUT else timeout)
+        self.count(sets=int(added))
+        return added
+
+    def delete(self, key: Any, tag: Union[str, None] = None):
+        self.backend.delete(self.key(key, tag))
+        self.count(deletes=1)
+
+    async def aget(self, key: Any, tag: Union[str, None] = None) -> Any:
+        value = await self.backend.aget(self.key(key, tag))
+        self.count(**{"misses" if value is None else "hits": 1})
+        return value
+
+    async def aget_many(self, keys: Iterable[Any], tag: Union[str, None] = None) -> dict[Any, Any]:
+        names = {self.key(key, tag): key for key in keys}
+        found = await self.backend.aget_many(names)
+        self.count(hits=len(found), misses=len(names) - len(found))
+        return {names[name]: value for name, value in found.items()}
+
+    async def aset(self, key: Any, value: Any, tag: Union[str, None] = None, timeout=DEFAULT_TIMEOUT):
+        await self.backend.aset(self.key(key, tag), value, self.timeout if timeout is DEFAULT_TIMEOUT else timeout)
+        self.count(sets=1)
+
+    async def aadd(self, key: Any, value: Any, tag: Union[str, None] = None, timeout=DEFAULT_TIMEOUT) -> bool:
+        added = await self.backend.aadd(self.key(key, tag), value, self.timeout if timeout is DEFAULT_TIMEOUT else timeout)
+        self.count(sets=int(added))
+        return added
+
+    def get_or_set(self, key: Any, compute: Callable[[], Any], tag: Union[str, None] = None, timeout=DEFAULT_TIMEOUT) -> Any:
+        # None can't be told apart from a miss, so values that may be None are recomputed every time
+        if (value := self.get(key, tag)) is None:
+            value = compute()
+            self.set(key, value, tag, timeout)
+
+        return value
+
+def stats() -> dict[str, Any]:
+    # Counters are per process; with several workers each one reports its own share
+    config = settings.CACHES["default"]
+    result = {
+        "backend": config["BACKEND"].rsplit(".", 1)[-1],
+        "location": config.get("LOCATION", ""),
+        "options": config.get("OPTIONS", {}),
+        "pid": os.getpid(),
+        "namespaces": {},
+    }
+
+    for name, namespace in sorted(namespaces.items()):
+        with namespace.lock:
+            counts = {count: namespace.counts[count] for count in COUNTS}
+        lookups = counts["hits"] + counts["misses"]
+        result["namespaces"][name] = {**counts, "timeout": namespace.timeout,
+                                      "hit_rate": round(counts["hits"] / lookups, 4) if lookups else None}
+
+    return result
+
+def reset_stats():
+    for namespace in namespaces.values():
+        with namespace.lock:
+            namespace.counts.clear()
@@ -1,13 +1,84 @@
-from ..models import Account, Course, CourseMembership
+from typing import Any, Tuple, Union
+
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Count, QuerySet, Value
+from django.db.models.functions import Cast, Concat
+from django.utils.functional import SimpleLazyObject
+
+from ..models import Account, Course, CourseMembership, Section
+from . import search, versions
+
+IMPORT_BATCH_SIZE = 500
 
 def count(name: str) -> int:
     return Course.objects.filter(name=name).count()
 
+def visible(requester: Account) -> QuerySet:
+    if requester.role == Account.Role.SUPERVISOR:
+        return Course.objects.all()
+
+    return Course.objects.filter(members=requester.pk)
+
 def get(requester: Account) -> list[Course]:
+    return list(visible(requester))
+
+def has_access(requester: Account, course: Union[Course, int]) -> bool:
     if requester.role == Account.Role.SUPERVISOR:
-        return list(Course.objects.all())
-    
-    return list(requester.courses.all())
+        return True
+
+    # Memoized on the requester, which lives for a single request
+    course_pk = getattr(course, "pk", course)
+    access = vars(requester).setdefault("course_access", {})
+    if course_pk not in access:
+        access[course_pk] = CourseMembership.objects.filter(account=requester.pk, course=course_pk).exists()
+
+    return access[course_pk]
+
+async def ahas_access(requester: Account, course: Union[Course, int]) -> bool:
+    if requester.role == Account.Role.SUPERVISOR:
+        return True
+
+    course_pk = getattr(course, "pk", course)
+    access = vars(requester).setdefault("course_access", {})
+    if course_pk not in access:
+        access[course_pk] = await CourseMembership.objects.filter(account=requester.pk, course=course_pk).aexists()
+
+    return access[course_pk]
+
+def dashboard(requester: Account) -> list[Course]:
+    # Two queries regardless of course count: courses with their section counts and stamps, then every section and TA.
+    # The second only runs once some course's rows are rendered, so cached homepage rows skip it.
+    course_list = list(versioned(visible(requester)))
+    sections = SimpleLazyObject(lambda: load_sections(course_list))
+
+    for course in course_list:
+        course.section_list = SimpleLazyObject(lambda course=course: sections[course.pk])
+
+    return course_list
+
+def versioned(course_list: QuerySet) -> QuerySet:
+    return course_list.annotate(section_count=Count("sections", distinct=True), version=Concat(
+        Cast(versions.course_annotation(), CharField()), Value("."), Cast(versions.annotation(versions.ACCOUNTS), CharField()),
+    )).order_by("name", "pk")
+
+def load_sections(course_list: list[Course]) -> dict[int, list[Section]]:
+    sections = {course.pk: [] for course in course_list}
+    for section in Section.objects.filter(course__in=[course.pk for course in course_list]).select_related("ta").order_by("num", "pk"):
+        sections[section.course_id].append(section)
+
+    return sections
+
+async def adashboard(requester: Account) -> list[Course]:
+    # Sections are left to the caller, since templates can't run queries from async code: it loads them with
+    # aload_sections for just the courses whose homepage rows aren't cached
+    return [course async for course in versioned(visible(requester))]
+
+async def aload_sections(course_list: list[Course]) -> dict[int, list[Section]]:
+    sections = {course.pk: [] for course in course_list}
+    async for section in Section.objects.filter(course__in=[course.pk for course in course_list]).select_related("ta").order_by("num", "pk"):
+        sections[section.course_id].append(section)
+
+    return sections
 
 def create(name: str) -> list[str]:
     errors = []
@@ -18,12 +89,18 @@ def create(name: str) -> list[str]:
         errors.append("Please enter a name not taken by an existing course!")
     
     if not errors:
-        Course.objects.create(name=name)
+        with transaction.atomic():
+            course = Course.objects.create(name=name)
+            search.index_courses([course])
     
     return errors
 
 def delete(course: Course):
-    course.delete()
+    pk = course.pk
+    with transaction.atomic():
+        search.remove(search.COURSE, pk)
+        course.delete()
+        versions.bump_courses(pk)
 
 def assign(course: Course, user: Account, grader: bool = False, sections: int = 1) -> list[str]:
     errors = []
@@ -41,16 +118,125 @@ def assign(course: Course, user: Account, grader: bool = False, sections: int =
     elif role == Account.Role.INSTRUCTOR \
             and (instructor := course.members.filter(role=Account.Role.INSTRUCTOR).first()):
         errors.append(f"Instructor {instructor.name} has already been assigned to this course!")
-    elif course.members.filter(email=user.get_email()):
-        errors.append(f"User {user.name} has already been assigned to this course!")
     else:
-        CourseMembership.objects.create(account=user, course=course, grader=grader, sections=sections)
-        errors.append(f"Successfully added user {user.name} to course!")
+        try:
+            with transaction.atomic():
+                CourseMembership.objects.create(account=user, course=course, grader=grader, sections=sections)
+        except IntegrityError:
+            errors.append(f"User {user.name} has already been assigned to this course!")
+        else:
+            errors.append(f"Successfully added user {user.name} to course!")
     
     return errors
 
+def parse_member(member: Union[str, dict[str, Any]]) -> Tuple[str, bool, int]:
+    if isinstance(member, str):
+        return member.strip(), False, 1
+    if not isinstance(member, dict):
+        raise ValueError("Please list each member as an email or an object!")
+
+    if not isinstance(grader := member.get("grader", False), bool):
+        raise ValueError("Please enter true or false for grader!")
+    try:
+        sections = int(member.get("sections", 1))
+    except (TypeError, ValueError):
+        raise ValueError("Please enter a number of sections!")
+    if sections < 0:
+        raise ValueError("Please enter a non-negative number of sections!")
+
+    return str(member.get("email", "")).strip(), grader, sections
+
+def listed(entry: dict[str, Any], field: str) -> list[Any]:
+    return value if isinstance(value := entry.get(field, []), list) else []
+
+def import_roster(roster: list[dict[str, Any]], batch_size: int = IMPORT_BATCH_SIZE) -> Tuple[int, list[str]]:
+    errors = []
+    new_courses, new_sections, new_memberships = [], [], []
+
+    # Everything the roster references is resolved up front, so validation needs no further queries
+    names = [str(entry.get("name", "")).strip() for entry in roster]
+    emails = {str(member.get("email", "") if isinstance(member, dict) else member).strip() \
+              for entry in roster for member in listed(entry, "members")}
+    taken = set(Course.objects.filter(name__in=names).values_list("name", flat=True))
+    accounts = {account.email: account for account in Account.objects.filter(email__in=emails).only("pk", "name", "role", "email")}
+
+    for i, (entry, name) in enumerate(zip(roster, names), start=1):
+        prefix = f"Course {i} ({name})" if name else f"Course {i}"
+        course = Course(name=name, description=str(entry.get("description", "")), skills=str(entry.get("skills", "")))
+
+        if not name:
+            errors.append(f"{prefix}: Please enter the course name!")
+        elif name in taken:
+            errors.append(f"{prefix}: Please enter a name not taken by an existing course!")
+        else:
+            taken.add(name)
+
+        nums = set()
+        for field in ("sections", "members"):
+            if not isinstance(entry.get(field, []), list):
+                errors.append(f"{prefix}: Please list the {field} of the course!")
+
+        for num in listed(entry, "sections"):
+            if not (num := str(num).strip()):
+                errors.append(f"{prefix}: Please enter the section number!")
+            elif num in nums:
+                errors.append(f"{prefix}: Section {num} is listed more than once!")
+            else:
+                nums.add(num)
+                new_sections.append(Section(course=course, num=num))
+
+        instructor, members = None, set()
+        for member in listed(entry, "members"):
+            try:
+                email, grader, sections = parse_member(member)
+            except ValueError as e:
+                errors.append(f"{prefix}: {e}")
+                continue
+
+            if (account := accounts.get(email)) is None:
+                errors.append(f"{prefix}: No user has the email {email}!")
+            elif account.role == Account.Role.SUPERVISOR:
+                errors.append(f"{prefix}: User {account.name} is a supervisor!")
+            elif account.pk in members:
+                errors.append(f"{prefix}: User {account.name} has already been assigned to this course!")
+            elif account.role == Account.Role.INSTRUCTOR and instructor is not None:
+                errors.append(f"{prefix}: Instructor {instructor.name} has already been assigned to this course!")
+            else:
+                if account.role == Account.Role.INSTRUCTOR:
+                    instructor = account
+                members.add(account.pk)
+                new_memberships.append(CourseMembership(account=account, course=course, grader=grader, sections=sections))
+
+        new_courses.append(course)
+
+    if errors:
+        return 0, errors
+
+    with transaction.atomic():
+        # Sections and memberships pick up their course's primary key once bulk_create has filled it in
+        Course.objects.bulk_create(new_courses, batch_size=batch_size)
+        search.index_courses(new_courses)
+        Section.objects.bulk_create(new_sections, batch_size=batch_size)
+        CourseMembership.objects.bulk_create(new_memberships, batch_size=batch_size)
+        versions.bump_courses(*(course.pk for course in new_courses))
+
+    return len(new_courses), errors
+
+def candidates(course: Course, prefix: str = "", role: Union[int, None] = None) -> QuerySet:
+    # exclude() across the membership relation compiles to a NOT IN subquery, so the database does the anti-join
+    accounts = Account.objects.exclude(role=Account.Role.SUPERVISOR).exclude(courses=course)
+
+    if prefix:
+        accounts = accounts.filter(name__istartswith=prefix)
+    if role is not None:
+        accounts = accounts.filter(role=role)
+
+    return accounts.order_by("name", "pk").values("pk", "name", "role")
+
 def unassign(course: Course, account: Account):
-    course.members.remove(account)
+    with transaction.atomic():
+        course.members.remove(account)
+        versions.bump_courses(course.pk)
 
 def edit(course: Course, details: dict[str, str]) -> list[str]:
     errors = []
@@ -62,9 +248,12 @@ def edit(course: Course, details: dict[str, str]) -> list[str]:
     else:
         course.name = name
     course.description = details.get("description", "")
+    course.skills = details.get("skills", course.skills)
 
     if not errors:
-        course.save()
+        with transaction.atomic():
+            course.save()
+            search.index_courses([course])
 
     return errors
 
@@ -72,4 +261,5 @@ def edit_membership(course: Course, account: Account, grader: bool = False, sect
     membership = CourseMembership.objects.get(course=course, account=account)
     membership.grader = grader
     membership.sections = sections
-    membership.save()
\ No newline at end of file
+    with transaction.atomic():
+        membership.save()
\ No newline at end of file
@@ -0,0 +1,37 @@
+import csv
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, Tuple
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+class Echo:
+    # csv.writer wants a file; handing back each formatted line lets rows stream one at a time
+    def write(self, value: str) -> str:
+        return value
+
+def formatter(fields: tuple[str, ...], format: str) -> Tuple[list[str], Callable[[tuple[Any, ...]], str]]:
+    # The lines before any row, and how each row is written
+    if format == "csv":
+        writer = csv.writer(Echo())
+        return [writer.writerow(fields)], writer.writerow
+    elif format == "jsonl":
+        return [], lambda row: json.dumps(dict(zip(fields, row))) + "\n"
+    else:
+        raise ValueError(f"Please choose one of {', '.join(FORMATS)}!")
+
+def lines(fields: tuple[str, ...], rows: Iterable[tuple[Any, ...]], format: str) -> Iterator[str]:
+    header, line = formatter(fields, format)
+    yield from header
+    for row in rows:
+        yield line(row)
+
+async def alines(fields: tuple[str, ...], rows: AsyncIterable[tuple[Any, ...]], format: str) -> AsyncIterator[str]:
+    # Under ASGI a sync iterator is read whole with sync_to_async(list) before the first byte is sent
+    header, line = formatter(fields, format)
+    for text in header:
+        yield text
+    async for row in rows:
+        yield line(row)
@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+from pathlib import PurePath
+from typing import Any, BinaryIO, Iterator, TextIO
+
+FORMATS = ("csv", "json", "jsonl")
+
+def detect_format(filename: str) -> str:
+    if (format := PurePath(filename).suffix.lower().lstrip(".")) not in FORMATS:
+        raise ValueError(f"Please upload a {', '.join(FORMATS)} file!")
+
+    return format
+
+def open_upload(file: BinaryIO) -> TextIO:
+    # utf-8-sig drops the byte order mark spreadsheet programs put on exported CSVs
+    return io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+
+def read_rows(stream: TextIO, format: str) -> Iterator[dict[str, str]]:
+    if format == "csv":
+        rows = csv.DictReader(stream)
+    elif format == "jsonl":
+        rows = (json.loads(line) for line in stream if line.strip())
+    elif format == "json":
+        rows = json.load(stream)
+    else:
+        raise ValueError(f"Please upload a {', '.join(FORMATS)} file!")
+
+    try:
+        for row in rows:
+            if not isinstance(row, dict):
+                raise ValueError("Each row must be an object!")
+
+            yield {str(key).strip().lower(): "" if value is None else str(value).strip() for key, value in row.items()}
+    except csv.Error as e:
+        # Raised as ValueError like every other unreadable file, so callers only catch one exception
+        raise ValueError(f"Line {rows.line_num}: {e}") from e
+
+def read_roster(stream: TextIO) -> list[dict[str, Any]]:
+    roster = json.load(stream)
+
+    if not isinstance(roster, list) or not all(isinstance(entry, dict) for entry in roster):
+        raise ValueError("The roster must be a list of course objects!")
+
+    return roster
@@ -1,29 +1,113 @@
 from functools import wraps
 from typing import Tuple, Union
 
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.http import HttpRequest
-from django.http.response import HttpResponseForbidden
+from django.http.response import HttpResponse, HttpResponseForbidden
 from django.shortcuts import redirect
 from django.test import Client
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import cached_property
 
 from ..models import Account
+from .cache import Namespace
 
-def check_permissions(check_supervisor=True):
+REQUESTER_TIMEOUT = 5 * 60
+REQUESTERS = Namespace("requester", REQUESTER_TIMEOUT)
+
+class Requester:
+    """Identity of the logged-in account, cached across requests with a shared cache so views don't reload the full row."""
+
+    def __init__(self, pk: int, role: int, name: str):
+        self.pk = pk
+        self.role = Account.Role(role)
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+    def get_role(self):
+        return self.role
+
+    def get_role_display(self):
+        return self.role.label
+
+    @cached_property
+    def account(self) -> Account:
+        return Account.objects.get(pk=self.pk)
+
+def remember_requester(account: Account):
+    if settings.CACHE_REQUESTERS:
+        REQUESTERS.set(account.pk, (account.role, account.name))
+
+def get_requester(pk: int) -> Union[Requester, None]:
+    if not settings.CACHE_REQUESTERS or (identity := REQUESTERS.get(pk)) is None:
+        try:
+            account = Account.objects.only("pk", "role", "name").get(pk=pk)
+        except Account.DoesNotExist:
+            return None
+
+        remember_requester(account)
+        identity = (account.role, account.name)
+
+    return Requester(pk, *identity)
+
+async def aget_requester(pk: int) -> Union[Requester, None]:
+    if not settings.CACHE_REQUESTERS or (identity := await REQUESTERS.aget(pk)) is None:
+        try:
+            account = await Account.objects.only("pk", "role", "name").aget(pk=pk)
+        except Account.DoesNotExist:
+            return None
+
+        if settings.CACHE_REQUESTERS:
+            await REQUESTERS.aset(account.pk, (account.role, account.name))
+        identity = (account.role, account.name)
+
+    return Requester(pk, *identity)
+
+# Covers users.edit and users.delete as well as any other save or delete of an account
+@receiver([post_save, post_delete], sender=Account)
+def forget_requester(sender, instance: Account, **kwargs):
+    REQUESTERS.delete(instance.pk)
+
+def check_permissions(check_supervisor=True, redirect_to_login=True):
     def wrap_view(func):
+        # API clients can't follow a redirect to a login form, so they get a bare 401 instead
+        def login():
+            return redirect("/login/") if redirect_to_login else HttpResponse("Please log in.", status=401)
+
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def perform_checks_async(self, request, *args, **kwargs):
+                if (pk := await request.session.aget("account")) is None:
+                    return login()
+
+                if (requester := await aget_requester(pk)) is None:
+                    await request.session.apop("account")
+                    return login()
+
+                if check_supervisor and requester.role != Account.Role.SUPERVISOR:
+                    return HttpResponseForbidden("You are not a supervisor.")
+
+                return await func(self, request, requester, *args, **kwargs)
+
+            return perform_checks_async
+
         @wraps(func)
         def perform_checks(self, request, *args, **kwargs):
-            LOGIN = redirect("/login/")
-
             if "account" not in request.session:
-                return LOGIN
+                return login()
             
-            try:
-                requester = Account.objects.get(pk=request.session["account"])
-            except Account.DoesNotExist:
+            if (requester := get_requester(request.session["account"])) is None:
                 del request.session["account"]
-                return LOGIN
+                return login()
             
             if check_supervisor and requester.role != Account.Role.SUPERVISOR:
                 return HttpResponseForbidden("You are not a supervisor.")
@@ -41,7 +125,43 @@ def login(client: Union[Client, HttpRequest], account: Account):
     
     s = client.session
     s["account"] = account.pk
-    s.save()
+    # SessionMiddleware saves a request's session with the response
+    if not isinstance(client, HttpRequest):
+        s.save()
+    remember_requester(account)
+
+def is_hashed(password: str) -> bool:
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+
+    return True
+
+def check_account_password(account: Account, password: str) -> bool:
+    def rehash(password: str):
+        account.password = make_password(password)
+        with transaction.atomic():
+            account.save(update_fields=["password"])
+
+    if is_hashed(account.password):
+        return check_password(password, account.password, setter=rehash)
+
+    # Accounts created before passwords were hashed are upgraded on their first login
+    if constant_time_compare(password, account.password):
+        rehash(password)
+        return True
+
+    return False
+
+def authenticate(email: str, password: str) -> Union[Account, None]:
+    for account in Account.objects.filter(email=email):
+        if check_account_password(account, password):
+            return account
+
+    # Hash anyway so response time doesn't reveal which emails exist
+    make_password(password)
+    return None
 
 def login_with_details(request: Union[Client, HttpRequest], details: dict[str, str]) -> Tuple[list[str], bool]:
     errors = []
@@ -58,10 +178,9 @@ def login_with_details(request: Union[Client, HttpRequest], details: dict[str, s
         errors.append("Please enter your password!")
     
     if not errors:
-        try:
-            a = Account.objects.get(email=email, password=password)
-            login(request, a)
-        except Account.DoesNotExist:
+        if (account := authenticate(email, password)) is not None:
+            login(request, account)
+        else:
             errors.append("Wrong email or password!")
             invalid_login = True
     
@@ -0,0 +1,174 @@
+import base64
+import binascii
+from typing import Any, Callable, Iterable, Tuple, Union
+
+from django.db.models import Model, Prefetch, QuerySet
+
+from ..models import Account, Course, CourseMembership, Section, SectionMeeting
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+class Field:
+    def __init__(self, column: Union[str, None], value: Callable[[Model], Any]):
+        # Column is what .only() loads for the field, or None when the field needs no column of its own
+        self.column = column
+        self.value = value
+
+def column(name: str) -> Field:
+    return Field(name, lambda obj: getattr(obj, name))
+
+def key(name: str) -> Field:
+    # Foreign keys are rendered as the related primary key unless they are expanded
+    return Field(name, lambda obj: getattr(obj, f"{name}_id"))
+
+class Expansion:
+    """A relation that can be embedded in place: foreign keys are joined into the same query, reverse relations cost one prefetch query."""
+
+    def __init__(self, resource: "Resource", prefetch: Union[Prefetch, None] = None, nested: Tuple[str, ...] = ()):
+        self.resource = resource
+        self.prefetch = prefetch
+        self.nested = nested
+
+    def serialize(self, requester: Account, obj: Model, name: str) -> Any:
+        fields = self.resource.visible(requester)
+
+        if self.prefetch is not None:
+            return [self.resource.serialize(requester, item, fields, self.nested) for item in getattr(obj, self.prefetch.to_attr)]
+        if (related := getattr(obj, name)) is None:
+            return None
+
+        return self.resource.serialize(requester, related, fields, self.nested)
+
+class Resource:
+    """How one model appears in the API: its fields, the ones only supervisors see, and the relations that can be expanded."""
+
+    def __init__(self, model: type[Model], fields: dict[str, Field], private: Tuple[str, ...] = ()):
+        self.model = model
+        self.fields = fields
+        self.private = private
+        self.expansions = {}
+
+    def visible(self, requester: Account, own: bool = False) -> list[str]:
+        if own or requester.role == Account.Role.SUPERVISOR:
+            return list(self.fields)
+
+        return [name for name in self.fields if name not in self.private]
+
+    def select(self, requester: Account, fields: str = "", expand: str = "", own: bool = False) -> Tuple[list[str], list[str]]:
+        visible = self.visible(requester, own)
+        fields = split(fields) or visible
+        expand = split(expand)
+
+        if (unknown := [name for name in fields if name not in visible]):
+            raise ValueError(f"Unknown field {unknown[0]}!")
+        if (unknown := [name for name in expand if name not in self.expansions]):
+            raise ValueError(f"Unknown expansion {unknown[0]}!")
+
+        return fields, expand
+
+    def queryset(self, queryset: QuerySet, fields: list[str], expand: list[str]) -> QuerySet:
+        joins = [name for name in expand if self.expansions[name].prefetch is None]
+        prefetches = [self.expansions[name].prefetch for name in expand if self.expansions[name].prefetch is not None]
+        # Joined relations must stay loaded, since only() cannot defer a field select_related follows
+        columns = {"pk", *joins, *(self.fields[name].column for name in fields if self.fields[name].column)}
+
+        return queryset.only(*columns).select_related(*joins).prefetch_related(*prefetches)
+
+    def serialize(self, requester: Account, obj: Model, fields: Iterable[str], expand: Iterable[str] = ()) -> dict[str, Any]:
+        data = {name: self.fields[name].value(obj) for name in fields}
+        for name in expand:
+            data[name] = self.expansions[name].serialize(requester, obj, name)
+
+        return data
+
+def split(value: str) -> list[str]:
+    return [item for item in (item.strip() for item in value.split(",")) if item]
+
+def parse_limit(value: str) -> int:
+    try:
+        limit = int(value) if value else DEFAULT_LIMIT
+    except ValueError:
+        raise ValueError("Please enter a valid limit!")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"Please enter a limit from 1 to {MAX_LIMIT}!")
+
+    return limit
+
+def encode_cursor(pk: int) -> str:
+    return base64.urlsafe_b64encode(str(pk).encode()).decode()
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Please enter a valid cursor!")
+
+def paginate(queryset: QuerySet, cursor: str = "", limit: int = DEFAULT_LIMIT) -> Tuple[list[Model], Union[str, None]]:
+    # Keyset pagination: the cursor is the last primary key served, so deep pages cost the same as the first
+    if cursor:
+        queryset = queryset.filter(pk__gt=decode_cursor(cursor))
+
+    # Fetch one extra row to know whether another page exists without a COUNT query
+    rows = list(queryset.order_by("pk")[:limit + 1])
+
+    return rows[:limit], encode_cursor(rows[limit - 1].pk) if len(rows) > limit else None
+
+ACCOUNT = Resource(Account, {
+    "id": column("pk"),
+    "name": column("name"),
+    "role": Field("role", lambda account: Account.Role(account.role).label),
+    "email": column("email"),
+    "office_hours": column("office_hours"),
+    "skills": column("skills"),
+    "phone": column("phone"),
+    "address": column("address"),
+}, private=("skills", "phone", "address"))
+
+COURSE = Resource(Course, {
+    "id": column("pk"),
+    "name": column("name"),
+    "description": column("description"),
+    "skills": column("skills"),
+})
+
+SECTION = Resource(Section, {
+    "id": column("pk"),
+    "course": key("course"),
+    "num": column("num"),
+    "ta": key("ta"),
+})
+
+MEMBERSHIP = Resource(CourseMembership, {
+    "id": column("pk"),
+    "course": key("course"),
+    "account": key("account"),
+    "grader": column("grader"),
+    "sections": column("sections"),
+})
+
+MEETING = Resource(SectionMeeting, {
+    "weekday": Field("weekday", lambda meeting: SectionMeeting.Weekday(meeting.weekday).label),
+    "start": Field("start", lambda meeting: f"{meeting.start:%H:%M}"),
+    "end": Field("end", lambda meeting: f"{meeting.end:%H:%M}"),
+})
+
+COURSE.expansions = {
+    "sections": Expansion(SECTION, Prefetch("sections", queryset=Section.objects.order_by("num", "pk"), to_attr="api_sections")),
+    "memberships": Expansion(MEMBERSHIP, Prefetch(
+        "coursemembership_set",
+        queryset=CourseMembership.objects.select_related("account").order_by("pk"),
+        to_attr="api_memberships",
+    ), nested=("account",)),
+}
+
+SECTION.expansions = {
+    "course": Expansion(COURSE),
+    "ta": Expansion(ACCOUNT),
+    "meetings": Expansion(MEETING, Prefetch("meetings", queryset=SectionMeeting.objects.order_by("weekday", "start"), to_attr="api_meetings")),
+}
+
+MEMBERSHIP.expansions = {
+    "course": Expansion(COURSE),
+    "account": Expansion(ACCOUNT),
+}
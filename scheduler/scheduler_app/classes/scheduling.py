@@ -0,0 +1,290 @@
+import re
+from collections import defaultdict, deque
+from typing import Callable, Tuple, Union
+
+from django.db import transaction
+
+from ..models import Account, Course, CourseMembership, Section
+from . import versions
+from .cache import Namespace
+from .sections import ConflictIndex, Meeting, meetings_of, schedule_index, tas_with_capacity
+
+PLANS = Namespace("plan", 10 * 60)
+
+class FlowNetwork:
+    """Dinic's maximum flow over integer capacities, with each edge stored next to its reverse."""
+
+    def __init__(self, size: int = 0):
+        self.adjacent = [[] for _ in range(size)]
+        self.to = []
+        self.capacity = []
+
+    def add_node(self) -> int:
+        self.adjacent.append([])
+        return len(self.adjacent) - 1
+
+    def add_edge(self, start: int, end: int, capacity: int) -> int:
+        # Edge e and its reverse e ^ 1 are adjacent, so pushing flow only needs the edge index
+        self.adjacent[start].append(len(self.to))
+        self.to.append(end)
+        self.capacity.append(capacity)
+        self.adjacent[end].append(len(self.to))
+        self.to.append(start)
+        self.capacity.append(0)
+        return len(self.to) - 2
+
+    def levels(self, source: int, sink: int) -> Union[list[int], None]:
+        level = [-1] * len(self.adjacent)
+        level[source] = 0
+        queue = deque([source])
+
+        while queue:
+            node = queue.popleft()
+            for edge in self.adjacent[node]:
+                if self.capacity[edge] and level[self.to[edge]] < 0:
+                    level[self.to[edge]] = level[node] + 1
+                    queue.append(self.to[edge])
+
+        return level if level[sink] >= 0 else None
+
+    def augment(self, source: int, sink: int, level: list[int], progress: list[int]) -> int:
+        # Iterative depth-first search, since augmenting paths can be longer than the recursion limit
+        path, node = [], source
+
+        while node != sink:
+            adjacent = self.adjacent[node]
+            while progress[node] < len(adjacent):
+                edge = adjacent[progress[node]]
+                if self.capacity[edge] and level[self.to[edge]] == level[node] + 1:
+                    path.append(edge)
+                    node = self.to[edge]
+                    break
+                progress[node] += 1
+            else:
+                if node == source:
+                    return 0
+                node = self.to[path.pop() ^ 1]
+                progress[node] += 1
+
+        pushed = min(self.capacity[edge] for edge in path)
+        for edge in path:
+            self.capacity[edge] -= pushed
+            self.capacity[edge ^ 1] += pushed
+
+        return pushed
+
+    def max_flow(self, source: int, sink: int) -> int:
+        flow = 0
+
+        while (level := self.levels(source, sink)) is not None:
+            progress = [0] * len(self.adjacent)
+            while (pushed := self.augment(source, sink, level, progress)):
+                flow += pushed
+
+        return flow
+
+class CostFlowNetwork(FlowNetwork):
+    """Flow network whose edges also carry a cost, solved by successive shortest paths."""
+
+    def __init__(self, size: int = 0):
+        super().__init__(size)
+        self.cost = []
+
+    def add_edge(self, start: int, end: int, capacity: int, cost: int = 0) -> int:
+        self.cost += [cost, -cost]
+        return super().add_edge(start, end, capacity)
+
+    def set_cost(self, edge: int, cost: int):
+        self.cost[edge], self.cost[edge ^ 1] = cost, -cost
+
+    def min_cost_flow(self, source: int, sink: int) -> Tuple[int, int]:
+        flow = total_cost = 0
+
+        while True:
+            # Bellman-Ford queue (SPFA), since reverse edges carry negative costs
+            distance = [None] * len(self.adjacent)
+            previous = [None] * len(self.adjacent)
+            queued = [False] * len(self.adjacent)
+            distance[source] = 0
+            queue = deque([source])
+
+            while queue:
+                node = queue.popleft()
+                queued[node] = False
+                for edge in self.adjacent[node]:
+                    end = self.to[edge]
+                    if self.capacity[edge] and (distance[end] is None or distance[node] + self.cost[edge] < distance[end]):
+                        distance[end] = distance[node] + self.cost[edge]
+                        previous[end] = edge
+                        if not queued[end]:
+                            queued[end] = True
+                            queue.append(end)
+
+            if distance[sink] is None:
+                return flow, total_cost
+
+            path, node = [], sink
+            while node != source:
+                path.append(previous[node])
+                node = self.to[previous[node] ^ 1]
+
+            pushed = min(self.capacity[edge] for edge in path)
+            for edge in path:
+                self.capacity[edge] -= pushed
+                self.capacity[edge ^ 1] += pushed
+            flow += pushed
+            total_cost += pushed * distance[sink]
+
+def tokenize(skills: str) -> set[str]:
+    return {" ".join(token.lower().split()) for token in re.split(r"[,;/\n]", skills)} - {""}
+
+class SkillIndex:
+    """Maps each distinct skill to a bit, so comparing a TA with a course is one AND and a bit count."""
+
+    def __init__(self):
+        self.bits = {}
+        self.masks = {}
+
+    def mask(self, skills: str) -> int:
+        # Skills strings repeat across memberships, so each one is only parsed once per run
+        if (mask := self.masks.get(skills)) is None:
+            mask = 0
+            for token in tokenize(skills):
+                mask |= 1 << self.bits.setdefault(token, len(self.bits))
+            self.masks[skills] = mask
+
+        return mask
+
+def load(course: Union[Course, None]) -> Tuple[list[CourseMembership], list[Section], dict[int, list[Meeting]]]:
+    memberships = list(tas_with_capacity(course).filter(remaining__gt=0))
+    open_sections = Section.objects.filter(ta__isnull=True).select_related("course").order_by("course__name", "course", "num", "pk")
+    if course is not None:
+        open_sections = open_sections.filter(course=course)
+
+    return memberships, list(open_sections), meetings_of(open_sections)
+
+def build(network: FlowNetwork, memberships: list[CourseMembership], open_sections: list[Section], meetings: dict[int, list[Meeting]],
+          allowed: Callable[[Section, Account], bool]) -> Tuple[int, int, list[Tuple[int, CourseMembership]], list[Tuple[int, Section, Account]]]:
+    """Source -> TA membership (remaining capacity) -> the TA at one meeting time (1) -> open section (1) -> sink (1).
+
+    Sections meeting at the same times share one node per TA, so a TA is never handed two of them."""
+
+    source, sink = network.add_node(), network.add_node()
+    supplies, tas = [], defaultdict(list)
+    for membership in memberships:
+        node = network.add_node()
+        supplies.append((network.add_edge(source, node, membership.remaining), membership))
+        tas[membership.course_id].append((node, membership.account, {}))
+
+    candidates = []
+    for section in open_sections:
+        section_node = network.add_node()
+        network.add_edge(section_node, sink, 1)
+        # A section with no meetings can't clash with anything, so it gets a time of its own
+        time = tuple(sorted(meetings[section.pk])) or section.pk
+        for node, account, times in tas[section.course_id]:
+            if allowed(section, account):
+                if (time_node := times.get(time)) is None:
+                    time_node = times[time] = network.add_node()
+                    network.add_edge(node, time_node, 1)
+                candidates.append((network.add_edge(time_node, section_node, 1), section, account))
+
+    return source, sink, supplies, candidates
+
+def solve_max_flow(memberships: list[CourseMembership], open_sections: list[Section], meetings: dict[int, list[Meeting]],
+                   allowed: Callable[[Section, Account], bool]) -> list[Tuple[Section, Account]]:
+    network = FlowNetwork()
+    source, sink, _, candidates = build(network, memberships, open_sections, meetings, allowed)
+    network.max_flow(source, sink)
+
+    return [(section, account) for edge, section, account in candidates if not network.capacity[edge]]
+
+def solve_by_skills(memberships: list[CourseMembership], open_sections: list[Section], meetings: dict[int, list[Meeting]],
+                    allowed: Callable[[Section, Account], bool]) -> list[Tuple[Section, Account]]:
+    """As many assignments as solve_max_flow on the same network, choosing the TAs who miss the fewest of their course's skills."""
+
+    index = SkillIndex()
+    required = {section.course_id: index.mask(section.course.skills) for section in open_sections}
+    network = CostFlowNetwork()
+    source, sink, supplies, candidates = build(network, memberships, open_sections, meetings, allowed)
+    for edge, membership in supplies:
+        network.set_cost(edge, (required.get(membership.course_id, 0) & ~index.mask(membership.account.skills)).bit_count())
+
+    network.min_cost_flow(source, sink)
+
+    return [(section, account) for edge, section, account in candidates if not network.capacity[edge]]
+
+def plan(course: Union[Course, None] = None, by_skills: bool = False) -> Tuple[list[Tuple[Section, Account]], list[Section]]:
+    memberships, open_sections, meetings = load(course)
+    index = schedule_index(None if course is None else {membership.account_id for membership in memberships})
+    solve = solve_by_skills if by_skills else solve_max_flow
+    memberships_by_course, sections_by_course = defaultdict(list), defaultdict(list)
+    for membership in memberships:
+        memberships_by_course[membership.course_id].append(membership)
+    for section in open_sections:
+        sections_by_course[section.course_id].append(section)
+    ruled_out = set()
+
+    def allowed(section: Section, account: Account) -> bool:
+        return (section.pk, account.pk) not in ruled_out and not index.conflicts(account.pk, meetings[section.pk])
+
+    # Courses are solved one at a time, around the sections earlier courses gave their TAs. The network keeps a TA
+    # from two sections at the same times, but not from two that only partly overlap; those pairs are ruled out and
+    # the course solved again, which ends since every round rules out at least one more pair.
+    def fill(solve: Callable, course_id: int) -> list[Tuple[Section, Account]]:
+        ruled_out.clear()
+        while True:
+            picked, picks, clashes = ConflictIndex(), [], set()
+            for section, account in solve(memberships_by_course[course_id], sections_by_course[course_id], meetings, allowed):
+                if picked.conflicts(account.pk, meetings[section.pk]):
+                    clashes.add((section.pk, account.pk))
+                    continue
+                for meeting in meetings[section.pk]:
+                    picked.add(account.pk, meeting, f"{section.course.name} {section.num}")
+                picks.append((section, account))
+
+            if not clashes:
+                return picks
+            ruled_out.update(clashes)
+
+    assignments = []
+    for course_id in sections_by_course:
+        picks = fill(solve, course_id)
+        # Ruling pairs out is greedy, so the cheapest flow can lose more sections to it than the plain one.
+        # Filling sections comes before matching skills.
+        if by_skills and len(picks) < len(flow_picks := fill(solve_max_flow, course_id)):
+            picks = flow_picks
+
+        for section, account in picks:
+            for meeting in meetings[section.pk]:
+                index.add(account.pk, meeting, f"{section.course.name} {section.num}")
+        assignments += picks
+
+    filled = {section.pk for section, _ in assignments}
+
+    return assignments, [section for section in open_sections if section.pk not in filled]
+
+def preview(course: Union[Course, None] = None, by_skills: bool = False) -> Tuple[list[Tuple[Section, Account]], list[Section]]:
+    # Any write to a course or account moves the tag, so a preview is reused only until something it read changes
+    key = f"{'all' if course is None else course.pk}:{'skills' if by_skills else 'flow'}"
+    return PLANS.get_or_set(key, lambda: plan(course, by_skills), tag=versions.tag([versions.COURSES, versions.ACCOUNTS]))
+
+def commit(course: Union[Course, None] = None, by_skills: bool = False) -> Tuple[list[Tuple[Section, Account]], list[Section]]:
+    # The plan is recomputed inside the transaction so it can't act on sections filled since the preview.
+    # Transactions are IMMEDIATE (settings.DATABASES), so the write lock is held before plan() reads and
+    # concurrent commits queue behind each other instead of failing to upgrade a read lock.
+    with transaction.atomic():
+        assignments, unfilled = plan(course, by_skills)
+
+        # One UPDATE per TA is several times faster than bulk_update's per-row CASE expressions
+        sections_by_ta = defaultdict(list)
+        for section, account in assignments:
+            section.ta = account
+            sections_by_ta[account.pk].append(section.pk)
+        for ta, pks in sections_by_ta.items():
+            Section.objects.filter(pk__in=pks, ta__isnull=True).update(ta=ta)
+
+        if assignments:
+            versions.bump_courses(*{section.course_id for section, _ in assignments})
+
+    return assignments, unfilled
@@ -0,0 +1,91 @@
+import re
+from typing import Iterable, Tuple, Union
+
+from django.db import connection
+from django.db.models import Q
+
+from ..models import Account, Course, CourseMembership
+from . import courses
+
+# Created by migration 0021 on SQLite; other databases fall back to substring matching
+TABLE = "scheduler_app_search"
+ACCOUNT, COURSE = 0, 1
+KINDS = {"users": ACCOUNT, "courses": COURSE}
+# bm25 column weights: a hit in a name outranks an email, which outranks skills or a description
+WEIGHTS = "10.0, 5.0, 1.0"
+
+def enabled() -> bool:
+    return connection.vendor == "sqlite"
+
+def rowid(kind: int, pk: int) -> int:
+    return pk * 2 + kind
+
+def replace(rows: list[Tuple[int, str, str, str]]):
+    if not enabled() or not rows:
+        return
+
+    with connection.cursor() as cursor:
+        # FTS5 resolves a clashing rowid by deleting the old row, so edits are one statement
+        cursor.executemany(f"INSERT OR REPLACE INTO {TABLE} (rowid, name, email, details) VALUES (%s, %s, %s, %s)", rows)
+
+def index_accounts(accounts: Iterable[Account]):
+    replace([(rowid(ACCOUNT, account.pk), account.name, account.email, account.skills) for account in accounts])
+
+def index_courses(courses: Iterable[Course]):
+    replace([(rowid(COURSE, course.pk), course.name, "", course.description) for course in courses])
+
+def remove(kind: int, pk: int):
+    if enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [rowid(kind, pk)])
+
+def rebuild():
+    if not enabled():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        index_accounts(Account.objects.only("pk", "name", "email", "skills").iterator())
+        index_courses(Course.objects.only("pk", "name", "description").iterator())
+        # Merging the index segments a bulk load leaves behind speeds up every later query
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+def match_expression(query: str) -> str:
+    # Every word must match as a prefix; quoting keeps FTS5 operators in user input from being interpreted
+    return " ".join(f'"{token}"*' for token in re.findall(r"\w+", query.lower()))
+
+def search(requester, query: str, kind: Union[int, None] = None, start: int = 0, limit: int = 20) -> list[dict]:
+    if not (match := match_expression(query)):
+        return []
+    if not enabled():
+        return fallback_search(requester, query, kind, start, limit)
+
+    conditions, params = [f"{TABLE} MATCH %s"], [match]
+    if kind is not None:
+        conditions.append("(rowid & 1) = %s")
+        params.append(kind)
+    if requester.role != Account.Role.SUPERVISOR:
+        # Courses are only searchable by their members, as on the courses list
+        conditions.append(f"((rowid & 1) = {ACCOUNT} OR rowid IN "
+                          f"(SELECT course_id * 2 + {COURSE} FROM {CourseMembership._meta.db_table} WHERE account_id = %s))")
+        params.append(requester.pk)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT rowid, name, email, details FROM {TABLE} WHERE {' AND '.join(conditions)} "
+                       f"ORDER BY bm25({TABLE}, {WEIGHTS}) LIMIT %s OFFSET %s", params + [limit, start])
+        return [{"kind": "user" if row & 1 == ACCOUNT else "course", "pk": row >> 1, "name": name, "detail": email or details} \
+                for row, name, email, details in cursor.fetchall()]
+
+def fallback_search(requester, query: str, kind: Union[int, None], start: int, limit: int) -> list[dict]:
+    results = []
+
+    if kind in (None, ACCOUNT):
+        results += [{"kind": "user", "pk": pk, "name": name, "detail": email} for pk, name, email in Account.objects \
+                    .filter(Q(name__icontains=query) | Q(email__icontains=query) | Q(skills__icontains=query)) \
+                    .order_by("name", "pk").values_list("pk", "name", "email")[:start + limit]]
+    if kind in (None, COURSE):
+        results += [{"kind": "course", "pk": pk, "name": name, "detail": description} for pk, name, description in courses.visible(requester) \
+                    .filter(Q(name__icontains=query) | Q(description__icontains=query)) \
+                    .order_by("name", "pk").values_list("pk", "name", "description")[:start + limit]]
+
+    return results[start:start + limit]
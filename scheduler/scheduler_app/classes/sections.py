@@ -1,4 +1,64 @@
-from ..models import Course, Section, Account, CourseMembership
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import time
+from typing import Iterable, Tuple, Union
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+
+from ..models import Course, Section, SectionMeeting, Account, CourseMembership
+from . import versions
+
+SCHEDULE_FIELDS = ("course", "section", "ta", "ta_email", "instructor", "grader", "capacity")
+SCHEDULE_CHUNK_SIZE = 2000
+MEETING_PATTERN = re.compile(r"^([MTWRFSU]+)\s+(\d{1,2}:\d{2})\s*-\s*(\d{1,2}:\d{2})$")
+
+Meeting = Tuple[int, time, time]
+
+class ConflictIndex:
+    """Each TA's weekly meetings, kept sorted by start time per weekday.
+
+    Alongside the starts it keeps the latest end seen so far. A new meeting overlaps an existing one exactly when some
+    meeting starting before it ends also ends after it starts, which is one binary search and one lookup.
+
+    Adding a meeting in start order is an append; adding one out of order shifts the rest of that TA's day, so
+    schedule_index() loads meetings sorted."""
+
+    def __init__(self):
+        self.days = defaultdict(lambda: ([], [], [], []))
+
+    def add(self, ta: int, meeting: Meeting, label: str):
+        weekday, start, end = meeting
+        starts, ends, latest, labels = self.days[ta, weekday]
+        if not starts or starts[-1] <= start:
+            starts.append(start)
+            ends.append(end)
+            labels.append(label)
+            latest.append(max(latest[-1], end) if latest else end)
+            return
+
+        position = bisect_right(starts, start)
+        starts.insert(position, start)
+        ends.insert(position, end)
+        labels.insert(position, label)
+        latest.insert(position, end)
+        for i in range(position, len(latest)):
+            latest[i] = max(ends[i], latest[i - 1]) if i else ends[i]
+
+    def conflict(self, ta: int, meeting: Meeting) -> Union[str, None]:
+        weekday, start, end = meeting
+        starts, ends, latest, labels = self.days.get((ta, weekday), ([], [], [], []))
+
+        if not (position := bisect_left(starts, end)) or latest[position - 1] <= start:
+            return None
+
+        # Only reached on a conflict, to name the meeting it collides with
+        return next(labels[i] for i in range(position - 1, -1, -1) if ends[i] > start)
+
+    def conflicts(self, ta: int, meetings: Iterable[Meeting]) -> Union[str, None]:
+        return next((label for meeting in meetings if (label := self.conflict(ta, meeting))), None)
 
 def count(num: str) -> int:
     return Section.objects.filter(num=num).count()
@@ -8,17 +68,117 @@ def create(course: Course, num: str) -> list[str]:
 
     if not num:
         errors.append("Please enter the section number!")
-    elif count(num):
-        errors.append("Please enter a number not taken by an existing section in this course!")
-
-    if not errors:
-        Section.objects.create(course=course, num=num)
+    else:
+        try:
+            with transaction.atomic():
+                Section.objects.create(course=course, num=num)
+        except IntegrityError:
+            errors.append("Please enter a number not taken by an existing section in this course!")
 
     return errors
 
 def delete(section: Section):
-    section.delete()
+    with transaction.atomic():
+        section.delete()
+        versions.bump_courses(section.course_id)
+
+def tas_with_capacity(course: Union[Course, None] = None) -> QuerySet:
+    # One query: each TA membership annotated with the sections it already holds in its course
+    assigned = Section.objects.filter(course=OuterRef("course"), ta=OuterRef("account")) \
+                    .values("ta").annotate(count=Count("pk")).values("count")
+    memberships = CourseMembership.objects.filter(account__role=Account.Role.TA)
+
+    if course is not None:
+        memberships = memberships.filter(course=course)
+
+    return memberships.select_related("account") \
+                .annotate(assigned=Coalesce(Subquery(assigned), 0)) \
+                .annotate(remaining=F("sections") - F("assigned")) \
+                .order_by("account__name", "account__pk")
+
+def schedule() -> QuerySet:
+    # One row per section, joined in the database; grader and capacity come from the TA's membership in that course
+    instructor = CourseMembership.objects.filter(course=OuterRef("course"), account__role=Account.Role.INSTRUCTOR) \
+                    .order_by("pk").values("account__name")[:1]
+    membership = CourseMembership.objects.filter(course=OuterRef("course"), account=OuterRef("ta"))
 
+    return Section.objects.annotate(
+                ta_name=F("ta__name"),
+                ta_email=F("ta__email"),
+                instructor=Subquery(instructor),
+                grader=Subquery(membership.values("grader")[:1]),
+                capacity=Subquery(membership.values("sections")[:1]),
+            ) \
+            .order_by("course__name", "course", "num", "pk") \
+            .values_list("course__name", "num", "ta_name", "ta_email", "instructor", "grader", "capacity")
+
+def parse_meetings(text: str) -> Tuple[list[Meeting], list[str]]:
+    # Meetings of one section that overlap would make it clash with itself for any TA
+    meetings, errors, entered = [], [], ConflictIndex()
+
+    for entry in filter(None, (entry.strip() for entry in re.split(r"[,;\n]", text))):
+        if not (match := MEETING_PATTERN.match(entry.upper())):
+            errors.append(f"Please enter {entry} like MW 10:00-10:50!")
+            continue
+
+        try:
+            start, end = time.fromisoformat(match[2].zfill(5)), time.fromisoformat(match[3].zfill(5))
+        except ValueError:
+            errors.append(f"Please enter valid times in {entry}!")
+            continue
+
+        if start >= end:
+            errors.append(f"Please end {entry} after it starts!")
+            continue
+
+        days = [(SectionMeeting.DAY_CODES.index(code), start, end) for code in dict.fromkeys(match[1])]
+        if (overlap := entered.conflicts(0, days)):
+            errors.append(f"Please enter {entry} at a time that doesn't overlap {overlap}!")
+            continue
+
+        for meeting in days:
+            entered.add(0, meeting, entry)
+        meetings += days
+
+    return meetings, errors
+
+def meetings_of(sections: QuerySet) -> dict[int, list[Meeting]]:
+    meetings = defaultdict(list)
+    for section, weekday, start, end in SectionMeeting.objects.filter(section__in=sections) \
+            .values_list("section", "weekday", "start", "end"):
+        meetings[section].append((weekday, start, end))
+
+    return meetings
+
+def schedule_index(tas: Union[Iterable[int], None] = None, exclude: Union[Section, None] = None) -> ConflictIndex:
+    # One query for the meetings of every section the TAs already teach, in start order so each add is an append.
+    # None covers every assigned section; assign() and set_meetings() only load the one TA's week.
+    index = ConflictIndex()
+    meetings = SectionMeeting.objects.filter(section__ta__isnull=False) if tas is None else SectionMeeting.objects.filter(section__ta__in=tas)
+    if exclude is not None:
+        meetings = meetings.exclude(section=exclude)
+
+    for ta, weekday, start, end, course, num in meetings.order_by("start").values_list("section__ta", "weekday", "start", "end",
+                                                                                      "section__course__name", "section__num"):
+        index.add(ta, (weekday, start, end), f"{course} {num}")
+
+    return index
+
+def set_meetings(section: Section, text: str) -> list[str]:
+    meetings, errors = parse_meetings(text)
+
+    if not errors and section.ta_id is not None \
+            and (conflict := schedule_index([section.ta_id], exclude=section).conflicts(section.ta_id, meetings)):
+        errors.append(f"{section.ta.name} already teaches {conflict} at that time!")
+
+    if not errors:
+        with transaction.atomic():
+            section.meetings.all().delete()
+            SectionMeeting.objects.bulk_create(SectionMeeting(section=section, weekday=weekday, start=start, end=end) \
+                                               for weekday, start, end in meetings)
+            versions.bump_courses(section.course_id)
+
+    return errors
 
 def assign(section: Section, user: Account) -> list[str]:
     errors = []
@@ -32,19 +192,21 @@ def assign(section: Section, user: Account) -> list[str]:
             errors.append("User is an instructor, not a TA!")
     if section is None:
         errors.append("Enter a section")
-    else:
-        try:
-            if user.sections.count() >= CourseMembership.objects.get(course=section.course, account=user).sections:
-                errors.append("User is assigned to too many sections!")
-        except CourseMembership.DoesNotExist:
-            pass
+    elif user is not None:
+        membership = tas_with_capacity(section.course).filter(account=user).first()
+        if membership is not None and membership.remaining <= 0:
+            errors.append("User is assigned to too many sections!")
     
     if errors:
         return errors
     
     if section.ta is None:
-        section.ta = user
-        section.save()
+        if (conflict := schedule_index([user.pk]).conflicts(user.pk, meetings_of([section])[section.pk])):
+            errors.append(f"{user.name} already teaches {conflict} at that time!")
+        else:
+            section.ta = user
+            with transaction.atomic():
+                section.save()
     else:
         errors.append(f"{section.ta} already assigned to this section")
     
@@ -53,7 +215,8 @@ def assign(section: Section, user: Account) -> list[str]:
 def unassign(section: Section) -> bool:
     if section.ta:
         section.ta = None
-        section.save()
+        with transaction.atomic():
+            section.save()
         return True
     else:
         return False
\ No newline at end of file
@@ -0,0 +1,30 @@
+import time
+from datetime import datetime
+from typing import Iterator, Union
+
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+PURGE_CHUNK_SIZE = 500
+
+def purge_expired(chunk_size: int = PURGE_CHUNK_SIZE, pause: float = 0.0, now: Union[datetime, None] = None) -> Iterator[int]:
+    """Delete expired sessions a chunk at a time, yielding how many each chunk removed.
+
+    Each chunk commits on its own, so SQLite's write lock is held for one short DELETE at a time and logins
+    can write their sessions between chunks. Sessions that expire while the purge runs are left for the next one.
+    """
+
+    now = now or timezone.now()
+
+    while True:
+        # expire_date is indexed, so finding each chunk doesn't rescan the live sessions
+        keys = list(Session.objects.filter(expire_date__lt=now).order_by("expire_date").values_list("session_key", flat=True)[:chunk_size])
+        if not keys:
+            return
+
+        Session.objects.filter(session_key__in=keys).delete()
+        yield len(keys)
+
+        if len(keys) < chunk_size:
+            return
+        time.sleep(pause)
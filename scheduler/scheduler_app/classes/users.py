@@ -1,16 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Tuple, Union
+
+from django.contrib.auth.hashers import make_password
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import QuerySet
 
 from ..models import Account
+from . import search, versions
+from .permissions import is_hashed
+
+IMPORT_BATCH_SIZE = 500
 
 def count(name: str) -> int:
     return Account.objects.filter(name=name).count()
 
-def get(requester: Account) -> list[Account]:
+def get(requester: Account) -> QuerySet:
+    return Account.objects.only("pk", "name").order_by("name", "pk")
 
-    return list(Account.objects.all())
+def members(requester: Account) -> QuerySet:
+    if requester.role == Account.Role.SUPERVISOR:
+        visible = Account.objects.filter(courses__isnull=False)
+    else:
+        visible = Account.objects.filter(courses__members=requester.pk)
 
-def create(details: dict[str, str]) -> list[str]:
+    return visible.distinct().order_by("name", "pk").values("pk", "name")
+
+def validate(details: dict[str, str], email_in_use: Callable[[str], bool]) -> Tuple[list[str], Union[Account, None]]:
     errors = []
 
     if not (name := details.get("name", "")):
@@ -24,7 +41,7 @@ def create(details: dict[str, str]) -> list[str]:
             errors.append("Please enter a valid role!")
     if not (email := details.get("email", "")):
         errors.append("Please enter an email!")
-    elif Account.objects.filter(email=email).exists():
+    elif email_in_use(email):
         errors.append("Please enter an unused email!")
     else:
         try:
@@ -33,22 +50,82 @@ def create(details: dict[str, str]) -> list[str]:
             errors.append("Please enter a valid email!")
     if not (password := details.get("password", "")):
         errors.append("Please enter a password!")
-    
+
+    if errors:
+        return errors, None
+
+    # The password is left for the caller to hash
+    return errors, Account(
+        name=name,
+        role=role,
+        email=email,
+        password=password,
+        skills=details.get("skills", ""),
+        phone=details.get("phone", ""),
+        address=details.get("address", ""),
+        office_hours=details.get("office_hours", ""),
+    )
+
+def create(details: dict[str, str]) -> list[str]:
+    errors, account = validate(details, lambda email: Account.objects.filter(email=email).exists())
+
     if not errors:
-        Account.objects.create(
-            name=name,
-            role=role,
-            email=email,
-            password=password,
-            phone=details.get("phone", ""),
-            address=details.get("address", ""),
-            office_hours=details.get("office_hours", ""),
-        )
-    
+        account.password = make_password(account.password)
+        with transaction.atomic():
+            account.save()
+            search.index_accounts([account])
+
     return errors
 
+def import_accounts(rows: Iterable[dict[str, str]], batch_size: int = IMPORT_BATCH_SIZE,
+                    hash_workers: Union[int, None] = None) -> Tuple[int, list[Tuple[int, list[str]]]]:
+    used_emails = set(Account.objects.values_list("email", flat=True))
+    created, report, batch = 0, [], []
+
+    # PBKDF2 releases the GIL, so hashing a batch across threads scales with cores. It happens before the batch's
+    # transaction, which only holds the write lock for the insert; batches inserted before a failure stay imported.
+    with ThreadPoolExecutor(hash_workers) as pool:
+        def insert(batch: list[Account]) -> int:
+            hashes = pool.map(lambda password: password if is_hashed(password) else make_password(password),
+                              [account.password for account in batch])
+            for account, password in zip(batch, hashes):
+                account.password = password
+            with transaction.atomic():
+                search.index_accounts(Account.objects.bulk_create(batch))
+                versions.bump_accounts()
+            return len(batch)
+
+        row = 0
+        try:
+            for row, details in enumerate(rows, start=1):
+                errors, account = validate(details, used_emails.__contains__)
+                if errors:
+                    report.append((row, errors))
+                    continue
+
+                used_emails.add(account.email)
+                batch.append(account)
+                if len(batch) >= batch_size:
+                    created += insert(batch)
+                    batch = []
+        except ValueError as e:
+            # A file that can't be read at all imports nothing. Past the first row, earlier batches are already
+            # committed, so the rows read so far are kept and the rest of the file is reported instead.
+            if not row:
+                raise
+            report.append((row + 1, [f"Could not read the rest of the file: {e}"]))
+
+        if batch:
+            created += insert(batch)
+
+    return created, report
+
 def delete(account: Account):
-    account.delete()
+    pk = account.pk
+    with transaction.atomic():
+        search.remove(search.ACCOUNT, pk)
+        account.delete()
+        versions.bump_accounts(pk)
 
 def edit(requester: Account, account: Account, details: dict[str, str]) -> list[str]:
     errors = []
@@ -68,13 +145,16 @@ def edit(requester: Account, account: Account, details: dict[str, str]) -> list[
                 account.email = email
             except ValidationError:
                 errors.append("Please enter a valid email!")
-    account.password = details.get("password", account.password)
+    if (password := details.get("password", "")):
+        account.password = make_password(password)
     account.skills = details.get("skills", account.skills)
     account.phone = details.get("phone", account.phone)
     account.address = details.get("address", account.address)
     account.office_hours = details.get("office_hours", account.office_hours)
 
     if not errors:
-        account.save()
+        with transaction.atomic():
+            account.save()
+            search.index_accounts([account])
     
     return errors
\ No newline at end of file
@@ -0,0 +1,125 @@
+import time
+from functools import wraps
+from typing import Callable, Tuple, Union
+
+from asgiref.sync import iscoroutinefunction
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.http.response import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from ..models import Account, Course, CourseMembership, Section, VersionStamp
+
+# Table-wide scopes, bumped alongside every per-row scope of the same table
+ACCOUNTS = "accounts"
+COURSES = "courses"
+
+def course(pk: int) -> str:
+    return f"course:{pk}"
+
+def account(pk: int) -> str:
+    return f"account:{pk}"
+
+def bump(*scopes: str):
+    # Callers bump after writing; bumping first would let a concurrent reader tag old data with the new stamp.
+    # Stamps are nanosecond clock readings, so they double as modification times and never repeat after a restart.
+    # They are rows rather than cache entries so every worker sees a bump, and a replica's stamps match its data.
+    now = time.time_ns()
+    VersionStamp.objects.bulk_create([VersionStamp(scope=scope, stamp=now) for scope in scopes],
+                                     update_conflicts=True, unique_fields=["scope"], update_fields=["stamp"])
+
+def bump_courses(*pks: int):
+    bump(COURSES, *(course(pk) for pk in pks))
+
+def bump_accounts(*pks: int):
+    bump(ACCOUNTS, *(account(pk) for pk in pks))
+
+def get(scopes: list[str]) -> list[int]:
+    # A scope never bumped is 0, which only has to differ from whatever its first bump writes
+    stamps = dict(VersionStamp.objects.filter(scope__in=scopes).values_list("scope", "stamp"))
+    return [stamps.get(scope, 0) for scope in scopes]
+
+async def aget(scopes: list[str]) -> list[int]:
+    stamps = {scope: stamp async for scope, stamp in VersionStamp.objects.filter(scope__in=scopes).values_list("scope", "stamp")}
+    return [stamps.get(scope, 0) for scope in scopes]
+
+def annotation(scope: Union[str, Concat]) -> Coalesce:
+    # Read alongside the rows it versions, so the rows and the stamp can't come from either side of a write
+    return Coalesce(Subquery(VersionStamp.objects.filter(scope=scope).values("stamp")), 0)
+
+def course_annotation() -> Coalesce:
+    return annotation(Concat(Value(course("")), Cast(OuterRef("pk"), CharField())))
+
+def tag(scopes: list[str]) -> str:
+    return ".".join(map(str, get(scopes)))
+
+# Every save bumps here. The classes modules wrap each write in atomic(), since under autocommit a bare save()
+# commits before its receivers run and a crash in between would leave the stamp behind the row. They only bump
+# themselves after deletes and bulk writes, since a post_delete receiver would stop the ORM from cascading in bulk.
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance: Course, **kwargs):
+    bump_courses(instance.pk)
+
+@receiver(post_save, sender=Section)
+@receiver(post_save, sender=CourseMembership)
+def course_row_saved(sender, instance, **kwargs):
+    bump_courses(instance.course_id)
+
+@receiver(post_save, sender=Account)
+def account_saved(sender, instance: Account, **kwargs):
+    bump_accounts(instance.pk)
+
+def validators(requester, stamps: list[int]) -> Tuple[str, Union[int, None]]:
+    # Pages differ by who is looking, so the requester is part of the tag
+    etag = quote_etag(".".join(map(str, [requester.pk, int(requester.role), *stamps])))
+    # Last-Modified only has whole seconds, so it is held back until the stamp's second is over.
+    # Otherwise a change later in the same second would still compare as not modified.
+    last_modified = latest if 0 < (latest := max(stamps) // 10**9) < int(time.time()) else None
+    return etag, last_modified
+
+def finish(response: HttpResponse, etag: str, last_modified: Union[int, None]) -> HttpResponse:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+def conditional(scopes: Callable[..., list[str]]):
+    def wrap_view(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def respond_async(self, request, requester, *args, **kwargs):
+                stamps = await aget(scopes(*args, **kwargs))
+                etag, last_modified = validators(requester, stamps)
+                # Views tag their fragments with the stamps already read rather than reading them again
+                request.version = ".".join(map(str, stamps))
+
+                if (response := get_conditional_response(request, etag, last_modified)) is None:
+                    response = await func(self, request, requester, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+
+                return finish(response, etag, last_modified)
+
+            return respond_async
+
+        @wraps(func)
+        def respond(self, request, requester, *args, **kwargs):
+            stamps = get(scopes(*args, **kwargs))
+            etag, last_modified = validators(requester, stamps)
+            request.version = ".".join(map(str, stamps))
+
+            if (response := get_conditional_response(request, etag, last_modified)) is None:
+                response = func(self, request, requester, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            return finish(response, etag, last_modified)
+
+        return respond
+
+    return wrap_view
@@ -0,0 +1,72 @@
+import sqlite3
+from contextvars import ContextVar
+from typing import Union
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to each new SQLite connection, before it runs any query of its own."""
+
+    if connection.vendor != "sqlite":
+        return
+
+    # Straight on the driver connection, so pragmas stay out of query logs and a request's query budget
+    for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+PRIMARY = "default"
+REPLICA = "replica"
+
+class Routing:
+    """Where the current request may read from. Code outside a request has none, and stays on the primary."""
+
+    def __init__(self, replica: bool):
+        self.replica = replica
+        self.wrote = False
+
+routing: ContextVar[Union[Routing, None]] = ContextVar("routing", default=None)
+
+class PrimaryReplicaRouter:
+    """Sends a request's reads to the replica until it writes, and every write to the primary."""
+
+    def __init__(self):
+        self.replica = REPLICA if REPLICA in settings.DATABASES else None
+
+    def db_for_read(self, model, **hints) -> str:
+        # A session read from a replica that hasn't caught up with the login would log the user out again
+        if self.replica is None or model._meta.app_label == "sessions" or (state := routing.get()) is None or not state.replica:
+            return PRIMARY
+
+        return self.replica
+
+    def db_for_write(self, model, **hints) -> str:
+        if model._meta.app_label != "sessions" and (state := routing.get()) is not None:
+            # The rest of the request reads its own writes
+            state.replica = False
+            state.wrote = True
+
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Both aliases hold the same tables
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Union[str, None] = None, **hints) -> bool:
+        # The replica gets its schema along with its data from sync_replica
+        return db == PRIMARY
+
+def sync_replica(target: str):
+    # The backup API copies a consistent snapshot, and WAL lets the primary keep taking writes meanwhile
+    primary = connections[PRIMARY]
+    if primary.in_atomic_block:
+        raise RuntimeError("The replica can't be synced inside a transaction, which the backup would wait on forever")
+    primary.ensure_connection()
+    replica = sqlite3.connect(target)
+    try:
+        primary.connection.backup(replica)
+    finally:
+        replica.close()
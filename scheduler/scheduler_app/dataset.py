@@ -0,0 +1,129 @@
+import random
+from datetime import datetime, time, timedelta
+from itertools import islice
+from typing import Iterable, Iterator
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+
+from .classes import search, versions
+from .models import Account, Course, CourseMembership, Section, SectionMeeting
+
+# Every generated account logs in with this password
+PASSWORD = "correct horse battery staple"
+BATCH_SIZE = 5000
+
+FIRST_NAMES = ("Aisha", "Ben", "Carlos", "Dana", "Elif", "Farah", "Grace", "Hiro", "Ines", "Jamal", "Kai", "Lena",
+               "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tariq", "Uma", "Victor", "Wen", "Yusuf", "Zoe")
+LAST_NAMES = ("Anders", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Haddad", "Ito", "Jensen", "Kowalski",
+              "Lopez", "Mensah", "Nguyen", "Okafor", "Patel", "Quint", "Rossi", "Singh", "Tanaka", "Ueda", "Vargas",
+              "Walsh", "Xu", "Yilmaz", "Zielinski")
+SUBJECTS = (("COMPSCI", "Computer Science"), ("MATH", "Mathematics"), ("PHYSICS", "Physics"), ("CHEM", "Chemistry"),
+            ("BIO", "Biology"), ("ENGLISH", "English"), ("ECON", "Economics"), ("STAT", "Statistics"))
+LEVELS = ("Introduction to", "Topics in", "Intermediate", "Advanced", "Seminar in")
+SKILLS = ("python", "java", "c", "sql", "networks", "security", "statistics", "calculus", "writing", "lab safety")
+# Registrar meeting patterns, as days and minutes per meeting
+PATTERNS = (("MWF", 50), ("MW", 75), ("TR", 75), ("M", 110), ("T", 110), ("R", 110), ("W", 170), ("F", 50))
+
+def shape(accounts: int) -> dict[str, int]:
+    """How many rows of each kind a department with this many accounts has."""
+
+    supervisors = max(1, accounts // 1000)
+    instructors = max(1, accounts // 10)
+    return {
+        "supervisors": supervisors,
+        "instructors": instructors,
+        "tas": max(1, accounts - supervisors - instructors),
+        "courses": max(1, accounts // 4),
+    }
+
+def batches(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while (batch := list(islice(rows, size))):
+        yield batch
+
+def make_accounts(rng: random.Random, first_pk: int, sizes: dict[str, int], password: str) -> Iterator[Account]:
+    roles = [Account.Role.SUPERVISOR] * sizes["supervisors"] + [Account.Role.INSTRUCTOR] * sizes["instructors"] \
+            + [Account.Role.TA] * sizes["tas"]
+
+    for i, role in enumerate(roles):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield Account(
+            pk=first_pk + i,
+            name=f"{first} {last}",
+            role=role,
+            email=f"{first}.{last}.{first_pk + i}@uwm.edu".lower(),
+            password=password,
+            skills=",".join(rng.sample(SKILLS, rng.randint(1, 3))) if role == Account.Role.TA else "",
+            phone=f"414-{rng.randrange(200, 1000)}-{rng.randrange(10000):04}",
+            office_hours=f"{rng.choice(PATTERNS)[0]} {rng.randint(9, 16)}:00" if role != Account.Role.SUPERVISOR else "",
+        )
+
+def generate(accounts: int, seed: int = 0, batch_size: int = BATCH_SIZE) -> dict[str, int]:
+    """Add a department of this many accounts with its courses, memberships, sections and meetings.
+
+    The same size and seed give the same rows on an empty database. Primary keys are chosen here rather than by the
+    database, so rows can refer to each other without reading anything back.
+    """
+
+    rng = random.Random(seed)
+    sizes = shape(accounts)
+    password = make_password(PASSWORD, salt=f"dataset{seed}")
+    first_account = (Account.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+    first_course = (Course.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+    first_section = (Section.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+    first_instructor = first_account + sizes["supervisors"]
+    first_ta = first_instructor + sizes["instructors"]
+    counts = {**sizes, "accounts": 0, "memberships": 0, "sections": 0, "meetings": 0}
+
+    for batch in batches(make_accounts(rng, first_account, sizes, password), batch_size):
+        with transaction.atomic():
+            Account.objects.bulk_create(batch, batch_size=batch_size)
+        counts["accounts"] += len(batch)
+
+    for start in range(0, sizes["courses"], batch_size):
+        new_courses, memberships, new_sections, meetings = [], [], [], []
+
+        for i in range(start, min(start + batch_size, sizes["courses"])):
+            code, subject = rng.choice(SUBJECTS)
+            course = Course(pk=first_course + i, name=f"{code} {100 + i}", description=f"{rng.choice(LEVELS)} {subject}",
+                            skills=",".join(rng.sample(SKILLS, rng.randint(1, 2))))
+            new_courses.append(course)
+            memberships.append(CourseMembership(account_id=first_instructor + rng.randrange(sizes["instructors"]), course=course))
+
+            # TAs take as many sections as their membership allows, and the rest of the course is left to fill
+            capacity = {}
+            for ta in rng.sample(range(sizes["tas"]), min(sizes["tas"], rng.randint(1, 4))):
+                capacity[first_ta + ta] = rng.randint(1, 3)
+                memberships.append(CourseMembership(account_id=first_ta + ta, course=course, grader=rng.random() < 0.2,
+                                                    sections=capacity[first_ta + ta]))
+
+            for num in range(rng.randint(1, 6)):
+                open_tas = [pk for pk, remaining in capacity.items() if remaining]
+                ta = rng.choice(open_tas) if open_tas and rng.random() < 0.8 else None
+                if ta is not None:
+                    capacity[ta] -= 1
+
+                section = Section(pk=first_section + counts["sections"], course=course, num=f"{801 + num}", ta_id=ta)
+                new_sections.append(section)
+                counts["sections"] += 1
+
+                days, minutes = rng.choice(PATTERNS)
+                begin = datetime.combine(datetime.min, time(rng.randint(8, 17)))
+                meetings += [SectionMeeting(section=section, weekday=SectionMeeting.DAY_CODES.index(day), start=begin.time(),
+                                            end=(begin + timedelta(minutes=minutes)).time()) for day in days]
+
+        with transaction.atomic():
+            Course.objects.bulk_create(new_courses, batch_size=batch_size)
+            CourseMembership.objects.bulk_create(memberships, batch_size=batch_size)
+            Section.objects.bulk_create(new_sections, batch_size=batch_size)
+            SectionMeeting.objects.bulk_create(meetings, batch_size=batch_size)
+        counts["memberships"] += len(memberships)
+        counts["meetings"] += len(meetings)
+
+    # bulk_create skips the signals and helpers that normally keep these up to date
+    search.rebuild()
+    versions.bump(versions.COURSES, versions.ACCOUNTS)
+
+    return counts
@@ -0,0 +1,9 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    # Same algorithm name as Django's hasher, so hashes stay interchangeable and
+    # must_update() flags any hash made at a different cost for rehashing on login
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
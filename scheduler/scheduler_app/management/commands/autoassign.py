@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...classes import scheduling
+from ...models import Course
+
+class Command(BaseCommand):
+    help = "Fill open sections with TAs who have capacity left, for one course or the whole term"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, help="Course primary key (defaults to every course)")
+        parser.add_argument("--skills", action="store_true", help="Prefer TAs whose skills cover the course's required skills")
+        parser.add_argument("--commit", action="store_true", help="Save the assignments instead of previewing them")
+
+    def handle(self, *args, course, skills, commit, **options):
+        if course is not None:
+            try:
+                course = Course.objects.get(pk=course)
+            except Course.DoesNotExist:
+                raise CommandError(f"Course {course} does not exist")
+
+        assignments, unfilled = (scheduling.commit if commit else scheduling.plan)(course, skills)
+
+        for section, ta in assignments:
+            self.stdout.write(f"{section.course.name} {section.num}: {ta.name}")
+        for section in unfilled:
+            self.stderr.write(f"{section.course.name} {section.num}: no TA with capacity")
+        self.stdout.write(f"{'Assigned' if commit else 'Would assign'} {len(assignments)} section(s), {len(unfilled)} left open")
@@ -0,0 +1,133 @@
+import asyncio
+import importlib
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.urls import clear_url_caches
+
+from scheduler import urls
+
+from ...bench import scratch_database, summarize
+from ...classes import permissions
+from ...models import Account, Course, CourseMembership, Section
+
+BATCH_SIZE = 5000
+
+class Command(BaseCommand):
+    help = "Compare concurrent throughput of the read pages under WSGI with sync views and under ASGI with async views"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=16, help="Clients sending requests at once")
+        parser.add_argument("--threads", type=int, default=4, help="WSGI worker threads, which the clients queue for")
+        parser.add_argument("--requests", type=int, default=40, help="Requests per worker and mode")
+        parser.add_argument("--query-delay", type=float, default=0, help="Milliseconds added to every query, standing in for a slower database")
+        parser.add_argument("--courses", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, concurrency, threads, requests, query_delay, courses, seed, **options):
+        rng = random.Random(seed)
+
+        def slow_down(sender, connection, **kwargs):
+            connection.execute_wrappers.append(lambda execute, *args: time.sleep(query_delay / 1000) or execute(*args))
+
+        with scratch_database(os.path.join(tempfile.gettempdir(), "bench_asgi.sqlite3")):
+            workers = self.populate(rng, courses, concurrency)
+            if query_delay:
+                connection_created.connect(slow_down)
+
+            self.stdout.write(f"{'mode':<8}{'req/sec':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+                              f"  ({concurrency} clients, {threads} WSGI threads, {query_delay}ms added per query)")
+            try:
+                for mode in ["WSGI", "ASGI"]:
+                    with override_settings(ASYNC_VIEWS=mode == "ASGI", ALLOWED_HOSTS=["testserver"]):
+                        reload_urls()
+                        cache.clear()
+                        start = time.perf_counter()
+                        timings = self.run_wsgi(workers, requests, threads) if mode == "WSGI" else self.run_asgi(workers, requests)
+                        elapsed = time.perf_counter() - start
+
+                    stats = summarize(timings)
+                    self.stdout.write(f"{mode:<8}{len(timings) / elapsed:>10.0f}{stats['p50'] * 1000:>8.1f}ms"
+                                      f"{stats['p95'] * 1000:>8.1f}ms{stats['p99'] * 1000:>8.1f}ms")
+            finally:
+                connection_created.disconnect(slow_down)
+                reload_urls()
+
+    def populate(self, rng: random.Random, course_count: int, concurrency: int) -> list[tuple[Account, list[str]]]:
+        accounts = Account.objects.bulk_create([Account(name=f"TA {i}", role=Account.Role.TA, email=f"ta{i}@uwm.edu") for i in range(course_count)]
+                                               + [Account(name=f"Instructor {i}", role=Account.Role.INSTRUCTOR, email=f"instructor{i}@uwm.edu")
+                                                  for i in range(course_count // 4 + 1)]
+                                               + [Account(name="Supervisor", role=Account.Role.SUPERVISOR, email="supervisor@uwm.edu")],
+                                               batch_size=BATCH_SIZE)
+        course_list = Course.objects.bulk_create((Course(name=f"Course {i}") for i in range(course_count)), batch_size=BATCH_SIZE)
+        members = [account for account in accounts if account.role != Account.Role.SUPERVISOR]
+        CourseMembership.objects.bulk_create((CourseMembership(account=account, course=course)
+                                              for account in members for course in rng.sample(course_list, 3)), batch_size=BATCH_SIZE)
+        Section.objects.bulk_create((Section(course=course, num=f"{num:03}", ta=rng.choice(accounts[:course_count]))
+                                     for course in course_list for num in range(8)), batch_size=BATCH_SIZE)
+
+        # Mostly TAs, some instructors and a supervisor, each visiting the pages they would
+        workers = []
+        for i in range(concurrency):
+            account = accounts[-1] if i % 8 == 0 else rng.choice(accounts[course_count:-1]) if i % 4 == 0 else rng.choice(accounts[:course_count])
+            course = CourseMembership.objects.filter(account=account).values_list("course", flat=True).first() or course_list[0].pk
+            workers.append((account, ["/", "/courses/", f"/courses/{course}/", "/users/"]))
+
+        return workers
+
+    def run_wsgi(self, workers: list[tuple[Account, list[str]]], requests: int, threads: int) -> list[float]:
+        clients = []
+        for account, routes in workers:
+            client = Client()
+            permissions.login(client, account)
+            clients.append((client, routes))
+
+        # Each client sends its next request once the last one returns, and waits for one of the worker threads
+        # as it would behind a WSGI server
+        with ThreadPoolExecutor(threads) as pool, ThreadPoolExecutor(len(clients)) as senders:
+            def worker(client: Client, routes: list[str]) -> list[float]:
+                timings = []
+                for i in range(requests):
+                    start = time.perf_counter()
+                    pool.submit(client.get, routes[i % len(routes)]).result()
+                    timings.append(time.perf_counter() - start)
+                return timings
+
+            futures = [senders.submit(worker, client, routes) for client, routes in clients]
+            timings = [timing for future in futures for timing in future.result()]
+        return timings
+
+    def run_asgi(self, workers: list[tuple[Account, list[str]]], requests: int) -> list[float]:
+        clients = []
+        for account, routes in workers:
+            client = AsyncClient()
+            permissions.login(client, account)
+            clients.append((client, routes))
+
+        async def worker(client: AsyncClient, routes: list[str]) -> list[float]:
+            timings = []
+            for i in range(requests):
+                start = time.perf_counter()
+                # As ASGIHandler does, so each request's sync work shares one thread of its own
+                async with ThreadSensitiveContext():
+                    await client.get(routes[i % len(routes)])
+                timings.append(time.perf_counter() - start)
+            return timings
+
+        async def main() -> list[list[float]]:
+            return await asyncio.gather(*(worker(client, routes) for client, routes in clients))
+
+        return [timing for result in asyncio.run(main()) for timing in result]
+
+def reload_urls():
+    # urls.py picks its page views when imported
+    importlib.reload(urls)
+    clear_url_caches()
@@ -0,0 +1,76 @@
+import random
+import time
+from datetime import time as clock
+
+from django.core.management.base import BaseCommand
+
+from ...bench import scratch_database
+from ...classes import scheduling
+from ...models import Account, Course, CourseMembership, Section, SectionMeeting
+
+BATCH_SIZE = 5000
+SKILLS = [f"skill {i}" for i in range(40)]
+DAY_PATTERNS = [(0, 2), (1, 3), (0, 2, 4), (4,)]
+
+class Command(BaseCommand):
+    help = "Time the auto-assign solver on a generated term"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=500)
+        parser.add_argument("--sections-per-course", type=int, default=20)
+        parser.add_argument("--tas-per-course", type=int, default=8)
+        parser.add_argument("--max-capacity", type=int, default=5, help="Largest per-course section capacity of a TA")
+        parser.add_argument("--skills", action="store_true", help="Commit the skill-weighted plan instead of the plain one")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, courses, sections_per_course, tas_per_course, max_capacity, skills, seed, **options):
+        rng = random.Random(seed)
+        previews = {}
+
+        with scratch_database():
+            self.populate(rng, courses, sections_per_course, tas_per_course, max_capacity)
+            open_sections = Section.objects.count()
+
+            for by_skills in (False, True):
+                start = time.perf_counter()
+                assignments, unfilled = scheduling.plan(by_skills=by_skills)
+                previews[by_skills] = (time.perf_counter() - start, assignments, unfilled)
+
+            start = time.perf_counter()
+            scheduling.commit(by_skills=skills)
+            committed = time.perf_counter() - start
+
+        self.stdout.write(f"{open_sections} open sections, {courses * tas_per_course} TA memberships")
+        for by_skills, (elapsed, assignments, unfilled) in previews.items():
+            missing = sum(len(scheduling.tokenize(section.course.skills) - scheduling.tokenize(ta.skills)) for section, ta in assignments)
+            self.stdout.write(f"{'Skills preview' if by_skills else 'Preview':<16}{elapsed:.2f}s, {len(assignments)} assigned, "
+                              f"{len(unfilled)} left open, {missing} required skills missing")
+        self.stdout.write(f"{'Commit':<16}{committed:.2f}s (solve again and save in one transaction)")
+
+    def populate(self, rng: random.Random, courses: int, sections_per_course: int, tas_per_course: int, max_capacity: int):
+        # Each TA works in about two courses, so the pool is half the number of memberships
+        ta_count = max(tas_per_course, courses * tas_per_course // 2)
+        Account.objects.bulk_create((
+            Account(name=f"TA {i}", role=Account.Role.TA, email=f"ta{i}@uwm.edu", password="password",
+                    skills=", ".join(rng.sample(SKILLS, 5)))
+            for i in range(ta_count)
+        ), batch_size=BATCH_SIZE)
+        Course.objects.bulk_create((
+            Course(name=f"Course {i}", skills=", ".join(rng.sample(SKILLS, 3))) for i in range(courses)
+        ), batch_size=BATCH_SIZE)
+
+        # The schema is freshly created, so primary keys run from 1 in insertion order
+        CourseMembership.objects.bulk_create((
+            CourseMembership(account_id=ta + 1, course_id=course + 1, sections=rng.randint(1, max_capacity))
+            for course in range(courses) for ta in rng.sample(range(ta_count), tas_per_course)
+        ), batch_size=BATCH_SIZE)
+        Section.objects.bulk_create((
+            Section(course_id=course + 1, num=f"{num:03}")
+            for course in range(courses) for num in range(sections_per_course)
+        ), batch_size=BATCH_SIZE)
+        # Sections meet on a common day pattern at an hourly slot between 8:00 and 17:00
+        SectionMeeting.objects.bulk_create((
+            SectionMeeting(section_id=section + 1, weekday=weekday, start=clock(hour), end=clock(hour, 50))
+            for section in range(courses * sections_per_course)
+            for days, hour in [(rng.choice(DAY_PATTERNS), rng.randint(8, 17))] for weekday in days
+        ), batch_size=BATCH_SIZE)
@@ -0,0 +1,76 @@
+import random
+import time
+
+from django.apps.registry import Apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+from ...bench import scratch_database, summarize, time_each
+from ...classes import courses, users
+from ...models import Account, Course, CourseMembership, Section
+
+BATCH_SIZE = 5000
+SECTIONS_PER_COURSE = 4
+
+class Command(BaseCommand):
+    help = "Compare lookup latency on large tables before and after the 0018 indexes and constraints"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000, help="Rows per table")
+        parser.add_argument("--lookups", type=int, default=500, help="Lookups timed per query")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, rows, lookups, seed, **options):
+        rng = random.Random(seed)
+        keys = [rng.randrange(rows) for _ in range(lookups)]
+        course_count = rows // SECTIONS_PER_COURSE
+
+        queries = {
+            "users.count(name)": lambda i: users.count(f"Account {i}"),
+            "courses.count(name)": lambda i: courses.count(f"Course {i % course_count}"),
+            "account by email": lambda i: Account.objects.filter(email=f"account{i}@uwm.edu").exists(),
+            "membership (account, course)": lambda i: CourseMembership.objects.filter(account=i + 1, course=i % course_count + 1).exists(),
+            "section (course, num)": lambda i: Section.objects.filter(course=i % course_count + 1, num=f"{i // course_count:03}").exists(),
+        }
+
+        with scratch_database():
+            call_command("migrate", "scheduler_app", "0017", verbosity=0)
+            self.stdout.write(f"Seeding {rows} rows per table...")
+            loader = MigrationExecutor(connection).loader
+            before_indexes = loader.get_migration_by_prefix("scheduler_app", "0017")
+            self.populate(loader.project_state((before_indexes.app_label, before_indexes.name)).apps, rows, course_count)
+
+            before = {name: summarize(time_each(query, keys)) for name, query in queries.items()}
+            start = time.perf_counter()
+            call_command("migrate", "scheduler_app", "0018", verbosity=0)
+            migration = time.perf_counter() - start
+            after = {name: summarize(time_each(query, keys)) for name, query in queries.items()}
+
+        self.stdout.write(f"Applied 0018 in {migration:.2f}s\n")
+        self.stdout.write(f"{'lookup':<30}{'before p50':>12}{'after p50':>12}{'before p95':>12}{'after p95':>12}{'speedup':>10}")
+        for name in queries:
+            self.stdout.write(
+                f"{name:<30}"
+                f"{before[name]['p50'] * 1e6:>10.0f}us{after[name]['p50'] * 1e6:>10.0f}us"
+                f"{before[name]['p95'] * 1e6:>10.0f}us{after[name]['p95'] * 1e6:>10.0f}us"
+                f"{before[name]['mean'] / after[name]['mean']:>9.1f}x"
+            )
+
+    def populate(self, apps: Apps, rows: int, course_count: int):
+        # Seeded through the 0017 models, since the current ones have columns later migrations add.
+        # The schema is freshly created, so primary keys run from 1 in insertion order.
+        Account, Course, CourseMembership, Section = (apps.get_model("scheduler_app", name)
+                                                      for name in ["Account", "Course", "CourseMembership", "Section"])
+        Account.objects.bulk_create((
+            Account(name=f"Account {i}", role=2, email=f"account{i}@uwm.edu", password="password")
+            for i in range(rows)
+        ), batch_size=BATCH_SIZE)
+        Course.objects.bulk_create((Course(name=f"Course {i}") for i in range(course_count)), batch_size=BATCH_SIZE)
+        CourseMembership.objects.bulk_create((
+            CourseMembership(account_id=i + 1, course_id=i % course_count + 1) for i in range(rows)
+        ), batch_size=BATCH_SIZE)
+        Section.objects.bulk_create((
+            Section(course_id=i % course_count + 1, num=f"{i // course_count:03}") for i in range(rows)
+        ), batch_size=BATCH_SIZE)
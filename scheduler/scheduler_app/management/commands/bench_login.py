@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory, override_settings
+
+from ...bench import scratch_database, summarize, time_each
+from ...classes import permissions
+from ...models import Account
+
+PASSWORD = "correct horse battery staple"
+
+class Command(BaseCommand):
+    help = "Measure logins per second through the login pipeline at different password hasher costs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, nargs="+", default=[100_000, 300_000, 600_000, 1_000_000],
+                            help="PASSWORD_HASH_ITERATIONS values to compare")
+        parser.add_argument("--logins", type=int, default=20, help="Logins timed per worker and cost")
+        parser.add_argument("--threads", type=int, default=1, help="Concurrent login workers")
+
+    def handle(self, *args, iterations, logins, threads, **options):
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        factory = RequestFactory()
+
+        def login(email: str):
+            request = factory.post("/login/")
+            request.session = session_store()
+            errors, _ = permissions.login_with_details(request, {"email": email, "password": PASSWORD})
+            if errors:
+                raise RuntimeError(f"Benchmark login failed: {errors}")
+
+        def worker(email: str) -> list[float]:
+            try:
+                return time_each(login, [email] * logins)
+            finally:
+                connections.close_all()
+
+        self.stdout.write(f"{'iterations':>12}{'p50':>12}{'p95':>12}{'logins/sec':>14}  ({threads} worker(s))")
+
+        with scratch_database():
+            for cost in iterations:
+                with override_settings(PASSWORD_HASH_ITERATIONS=cost):
+                    email = f"bench{cost}@uwm.edu"
+                    Account.objects.create(name="Bench", role=Account.Role.TA, email=email, password=make_password(PASSWORD))
+
+                    start = time.perf_counter()
+                    with ThreadPoolExecutor(threads) as pool:
+                        timings = [timing for result in pool.map(worker, [email] * threads) for timing in result]
+                    elapsed = time.perf_counter() - start
+
+                stats = summarize(timings)
+                self.stdout.write(f"{cost:>12}{stats['p50'] * 1000:>10.1f}ms{stats['p95'] * 1000:>10.1f}ms{len(timings) / elapsed:>14.1f}")
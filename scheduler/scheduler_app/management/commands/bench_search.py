@@ -0,0 +1,63 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...bench import scratch_database, summarize, time_each
+from ...classes import search
+from ...models import Account, Course, CourseMembership
+
+BATCH_SIZE = 5000
+FIRST_NAMES = ["Ada", "Alan", "Barbara", "Claude", "Donald", "Edsger", "Frances", "Grace", "John", "Ken",
+               "Leslie", "Margaret", "Niklaus", "Radia", "Shafi", "Tim", "Vint", "Whitfield", "Yukihiro", "Zhang"]
+LAST_NAMES = ["Allen", "Backus", "Cerf", "Dijkstra", "Hamilton", "Hopper", "Kay", "Knuth", "Lamport", "Liskov",
+              "Lovelace", "McCarthy", "Perlman", "Ritchie", "Shannon", "Thompson", "Turing", "Wirth", "Wu", "Yao"]
+SKILLS = ["python", "java", "databases", "networking", "compilers", "graphics", "security", "algorithms"]
+
+class Command(BaseCommand):
+    help = "Time full-text searches against a generated set of accounts and courses"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accounts", type=int, default=100_000)
+        parser.add_argument("--courses", type=int, default=2_000)
+        parser.add_argument("--queries", type=int, default=200, help="Searches timed per query shape")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, accounts, courses, queries, seed, **options):
+        if not search.enabled():
+            raise CommandError("The search index needs SQLite")
+        rng = random.Random(seed)
+
+        with scratch_database():
+            Account.objects.bulk_create((
+                Account(name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", role=Account.Role.TA,
+                        email=f"user{i}@uwm.edu", password="password", skills=", ".join(rng.sample(SKILLS, 2)))
+                for i in range(accounts)
+            ), batch_size=BATCH_SIZE)
+            Course.objects.bulk_create((
+                Course(name=f"COMPSCI {i}", description=f"An introduction to {rng.choice(SKILLS)}") for i in range(courses)
+            ), batch_size=BATCH_SIZE)
+            # The schema is freshly created, so primary keys run from 1 in insertion order
+            CourseMembership.objects.bulk_create((
+                CourseMembership(account_id=rng.randrange(accounts) + 1, course_id=course + 1) for course in range(courses)
+            ), batch_size=BATCH_SIZE)
+
+            start = time.perf_counter()
+            search.rebuild()
+            self.stdout.write(f"Indexed {accounts} accounts and {courses} courses in {time.perf_counter() - start:.2f}s")
+
+            supervisor = Account(pk=0, role=Account.Role.SUPERVISOR)
+            ta = Account.objects.get(pk=CourseMembership.objects.values_list("account", flat=True).first())
+            shapes = {
+                "full name": (supervisor, lambda: f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"),
+                "prefix": (supervisor, lambda: rng.choice(LAST_NAMES)[:3]),
+                "skill": (supervisor, lambda: rng.choice(SKILLS)),
+                "email": (supervisor, lambda: f"user{rng.randrange(accounts)}"),
+                "TA, courses": (ta, lambda: rng.choice(SKILLS)),
+            }
+
+            self.stdout.write(f"{'query':<14}{'p50':>10}{'p95':>10}{'p99':>10}")
+            for label, (requester, make_query) in shapes.items():
+                timings = time_each(lambda query: search.search(requester, query, None, 0, 20), [make_query() for _ in range(queries)])
+                stats = summarize(timings)
+                self.stdout.write(f"{label:<14}{stats['p50'] * 1000:>8.2f}ms{stats['p95'] * 1000:>8.2f}ms{stats['p99'] * 1000:>8.2f}ms")
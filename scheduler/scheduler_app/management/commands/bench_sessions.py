@@ -0,0 +1,124 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from ...bench import scratch_database, summarize, time_each
+from ...classes import permissions, sessions
+from ...models import Account
+
+BATCH_SIZE = 5000
+
+class Command(BaseCommand):
+    help = "Compare session engines under concurrent requests, and time the expired-session purge against concurrent logins"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engines", nargs="+", default=list(settings.SESSION_ENGINES), choices=list(settings.SESSION_ENGINES))
+        parser.add_argument("--route", default="/api/v1/courses/", help="Authenticated page each worker requests")
+        parser.add_argument("--requests", type=int, default=200, help="Requests timed per worker and engine")
+        parser.add_argument("--threads", type=int, default=4, help="Concurrent workers")
+        parser.add_argument("--expired", type=int, default=100_000, help="Expired sessions seeded before each purge")
+        parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[sessions.PURGE_CHUNK_SIZE, 1_000_000],
+                            help="Purge chunk sizes to compare; one at least --expired deletes everything at once")
+        parser.add_argument("--pause", type=float, default=0.01, help="Seconds the purge waits between chunks")
+
+    def handle(self, *args, engines, route, requests, threads, expired, chunk_sizes, pause, **options):
+        # Writers have to wait on a real file lock, which an in-memory test database doesn't have
+        with scratch_database(os.path.join(tempfile.gettempdir(), "bench_sessions.sqlite3")):
+            accounts = Account.objects.bulk_create(Account(name=f"TA {i}", role=Account.Role.TA, email=f"ta{i}@uwm.edu")
+                                                   for i in range(threads))
+
+            self.stdout.write(f"{'engine':<12}{'p50':>10}{'p95':>10}{'p99':>10}{'req/sec':>10}{'session queries':>17}  ({threads} worker(s))")
+            for engine in engines:
+                self.bench_requests(engine, accounts, route, requests)
+
+            self.stdout.write(f"\n{'chunk size':>10}{'purge':>10}{'login p50':>12}{'login p99':>12}{'login max':>12}  ({expired} expired, {threads} login worker(s))")
+            for chunk_size in chunk_sizes:
+                self.bench_purge(expired, chunk_size, pause, threads)
+
+    def bench_requests(self, engine: str, accounts: list[Account], route: str, requests: int):
+        session_queries = []
+        lock = threading.Lock()
+
+        def worker(account: Account) -> list[float]:
+            client = Client()
+            permissions.login(client, account)
+            count = 0
+
+            def count_session_queries(execute, sql, params, many, context):
+                nonlocal count
+                count += "django_session" in sql
+                return execute(sql, params, many, context)
+
+            try:
+                with connection.execute_wrapper(count_session_queries):
+                    timings = time_each(lambda _: client.get(route), range(requests))
+            finally:
+                connections.close_all()
+            with lock:
+                session_queries.append(count)
+            return timings
+
+        with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[engine], ALLOWED_HOSTS=["testserver"]):
+            cache.clear()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(len(accounts)) as pool:
+                timings = [timing for result in pool.map(worker, accounts) for timing in result]
+            elapsed = time.perf_counter() - start
+
+        stats = summarize(timings)
+        self.stdout.write(f"{engine:<12}{stats['p50'] * 1000:>8.2f}ms{stats['p95'] * 1000:>8.2f}ms{stats['p99'] * 1000:>8.2f}ms"
+                          f"{len(timings) / elapsed:>10.0f}{sum(session_queries) / len(timings):>13.2f}/req")
+
+    def bench_purge(self, expired: int, chunk_size: int, pause: float, threads: int):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create((Session(session_key=f"expired{i:032}", session_data="", expire_date=past)
+                                     for i in range(expired)), batch_size=BATCH_SIZE)
+        purging = threading.Event()
+        purging.set()
+
+        def purge() -> float:
+            start = time.perf_counter()
+            try:
+                for _ in sessions.purge_expired(chunk_size, pause):
+                    pass
+            finally:
+                purging.clear()
+                connections.close_all()
+            return time.perf_counter() - start
+
+        def login():
+            session = store()
+            session["account"] = 1
+            session.save()
+
+        def worker(_) -> list[float]:
+            # Logins keep writing sessions for as long as the purge runs
+            timings = []
+            try:
+                while purging.is_set():
+                    timings += time_each(lambda _: login(), range(10))
+            finally:
+                connections.close_all()
+            return timings
+
+        with ThreadPoolExecutor(threads + 1) as pool:
+            logins = [pool.submit(worker, i) for i in range(threads)]
+            elapsed = pool.submit(purge).result()
+            timings = [timing for future in logins for timing in future.result()]
+        Session.objects.all().delete()
+
+        stats = summarize(timings)
+        self.stdout.write(f"{chunk_size:>10}{elapsed:>9.2f}s{stats['p50'] * 1000:>10.2f}ms{stats['p99'] * 1000:>10.2f}ms{max(timings) * 1000:>10.2f}ms")
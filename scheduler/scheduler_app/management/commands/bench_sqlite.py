@@ -0,0 +1,119 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.test import override_settings
+
+from ...bench import scratch_database, summarize
+from ...classes import courses, sections
+from ...models import Account, Course, CourseMembership, Section
+
+BATCH_SIZE = 5000
+
+# SQLite's own defaults (and Python's 5 second busy timeout) next to the settings.py values.
+# Every configuration sets journal_mode, since WAL sticks to the file once switched on.
+CONFIGURATIONS = {
+    "default": ({"busy_timeout": 5000, "journal_mode": "delete", "synchronous": "full", "mmap_size": 0, "cache_size": -2000}, 0),
+    "tuned": ({"busy_timeout": 5000, "journal_mode": "wal", "synchronous": "normal", "mmap_size": 256 * 1024 * 1024,
+               "cache_size": -64 * 1024}, 0),
+    "tuned+persistent": ({"busy_timeout": 5000, "journal_mode": "wal", "synchronous": "normal", "mmap_size": 256 * 1024 * 1024,
+                          "cache_size": -64 * 1024}, 60),
+}
+
+class Command(BaseCommand):
+    help = "Compare SQLite connection settings with reader threads loading dashboards while writer threads assign TAs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--configurations", nargs="+", default=list(CONFIGURATIONS), choices=list(CONFIGURATIONS))
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=5, help="How long each configuration runs")
+        parser.add_argument("--courses", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, configurations, readers, writers, seconds, courses, seed, **options):
+        rng = random.Random(seed)
+
+        with scratch_database(os.path.join(tempfile.gettempdir(), "bench_sqlite.sqlite3")):
+            tas, section_pks = self.populate(rng, courses)
+
+            self.stdout.write(f"{'configuration':<18}{'reads/sec':>10}{'read p99':>11}{'writes/sec':>12}{'write p99':>11}{'errors':>8}"
+                              f"  ({readers} reader(s), {writers} writer(s))")
+            for name in configurations:
+                pragmas, max_age = CONFIGURATIONS[name]
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    self.run(name, max_age, tas, section_pks, readers, writers, seconds, seed)
+
+    def populate(self, rng: random.Random, course_count: int) -> tuple[list[Account], list[int]]:
+        tas = Account.objects.bulk_create((Account(name=f"TA {i}", role=Account.Role.TA, email=f"ta{i}@uwm.edu")
+                                           for i in range(course_count)), batch_size=BATCH_SIZE)
+        course_list = Course.objects.bulk_create((Course(name=f"Course {i}") for i in range(course_count)), batch_size=BATCH_SIZE)
+        Section.objects.bulk_create((Section(course=course, num=f"{num:03}") for course in course_list for num in range(10)),
+                                    batch_size=BATCH_SIZE)
+        # Each TA belongs to five courses with room for every section, so writers never run out of capacity
+        CourseMembership.objects.bulk_create((CourseMembership(account=ta, course=course, sections=10)
+                                              for ta in tas for course in rng.sample(course_list, 5)), batch_size=BATCH_SIZE)
+
+        return tas, list(Section.objects.filter(course__coursemembership__isnull=False).distinct().values_list("pk", flat=True))
+
+    def run(self, name: str, max_age: int, tas: list[Account], section_pks: list[int], readers: int, writers: int, seconds: float, seed: int):
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        connections.close_all()
+        deadline = time.perf_counter() + seconds
+        errors = 0
+        lock = threading.Lock()
+
+        def loop(operation) -> list[float]:
+            nonlocal errors
+            timings = []
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        operation()
+                        timings.append(time.perf_counter() - start)
+                    except OperationalError:
+                        with lock:
+                            errors += 1
+                    # What the end of a request does: close the connection unless CONN_MAX_AGE keeps it
+                    close_old_connections()
+            finally:
+                connections.close_all()
+            return timings
+
+        def reader(index: int) -> list[float]:
+            rng = random.Random(seed + index)
+
+            def read():
+                for course in courses.dashboard(rng.choice(tas)):
+                    len(course.section_list)
+
+            return loop(read)
+
+        def writer(index: int) -> list[float]:
+            rng = random.Random(seed - index - 1)
+
+            def write():
+                section = Section.objects.select_related("course", "ta").get(pk=rng.choice(section_pks))
+                if section.ta is None:
+                    sections.assign(section, section.course.coursemembership_set.first().account)
+                else:
+                    sections.unassign(section)
+
+            return loop(write)
+
+        with ThreadPoolExecutor(readers + writers) as pool:
+            reads = [pool.submit(reader, i) for i in range(readers)]
+            writes = [pool.submit(writer, i) for i in range(writers)]
+            read_timings = [timing for future in reads for timing in future.result()]
+            write_timings = [timing for future in writes for timing in future.result()]
+        connection.settings_dict["CONN_MAX_AGE"] = 0
+
+        reads, writes = summarize(read_timings or [0]), summarize(write_timings or [0])
+        self.stdout.write(f"{name:<18}{len(read_timings) / seconds:>10.0f}{reads['p99'] * 1000:>9.1f}ms"
+                          f"{len(write_timings) / seconds:>12.0f}{writes['p99'] * 1000:>9.1f}ms{errors:>8}")
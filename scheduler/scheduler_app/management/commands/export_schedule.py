@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ...classes import exports, sections
+
+class Command(BaseCommand):
+    help = "Stream the term schedule (course, section, TA, instructor, grader flag, capacity) to stdout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=list(exports.FORMATS), default="csv")
+        parser.add_argument("--chunk-size", type=int, default=sections.SCHEDULE_CHUNK_SIZE, help="Rows fetched from the database at a time")
+
+    def handle(self, *args, format, chunk_size, **options):
+        rows = sections.schedule().iterator(chunk_size=chunk_size)
+        for line in exports.lines(sections.SCHEDULE_FIELDS, rows, format):
+            self.stdout.write(line, ending="")
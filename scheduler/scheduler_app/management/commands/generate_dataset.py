@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import dataset
+from ...models import Account
+
+class Command(BaseCommand):
+    help = "Fill an empty database with a seeded synthetic department, from a hundred to a million accounts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accounts", type=int, default=1000, help="Accounts to create; courses, sections and memberships scale with it")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=dataset.BATCH_SIZE, help="Rows inserted per query")
+
+    def handle(self, *args, accounts, seed, batch_size, **options):
+        if accounts < 100:
+            raise CommandError("Please generate at least 100 accounts")
+        # Generated rows only repeat exactly on an empty database
+        if Account.objects.exists():
+            raise CommandError("The database already has accounts; run flush first")
+
+        start = time.perf_counter()
+        counts = dataset.generate(accounts, seed, batch_size)
+
+        self.stdout.write(f"Generated {counts['accounts']} account(s) ({counts['supervisors']} supervisor(s), "
+                          f"{counts['instructors']} instructor(s), {counts['tas']} TA(s)), {counts['courses']} course(s), "
+                          f"{counts['memberships']} membership(s), {counts['sections']} section(s) and {counts['meetings']} "
+                          f"meeting(s) in {time.perf_counter() - start:.1f}s")
+        self.stdout.write(f"Every account logs in with the password {dataset.PASSWORD!r}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...classes import imports, users
+
+class Command(BaseCommand):
+    help = "Import accounts from a CSV, JSON or JSON Lines file, reporting rows that fail validation"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=imports.FORMATS, help="File format (defaults to the file extension)")
+        parser.add_argument("--batch-size", type=int, default=users.IMPORT_BATCH_SIZE, help="Accounts inserted per query")
+        parser.add_argument("--workers", type=int, default=None, help="Threads used to hash passwords")
+
+    def handle(self, *args, path, format, batch_size, workers, **options):
+        try:
+            format = format or imports.detect_format(path)
+            with open(path, encoding="utf-8-sig", newline="") as stream:
+                created, report = users.import_accounts(imports.read_rows(stream, format), batch_size, workers)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not import {path}: {e}")
+
+        for row, errors in report:
+            self.stderr.write(f"Row {row}: {' '.join(errors)}")
+        self.stdout.write(f"Imported {created} account(s), skipped {len(report)} row(s)")
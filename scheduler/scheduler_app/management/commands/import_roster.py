@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...classes import courses, imports
+
+class Command(BaseCommand):
+    help = "Import courses with their sections, instructors and TAs from a JSON roster in a single transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=courses.IMPORT_BATCH_SIZE, help="Rows inserted per query")
+
+    def handle(self, *args, path, batch_size, **options):
+        try:
+            with open(path, encoding="utf-8-sig") as stream:
+                roster = imports.read_roster(stream)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {path}: {e}")
+
+        created, errors = courses.import_roster(roster, batch_size)
+
+        if errors:
+            for error in errors:
+                self.stderr.write(error)
+            raise CommandError(f"Roster has {len(errors)} problem(s); nothing was imported")
+
+        self.stdout.write(f"Imported {created} course(s)")
@@ -0,0 +1,346 @@
+import json
+import logging
+import os
+import platform
+import random
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Tuple, Union
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import URLResolver
+from django.views.static import serve
+
+from scheduler import urls
+
+from ... import dataset
+from ...bench import scratch_database, summarize
+from ...classes import exports, permissions
+from ...models import Account, CourseMembership, Section
+
+SUPERVISOR, INSTRUCTOR, TA = Account.Role.SUPERVISOR, Account.Role.INSTRUCTOR, Account.Role.TA
+
+# Who sends each kind of request, weighted by how often they do; None is a visitor who isn't logged in
+ANYONE = {TA: 70, INSTRUCTOR: 25, SUPERVISOR: 5}
+STAFF = {INSTRUCTOR: 85, SUPERVISOR: 15}
+SUPERVISORS = {SUPERVISOR: 1}
+VISITORS = {None: 1}
+
+# Reads run first and removals last, in the order listed, so no request finds its target already gone
+READ, WRITE, REMOVE = 0, 1, 2
+
+# Failed requests are counted in the report rather than logged one by one
+QUIET_LOGGERS = ("django.request", "scheduler_app.middleware")
+
+SKIPPED = {"admin/": "Django's admin signs in with auth users, which the scheduler doesn't create"}
+
+class Targets:
+    """Primary keys the scenarios draw from, shared by every client thread."""
+
+    def __init__(self, rng: random.Random, users: int):
+        self.rng = rng
+        self.lock = threading.Lock()
+        self.serial = 0
+
+        self.roles = defaultdict(list)
+        for pk, role in Account.objects.values_list("pk", "role").iterator():
+            self.roles[role].append(pk)
+        self.courses = defaultdict(list)
+        self.tas = defaultdict(list)
+        self.memberships = []
+        for course, account, role in CourseMembership.objects.values_list("course", "account", "account__role").iterator():
+            self.courses[account].append(course)
+            if role == TA:
+                self.tas[course].append(account)
+                self.memberships.append((course, account))
+        self.sections = defaultdict(list)
+        self.assigned = []
+        for pk, course, ta in Section.objects.values_list("pk", "course", "ta").iterator():
+            self.sections[course].append(pk)
+            if ta is not None:
+                self.assigned.append((course, pk))
+        self.course_list = sorted(self.sections)
+
+        # Logged in users are staff with courses of their own; deleting one would log out its clients
+        self.clients = {role: rng.sample(pks, min(users, len(pks)))
+                        for role, pks in [(SUPERVISOR, self.roles[SUPERVISOR]),
+                                          *((role, [pk for pk in self.roles[role] if self.courses[pk]]) for role in (INSTRUCTOR, TA))]}
+        protected = {pk for pks in self.clients.values() for pk in pks}
+        self.emails = dict(Account.objects.filter(pk__in=protected).values_list("pk", "email"))
+        self.removable = {
+            "accounts": [pk for role in (INSTRUCTOR, TA) for pk in self.roles[role] if pk not in protected],
+            "courses": list(self.course_list),
+            "memberships": list(self.memberships),
+            "assigned": list(self.assigned),
+            "sections": [(course, pk) for course in self.course_list for pk in self.sections[course]],
+        }
+        for pool in self.removable.values():
+            rng.shuffle(pool)
+
+    def choice(self, values: list):
+        with self.lock:
+            return self.rng.choice(values)
+
+    def randint(self, low: int, high: int) -> int:
+        with self.lock:
+            return self.rng.randint(low, high)
+
+    def unique(self) -> int:
+        with self.lock:
+            self.serial += 1
+            return self.serial
+
+    def role(self, mix: dict) -> Union[int, None]:
+        with self.lock:
+            return self.rng.choices(list(mix), list(mix.values()))[0]
+
+    def account(self) -> int:
+        return self.choice(self.roles[self.choice([SUPERVISOR, INSTRUCTOR, TA])])
+
+    def course(self, account: Union[int, None]) -> int:
+        # Staff visit their own courses; supervisors can visit any
+        return self.choice(self.courses[account] or self.course_list)
+
+    def section(self, account: Union[int, None]) -> Tuple[int, int]:
+        course = self.course(account)
+        return course, self.choice(self.sections[course])
+
+    def take(self, pool: str, empty=0):
+        # Once a pool runs dry the request targets a missing row, which shows up as 404s in the report
+        with self.lock:
+            return self.removable[pool].pop() if self.removable[pool] else empty
+
+
+@dataclass
+class Scenario:
+    mix: dict
+    build: Callable[[Targets, Union[int, None]], Tuple[str, dict]]
+    phase: int = READ
+    # Requests that end their session get a newly logged in client each time
+    fresh: bool = False
+
+def roster(targets: Targets) -> SimpleUploadedFile:
+    courses = [{"name": f"LOADTEST {targets.unique()}", "sections": ["801", "802"],
+                "members": [targets.emails[targets.choice(targets.clients[TA])]]} for _ in range(2)]
+    return SimpleUploadedFile("roster.json", json.dumps(courses).encode())
+
+def accounts_file(targets: Targets) -> SimpleUploadedFile:
+    rows = [f"Load Test {n},{TA},loadtest{n}@uwm.edu,{dataset.PASSWORD}" for n in (targets.unique() for _ in range(5))]
+    return SimpleUploadedFile("accounts.csv", "\n".join(["name,role,email,password", *rows]).encode())
+
+def meetings(targets: Targets) -> str:
+    days, minutes = targets.choice(dataset.PATTERNS)
+    start = datetime.min.replace(hour=targets.randint(8, 17))
+    return f"{days} {start:%H:%M}-{start + timedelta(minutes=minutes):%H:%M}"
+
+# Keyed by method and route as written in scheduler/urls.py, with included routes joined to their prefix
+SCENARIOS = {
+    ("GET", ""): Scenario(ANYONE, lambda t, a: ("/", {})),
+    ("GET", "login/"): Scenario(VISITORS, lambda t, a: ("/login/", {})),
+    ("POST", "login/"): Scenario(VISITORS, lambda t, a: ("/login/", {
+        "email": t.emails[t.choice(t.clients[t.choice([INSTRUCTOR, TA])])], "password": dataset.PASSWORD})),
+    ("POST", "logout/"): Scenario(ANYONE, lambda t, a: ("/logout/", {}), fresh=True),
+    ("GET", "cache/stats/"): Scenario(SUPERVISORS, lambda t, a: ("/cache/stats/", {})),
+    ("POST", "cache/stats/"): Scenario(SUPERVISORS, lambda t, a: ("/cache/stats/", {})),
+    ("GET", "search/"): Scenario(ANYONE, lambda t, a: ("/search/", {"q": t.choice(dataset.LAST_NAMES + dataset.FIRST_NAMES)[:t.randint(2, 6)]})),
+    ("GET", "users/"): Scenario(ANYONE, lambda t, a: ("/users/", {"page": t.randint(1, 5)})),
+    ("GET", "users/create/"): Scenario(SUPERVISORS, lambda t, a: ("/users/create/", {})),
+    ("POST", "users/create/"): Scenario(SUPERVISORS, lambda t, a: ("/users/create/", {
+        "name": "Load Test", "role": TA, "email": f"loadtest{t.unique()}@uwm.edu", "password": dataset.PASSWORD}), WRITE),
+    ("GET", "users/import/"): Scenario(SUPERVISORS, lambda t, a: ("/users/import/", {})),
+    ("POST", "users/import/"): Scenario(SUPERVISORS, lambda t, a: ("/users/import/", {"accounts": accounts_file(t)}), WRITE),
+    ("GET", "users/<int:account>/"): Scenario(ANYONE, lambda t, a: (f"/users/{t.account()}/", {})),
+    ("POST", "users/<int:account>/"): Scenario(ANYONE, lambda t, a: (f"/users/{a}/", {
+        "phone": f"414-555-{t.randint(0, 9999):04}", "office_hours": f"MW {t.randint(9, 16)}:00"}), WRITE),
+    ("POST", "users/<int:account>/delete/"): Scenario(SUPERVISORS, lambda t, a: (f"/users/{t.take('accounts')}/delete/", {}), REMOVE + 4),
+    ("GET", "courses/"): Scenario(ANYONE, lambda t, a: ("/courses/", {})),
+    ("GET", "courses/create/"): Scenario(SUPERVISORS, lambda t, a: ("/courses/create/", {})),
+    ("POST", "courses/create/"): Scenario(SUPERVISORS, lambda t, a: ("/courses/create/", {"name": f"LOADTEST {t.unique()}"}), WRITE),
+    ("GET", "courses/import/"): Scenario(SUPERVISORS, lambda t, a: ("/courses/import/", {})),
+    ("POST", "courses/import/"): Scenario(SUPERVISORS, lambda t, a: ("/courses/import/", {"roster": roster(t)}), WRITE),
+    ("GET", "courses/export/"): Scenario(SUPERVISORS, lambda t, a: ("/courses/export/", {"format": t.choice(list(exports.FORMATS))})),
+    ("GET", "courses/autoassign/"): Scenario(SUPERVISORS, lambda t, a: ("/courses/autoassign/", {})),
+    ("POST", "courses/autoassign/"): Scenario(SUPERVISORS, lambda t, a: ("/courses/autoassign/", {}), WRITE),
+    ("GET", "courses/<int:course>/"): Scenario(ANYONE, lambda t, a: (f"/courses/{t.course(a)}/", {})),
+    ("POST", "courses/<int:course>/"): Scenario(SUPERVISORS, lambda t, a: (f"/courses/{t.course(a)}/", {"num": f"L{t.unique()}"}), WRITE),
+    ("GET", "courses/<int:course>/assign/"): Scenario(SUPERVISORS, lambda t, a: (f"/courses/{t.course(a)}/assign/", {})),
+    ("POST", "courses/<int:course>/assign/"): Scenario(SUPERVISORS, lambda t, a: (f"/courses/{t.course(a)}/assign/", {
+        "user": t.choice(t.roles[TA]), "sections": t.randint(1, 3)}), WRITE),
+    ("GET", "courses/<int:course>/assign/candidates/"): Scenario(SUPERVISORS, lambda t, a: (f"/courses/{t.course(a)}/assign/candidates/", {
+        "q": t.choice(dataset.FIRST_NAMES)[:t.randint(1, 3)], "role": t.choice(["", TA])})),
+    ("POST", "courses/<int:course>/unassign/<int:account>/"): Scenario(SUPERVISORS, lambda t, a: (
+        "/courses/{}/unassign/{}/".format(*t.take("memberships", (0, 0))), {}), REMOVE),
+    ("GET", "courses/<int:course>/membership/<int:account>/"): Scenario(SUPERVISORS, lambda t, a: (
+        "/courses/{}/membership/{}/".format(*t.choice(t.memberships)), {})),
+    ("POST", "courses/<int:course>/membership/<int:account>/"): Scenario(SUPERVISORS, lambda t, a: (
+        "/courses/{}/membership/{}/".format(*t.choice(t.memberships)), {"sections": t.randint(1, 3)}), WRITE),
+    ("GET", "courses/<int:course>/edit/"): Scenario(SUPERVISORS, lambda t, a: (f"/courses/{t.course(a)}/edit/", {})),
+    ("POST", "courses/<int:course>/edit/"): Scenario(SUPERVISORS, lambda t, a: (f"/courses/{t.course(a)}/edit/", {
+        "name": f"LOADTEST {t.unique()}", "description": "Edited by the load test"}), WRITE),
+    ("GET", "courses/<int:course>/autoassign/"): Scenario(STAFF, lambda t, a: (f"/courses/{t.course(a)}/autoassign/", {})),
+    ("POST", "courses/<int:course>/autoassign/"): Scenario(STAFF, lambda t, a: (f"/courses/{t.course(a)}/autoassign/", {}), WRITE),
+    ("POST", "courses/<int:course>/delete/"): Scenario(SUPERVISORS, lambda t, a: (f"/courses/{t.take('courses')}/delete/", {}), REMOVE + 3),
+    ("GET", "courses/<int:course>/sections/<int:section>/assign/"): Scenario(STAFF, lambda t, a: (
+        "/courses/{}/sections/{}/assign/".format(*t.section(a)), {})),
+    ("POST", "courses/<int:course>/sections/<int:section>/assign/"): Scenario(STAFF, lambda t, a: (
+        "/courses/{}/sections/{}/assign/".format(*(section := t.section(a))), {"user": t.choice(t.tas[section[0]] or t.roles[TA])}), WRITE),
+    ("POST", "courses/<int:course>/sections/<int:section>/unassign/"): Scenario(STAFF, lambda t, a: (
+        "/courses/{}/sections/{}/unassign/".format(*t.take("assigned", (0, 0))), {}), REMOVE + 1),
+    ("POST", "courses/<int:course>/sections/<int:section>/delete/"): Scenario(SUPERVISORS, lambda t, a: (
+        "/courses/{}/sections/{}/delete/".format(*t.take("sections", (0, 0))), {}), REMOVE + 2),
+    ("GET", "courses/<int:course>/sections/<int:section>/meetings/"): Scenario(SUPERVISORS, lambda t, a: (
+        "/courses/{}/sections/{}/meetings/".format(*t.section(a)), {})),
+    ("POST", "courses/<int:course>/sections/<int:section>/meetings/"): Scenario(SUPERVISORS, lambda t, a: (
+        "/courses/{}/sections/{}/meetings/".format(*t.section(a)), {"meetings": meetings(t)}), WRITE),
+    ("GET", "api/v1/"): Scenario(VISITORS, lambda t, a: ("/api/v1/", {})),
+    ("GET", "api/v1/courses/"): Scenario(ANYONE, lambda t, a: ("/api/v1/courses/", {"limit": 50})),
+    ("GET", "api/v1/courses/<int:course>/"): Scenario(ANYONE, lambda t, a: (f"/api/v1/courses/{t.course(a)}/", {"expand": "sections"})),
+    ("GET", "api/v1/sections/"): Scenario(ANYONE, lambda t, a: ("/api/v1/sections/", {"course": t.course(a)})),
+    ("GET", "api/v1/memberships/"): Scenario(ANYONE, lambda t, a: ("/api/v1/memberships/", {"course": t.course(a)})),
+    ("GET", "api/v1/accounts/"): Scenario(ANYONE, lambda t, a: ("/api/v1/accounts/", {"role": TA, "limit": 50})),
+    ("GET", "api/v1/accounts/<int:account>/"): Scenario(ANYONE, lambda t, a: (f"/api/v1/accounts/{t.account()}/", {})),
+}
+
+def served(patterns: list, prefix: str = "") -> Iterator[Tuple[str, str]]:
+    """Every method and route that scheduler/urls.py serves, besides static files and the skipped includes."""
+
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            if route not in SKIPPED:
+                yield from served(pattern.url_patterns, route)
+        elif pattern.callback is not serve:
+            view = pattern.callback.view_class
+            yield from ((method.upper(), route) for method in view.http_method_names
+                        if method not in ("head", "options") and hasattr(view, method))
+
+
+class Command(BaseCommand):
+    help = "Load a generated department and time every route under a realistic mix of roles, reporting JSON per route"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accounts", type=int, default=1000, help="Size of the generated department")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--requests", type=int, default=50, help="Requests per route and method")
+        parser.add_argument("--threads", type=int, default=4, help="Clients sending requests at once")
+        parser.add_argument("--users", type=int, default=20, help="Logged in users per role that the clients act as")
+        parser.add_argument("--routes", nargs="+", help="Only these routes, as written in urls.py (defaults to every route)")
+        parser.add_argument("--output", help="Write the report here instead of standard output")
+
+    def handle(self, *args, accounts, seed, requests, threads, users, routes: Union[list[str], None], output, **options):
+        routed = list(served(urls.urlpatterns))
+        missing = [f"{method} /{route}" for method, route in routed if (method, route) not in SCENARIOS]
+        selected = sorted((key for key in routed if key in SCENARIOS and (routes is None or key[1] in routes)),
+                          key=lambda key: SCENARIOS[key].phase)
+        if missing:
+            self.stderr.write(f"No scenario drives {', '.join(missing)}; add one to SCENARIOS")
+        loggers = {name: logging.getLogger(name).level for name in QUIET_LOGGERS}
+
+        with scratch_database(os.path.join(tempfile.gettempdir(), "loadtest.sqlite3")), \
+             override_settings(ALLOWED_HOSTS=["testserver"], QUERY_BUDGET_STRICT=False):
+            self.stderr.write(f"Generating {accounts} account(s)")
+            counts = dataset.generate(accounts, seed)
+            targets = Targets(random.Random(seed), users)
+            for name in loggers:
+                logging.getLogger(name).setLevel(logging.CRITICAL)
+
+            report = {}
+            try:
+                for method, route in selected:
+                    report[f"{method} /{route}"] = result = self.run(SCENARIOS[method, route], method, targets, requests, threads)
+                    self.stderr.write(f"{method:<5}/{route:<55}{result['throughput']:>8.1f}/s  p50 {result['p50_ms']:.1f}ms  "
+                                      f"p99 {result['p99_ms']:.1f}ms  {dict(result['statuses'])}")
+            finally:
+                for name, level in loggers.items():
+                    logging.getLogger(name).setLevel(level)
+
+            environment = {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "cache": settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1],
+                "sessions": settings.SESSION_ENGINE.rsplit(".", 1)[-1],
+                "async_views": settings.ASYNC_VIEWS,
+                "password_hash_iterations": getattr(settings, "PASSWORD_HASH_ITERATIONS", None),
+            }
+
+        result = json.dumps({
+            "dataset": {"seed": seed, **counts},
+            "environment": environment,
+            "load": {"requests": requests, "threads": threads, "users": users},
+            "routes": report,
+            "skipped": {f"/{route}": reason for route, reason in SKIPPED.items()},
+            "missing": missing,
+        }, indent=2)
+
+        if output:
+            with open(output, "w") as file:
+                file.write(result + "\n")
+            self.stderr.write(f"Wrote {output}")
+        else:
+            self.stdout.write(result)
+
+    def run(self, scenario: Scenario, method: str, targets: Targets, requests: int, threads: int) -> dict:
+        accounts = {}
+        lock = threading.Lock()
+
+        def log_in(pk: int) -> Client:
+            client = Client(raise_request_exception=False)
+            with lock:
+                if pk not in accounts:
+                    accounts[pk] = Account.objects.get(pk=pk)
+            permissions.login(client, accounts[pk])
+            return client
+
+        def worker(index: int) -> list[Tuple[float, int, int, bool]]:
+            clients, results = {}, []
+            try:
+                for _ in range(index, requests, threads):
+                    role = targets.role(scenario.mix)
+                    account = None if role is None else targets.choice(targets.clients[role])
+                    path, data = scenario.build(targets, account)
+                    if account is None or scenario.fresh:
+                        client = Client(raise_request_exception=False) if account is None else log_in(account)
+                    elif (client := clients.get(account)) is None:
+                        client = clients[account] = log_in(account)
+
+                    start = time.perf_counter()
+                    response = getattr(client, method.lower())(path, data)
+                    if response.streaming:
+                        for _ in response.streaming_content:
+                            pass
+                    elapsed = time.perf_counter() - start
+
+                    stats = response.wsgi_request.query_stats
+                    results.append((elapsed, response.status_code, stats.count, stats.over_budget))
+            finally:
+                connections.close_all()
+            return results
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            results = [result for results in pool.map(worker, range(threads)) for result in results]
+        elapsed = time.perf_counter() - start
+
+        stats = summarize([timing for timing, *_ in results])
+        return {
+            "requests": stats["n"],
+            "throughput": round(stats["n"] / elapsed, 2),
+            "mean_ms": round(stats["mean"] * 1000, 2),
+            "p50_ms": round(stats["p50"] * 1000, 2),
+            "p95_ms": round(stats["p95"] * 1000, 2),
+            "p99_ms": round(stats["p99"] * 1000, 2),
+            "queries": round(sum(queries for _, _, queries, _ in results) / len(results), 2),
+            "over_budget": sum(over for *_, over in results),
+            "statuses": Counter(str(status) for _, status, *_ in results),
+        }
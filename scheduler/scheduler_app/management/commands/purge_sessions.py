@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...classes import sessions
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in small batches, leaving the database free for logins in between"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=sessions.PURGE_CHUNK_SIZE, help="Sessions deleted per transaction")
+        parser.add_argument("--pause", type=float, default=0.05, help="Seconds to wait between chunks")
+
+    def handle(self, *args, chunk_size, pause, **options):
+        if chunk_size < 1:
+            raise CommandError("Please enter a chunk size of at least 1")
+
+        purged = 0
+        for count in sessions.purge_expired(chunk_size, pause):
+            purged += count
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Purged {purged} expired sessions so far")
+
+        self.stdout.write(f"Purged {purged} expired sessions")
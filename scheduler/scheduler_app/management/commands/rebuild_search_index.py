@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...classes import search
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from every account and course"
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError("The search index needs SQLite; other databases search without one")
+
+        search.rebuild()
+        self.stdout.write("Rebuilt the search index")
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import database
+
+class Command(BaseCommand):
+    help = "Copy the primary database into the read replica configured by SCHEDULER_REPLICA"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, default=0, help="Keep syncing at this many seconds apart instead of once")
+
+    def handle(self, *args, every, **options):
+        if database.REPLICA not in settings.DATABASES:
+            raise CommandError("No replica is configured; set SCHEDULER_REPLICA to its SQLite file")
+        if settings.DATABASES[database.REPLICA]["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("Only SQLite replicas can be synced by copying")
+
+        while True:
+            start = time.perf_counter()
+            # Stamps are copied along with the rows they version, so pages read from the replica are cached under its
+            # own stamps until this catches it up, and under the primary's from then on
+            database.sync_replica(settings.DATABASES[database.REPLICA]["NAME"])
+            self.stdout.write(f"Synced the replica in {time.perf_counter() - start:.2f}s")
+            if not every:
+                return
+            time.sleep(every)
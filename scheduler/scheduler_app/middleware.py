@@ -0,0 +1,169 @@
+import logging
+import time
+from contextlib import ExitStack
+from typing import Union
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .database import REPLICA, Routing, routing
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_UNTIL = "primary_until"
+
+# BEGIN and savepoints wrap statements under atomic() without being queries of their own. SQLite commits and
+# rolls back through the driver, so BEGIN is the only outermost statement that reaches the cursor.
+TRANSACTION_CONTROL = ("BEGIN", "SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+def query_budget(budget: int):
+    def wrap_view(func):
+        func.query_budget = budget
+        return func
+
+    return wrap_view
+
+def get_budget(request) -> Union[int, None]:
+    if (match := request.resolver_match) is None:
+        return None
+
+    view_class = getattr(match.func, "view_class", None)
+    handler = getattr(view_class, request.method.lower(), None)
+    return getattr(handler, "query_budget", None)
+
+class QueryStats:
+    def __init__(self):
+        self.route = None
+        self.budget = None
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.startswith(TRANSACTION_CONTROL):
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            self.queries.append((sql, elapsed))
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def __str__(self):
+        budget = "unbudgeted" if self.budget is None else f"budget {self.budget}"
+        return f"/{self.route}: {self.count} queries in {self.duration * 1000:.1f}ms ({budget})"
+
+def watch_queries(stack: ExitStack, stats: QueryStats):
+    # Reads may go to the replica, so every alias counts towards the budget
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(stats))
+
+class QueryBudgetMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = request.query_stats = QueryStats()
+
+        with ExitStack() as stack:
+            watch_queries(stack, stats)
+            response = self.get_response(request)
+
+        return self.check(request, stats, response)
+
+    async def __acall__(self, request):
+        stats = request.query_stats = QueryStats()
+
+        # Connections belong to a thread, and async views run their queries on the request's sync thread
+        stack = ExitStack()
+        await sync_to_async(watch_queries)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+
+        return self.check(request, stats, response)
+
+    def check(self, request, stats: QueryStats, response):
+        if request.resolver_match is not None:
+            stats.route = request.resolver_match.route
+        stats.budget = get_budget(request)
+
+        if stats.over_budget:
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(f"{request.method} {stats}")
+            logger.warning("%s %s", request.method, stats)
+        else:
+            logger.debug("%s %s", request.method, stats)
+
+        return response
+
+class ReplicaMiddleware:
+    """Lets GET and HEAD requests read from the replica, except for a session that wrote in the last REPLICA_PIN_SECONDS."""
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = REPLICA in settings.DATABASES
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        # The replica lags by up to a sync, so a user who just made a change keeps reading from the primary
+        state = self.routing(request, request.session.get(PRIMARY_UNTIL, 0))
+        token = routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing.reset(token)
+
+        if state.wrote:
+            request.session[PRIMARY_UNTIL] = time.time() + settings.REPLICA_PIN_SECONDS
+
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        # Async ORM calls copy the context into their thread, so they see this request's routing
+        state = self.routing(request, await request.session.aget(PRIMARY_UNTIL, 0))
+        token = routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing.reset(token)
+
+        if state.wrote:
+            await request.session.aset(PRIMARY_UNTIL, time.time() + settings.REPLICA_PIN_SECONDS)
+
+        return response
+
+    def routing(self, request, primary_until: float) -> Routing:
+        return Routing(replica=request.method in ("GET", "HEAD") and primary_until <= time.time())
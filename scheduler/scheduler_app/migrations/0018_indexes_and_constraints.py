@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:25
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_memberships(apps, schema_editor):
+    CourseMembership = apps.get_model('scheduler_app', 'CourseMembership')
+    first = CourseMembership.objects.values('account', 'course').annotate(first=Min('pk')).values('first')
+    CourseMembership.objects.exclude(pk__in=first).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler_app', '0017_course_description'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['name'], name='account_name'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['email'], name='account_email'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['name'], name='course_name'),
+        ),
+        migrations.AddIndex(
+            model_name='section',
+            index=models.Index(fields=['course', 'num'], name='section_course_num'),
+        ),
+        migrations.RunPython(remove_duplicate_memberships, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='coursemembership',
+            constraint=models.UniqueConstraint(fields=('account', 'course'), name='unique_course_membership'),
+        ),
+        migrations.AddConstraint(
+            model_name='section',
+            constraint=models.UniqueConstraint(condition=models.Q(('num', ''), _negated=True), fields=('course', 'num'), name='unique_section_num'),
+        ),
+    ]
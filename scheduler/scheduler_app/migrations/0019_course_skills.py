@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler_app', '0018_indexes_and_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='skills',
+            field=models.CharField(blank=True, default='', max_length=1023),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler_app', '0019_course_skills'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SectionMeeting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.IntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start', models.TimeField()),
+                ('end', models.TimeField()),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meetings', to='scheduler_app.section')),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(('start__lt', models.F('end'))), name='meeting_ends_after_start')],
+            },
+        ),
+    ]
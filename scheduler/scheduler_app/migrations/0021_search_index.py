@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Accounts and courses share one FTS5 table; the low bit of each rowid says which table the row came from
+CREATE = """
+CREATE VIRTUAL TABLE scheduler_app_search USING fts5(
+    name, email, details, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+)
+"""
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(CREATE)
+    schema_editor.execute(
+        "INSERT INTO scheduler_app_search (rowid, name, email, details) "
+        "SELECT id * 2, name, email, skills FROM scheduler_app_account"
+    )
+    schema_editor.execute(
+        "INSERT INTO scheduler_app_search (rowid, name, email, details) "
+        "SELECT id * 2 + 1, name, '', description FROM scheduler_app_course"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS scheduler_app_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler_app', '0020_section_meetings'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler_app', '0021_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStamp',
+            fields=[
+                ('scope', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('stamp', models.BigIntegerField()),
+            ],
+        ),
+    ]
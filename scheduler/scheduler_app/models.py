@@ -17,6 +17,12 @@ class Account(models.Model):
     address = models.CharField(max_length=MAX_LENGTH, blank=True, default="")
     office_hours = models.CharField(max_length=MAX_LENGTH, blank=True, default="")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["name"], name="account_name"),
+            models.Index(fields=["email"], name="account_email"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -53,9 +59,16 @@ class Account(models.Model):
 class Course(models.Model):
     name = models.CharField(max_length=MAX_LENGTH)
     description = models.CharField(max_length=MAX_LENGTH, default="")
+    # Comma-separated skill tags that TAs in the course should have
+    skills = models.CharField(max_length=MAX_LENGTH, blank=True, default="")
     # String through parameter is necessary due to mutual dependency of classes
     members = models.ManyToManyField(Account, through="CourseMembership", related_name="courses")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["name"], name="course_name"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -65,10 +78,60 @@ class CourseMembership(models.Model):
     grader = models.BooleanField(default=False)
     sections = models.IntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["account", "course"], name="unique_course_membership"),
+        ]
+
 class Section(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="sections")
     num = models.CharField(max_length=MAX_LENGTH)
     ta = models.ForeignKey(Account, on_delete=models.SET_NULL, related_name="sections", null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["course", "num"], name="section_course_num"),
+        ]
+        constraints = [
+            # Blank numbers are rejected by sections.create but may exist on older rows
+            models.UniqueConstraint(fields=["course", "num"], condition=~models.Q(num=""), name="unique_section_num"),
+        ]
+
     def __str__(self):
-        return str(self.num)
\ No newline at end of file
+        return str(self.num)
+
+    def meeting_times(self) -> str:
+        # Days that share a time are grouped, e.g. "MW 10:00-10:50, F 12:00-12:50"
+        days = {}
+        for meeting in sorted(self.meetings.all(), key=lambda meeting: (meeting.start, meeting.weekday)):
+            days.setdefault((meeting.start, meeting.end), []).append(SectionMeeting.DAY_CODES[meeting.weekday])
+
+        return ", ".join(f"{''.join(codes)} {start:%H:%M}-{end:%H:%M}" for (start, end), codes in days.items())
+
+class SectionMeeting(models.Model):
+    class Weekday(models.IntegerChoices):
+        MONDAY = 0, "Monday"
+        TUESDAY = 1, "Tuesday"
+        WEDNESDAY = 2, "Wednesday"
+        THURSDAY = 3, "Thursday"
+        FRIDAY = 4, "Friday"
+        SATURDAY = 5, "Saturday"
+        SUNDAY = 6, "Sunday"
+
+    # Registrar day codes, indexed by weekday
+    DAY_CODES = "MTWRFSU"
+
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name="meetings")
+    weekday = models.IntegerField(choices=Weekday.choices)
+    start = models.TimeField()
+    end = models.TimeField()
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=models.Q(start__lt=models.F("end")), name="meeting_ends_after_start"),
+        ]
+
+class VersionStamp(models.Model):
+    # When each versions scope, such as "course:1" or "courses", last changed, in nanoseconds
+    scope = models.CharField(max_length=255, primary_key=True)
+    stamp = models.BigIntegerField()
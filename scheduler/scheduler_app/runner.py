@@ -0,0 +1,14 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+class StrictBudgetRunner(DiscoverRunner):
+    """Runs every test with QUERY_BUDGET_STRICT on, so a view over its query budget fails whichever test requested it."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.strict_budgets = override_settings(QUERY_BUDGET_STRICT=True)
+        self.strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,5 +1,33 @@
 function confirmAction(elem, msg) {
     if(confirm(`Are you sure you want to ${msg}?`)) {
-        elem.parentElement.submit();
+        const form = elem.parentElement;
+        // Forms in cached fragments can't carry a per-user CSRF token, so they borrow the page's
+        if(!form.querySelector("[name=csrfmiddlewaretoken]")) {
+            form.appendChild(document.querySelector("[name=csrfmiddlewaretoken]").cloneNode());
+        }
+        form.submit();
     }
+}
+
+let candidateSearch;
+
+function searchCandidates() {
+    clearTimeout(candidateSearch);
+    candidateSearch = setTimeout(() => {
+        const params = new URLSearchParams({
+            q: document.getElementById("candidate-name").value,
+            role: document.getElementById("candidate-role").value,
+        });
+
+        fetch(`candidates/?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                const select = document.getElementById("user");
+                select.replaceChildren(...data.results.map(user => new Option(`${user.name} - ${user.role}`, user.pk)));
+                select.disabled = !data.results.length;
+                if(select.disabled) {
+                    select.replaceChildren(new Option("No users to assign!", 0));
+                }
+            });
+    }, 200);
 }
\ No newline at end of file
@@ -1,10 +1,27 @@
+import importlib
+import json
+from datetime import time
+from typing import Any, Union
+from unittest import mock
+
+from asgiref.sync import sync_to_async
 from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.db.models import Model
 from django.forms.models import model_to_dict
-from django.test import Client, TestCase
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.urls import clear_url_caches, resolve
+
+from scheduler import urls
 
-from .classes import permissions
-from .models import Account, Course, CourseMembership, Section
+from . import async_views
+from .classes import courses, permissions, search, sections, users, versions
+from .middleware import QueryStats
+from .models import Account, Course, CourseMembership, Section, SectionMeeting, VersionStamp
+from .views import CANDIDATES_PER_PAGE, SEARCH_PER_PAGE, USERS_PER_PAGE
 
 class LoginTest(TestCase):
     def setUp(self):
@@ -95,6 +112,14 @@ class ListUsersTest(TestCase):
         self.assertEqual(2, len(r.context["members"]), "Users list fails to show only course members for user")
         self.assertEqual(3, len(r.context["users"]), "Users list fails to show all users for user")
 
+    def test_pagination(self):
+        Account.objects.bulk_create(Account(name=f"User {i}", role=Account.Role.TA) for i in range(USERS_PER_PAGE))
+        permissions.login(self.client, self.supervisor)
+        r = self.client.get(self.route)
+        self.assertEqual(USERS_PER_PAGE, len(r.context["users"]), "Users list fails to limit first page to page size")
+        r = self.client.get(self.route, {"page": 2})
+        self.assertEqual(3, len(r.context["users"]), "Users list fails to show remaining users on second page")
+
 def assert_field_accessibility(self: TestCase, user: Account, route: str, model: Model, case: str, hidden: list[str], readonly: list[str]):
     permissions.login(self.client, user)
     soup = BeautifulSoup(self.client.get(route).content, "lxml")
@@ -166,6 +191,66 @@ class CreateUserTest(TestCase):
         }, follow=True)
         self.assertEqual([("/users/?user_created=true", 302)], r.redirect_chain, "Successful user creation fails to redirect to users page with flag set")
 
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class ImportUsersTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.route = "/users/import/"
+        self.user = Account.objects.create(email="a@a.com", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(email="b@b.com", role=Account.Role.SUPERVISOR)
+
+    def upload(self, name: str, content: str):
+        return self.client.post(self.route, {"accounts": SimpleUploadedFile(name, content.encode())})
+
+    def test_permissions(self):
+        r = self.client.get(self.route, follow=True)
+        self.assertEqual([("/login/", 302)], r.redirect_chain, "GETing user import page fails to redirect to login page when logged out")
+
+        permissions.login(self.client, self.user)
+        r = self.client.get(self.route)
+        self.assertEqual(403, r.status_code, "GETing user import page fails to load with status code 403 as user")
+        r = self.upload("users.csv", "name,role,email,password\n")
+        self.assertEqual(403, r.status_code, "POSTing user import page fails to load with status code 403 as user")
+
+        permissions.login(self.client, self.supervisor)
+        r = self.client.get(self.route)
+        self.assertEqual(200, r.status_code, "GETing user import page fails to load with status code 200 as supervisor")
+
+    def test_importsFile(self):
+        permissions.login(self.client, self.supervisor)
+        r = self.upload("users.csv", "name,role,email,password\nTA,2,ta@uwm.edu,pw\nTaken,2,a@a.com,pw\n")
+        self.assertEqual(200, r.status_code, "User import with bad rows fails to load with status code 200")
+        self.assertEqual(1, r.context["created"], "User import page fails to report created accounts")
+        self.assertEqual([(2, ["Please enter an unused email!"])], r.context["report"], "User import page fails to report bad rows")
+        self.assertTrue(Account.objects.filter(email="ta@uwm.edu").exists(), "User import page fails to create accounts")
+
+    def test_badUpload(self):
+        permissions.login(self.client, self.supervisor)
+        r = self.client.post(self.route)
+        self.assertEqual(400, r.status_code, "User import without a file fails to load with status code 400")
+        r = self.upload("users.txt", "")
+        self.assertEqual(400, r.status_code, "User import of unsupported file fails to load with status code 400")
+        r = self.upload("users.json", "{not json")
+        self.assertEqual(400, r.status_code, "User import of malformed file fails to load with status code 400")
+        r = self.upload("users.csv", f"name,role,email,password\n{'x' * 200000},2,ta@uwm.edu,pw\n")
+        self.assertEqual(400, r.status_code, "User import of unparseable CSV fails to load with status code 400")
+        self.assertIn("field larger than field limit", r.context["errors"][0], "User import page fails to show CSV errors")
+
+    def test_unreadableRest(self):
+        permissions.login(self.client, self.supervisor)
+        r = self.upload("users.csv", f"name,role,email,password\nTA,2,ta@uwm.edu,pw\n{'x' * 200000},2,b@uwm.edu,pw\n")
+        self.assertEqual(200, r.status_code, "User import failing partway fails to load with status code 200")
+        self.assertEqual(1, r.context["created"], "User import page fails to report accounts created before an unreadable row")
+        self.assertEqual([2], [row for row, _ in r.context["report"]], "User import page fails to report where reading stopped")
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_batchBudget(self):
+        # Strict budgets are on for every test, so a full batch over budget fails the upload
+        permissions.login(self.client, self.supervisor)
+        rows = "".join(f"TA {i},2,ta{i}@uwm.edu,pw\n" for i in range(users.IMPORT_BATCH_SIZE))
+        r = self.upload("users.csv", "name,role,email,password\n" + rows)
+        self.assertEqual(users.IMPORT_BATCH_SIZE, r.context["created"], "User import page fails to import a full batch within its budget")
+
 class ViewUserTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -240,6 +325,7 @@ class ViewUserTest(TestCase):
         permissions.login(self.client, self.user)
         supervisor_info = model_to_dict(self.supervisor)
         del supervisor_info["id"]
+        del supervisor_info["password"]
         supervisor_info["email"] = "changed@supervisor.supervisor"
         del supervisor_info["role"]
         r = self.client.post(self.user_route, supervisor_info)
@@ -258,6 +344,7 @@ class ViewUserTest(TestCase):
             self.assertEqual(value, r.context[field], f"Field {field} is not changed when editing other user info as supervisor")
         user_info = model_to_dict(self.user)
         del user_info["id"]
+        del user_info["password"]
         del user_info["role"]
         r = self.client.post(self.supervisor_route, user_info)
         self.assertEqual(200, r.status_code, "Supervisor cannot change own info")
@@ -360,6 +447,80 @@ class CreateCourseTest(TestCase):
         self.assertEqual([("/courses/?course_created=true", 302)], r.redirect_chain, "Creating course with valid name fails to redirect to courses page")
         self.assertEqual(2, len(r.context["courses"]), "Creating course with valid name fails to create course")
 
+class ImportRosterTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.route = "/courses/import/"
+        self.ta = Account.objects.create(name="TA", email="a@a.com", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(email="b@b.com", role=Account.Role.SUPERVISOR)
+
+    def upload(self, content: str):
+        return self.client.post(self.route, {"roster": SimpleUploadedFile("roster.json", content.encode())})
+
+    def test_permissions(self):
+        r = self.client.get(self.route, follow=True)
+        self.assertEqual([("/login/", 302)], r.redirect_chain, "GETing roster import page fails to redirect to login page when logged out")
+
+        permissions.login(self.client, self.ta)
+        r = self.client.get(self.route)
+        self.assertEqual(403, r.status_code, "GETing roster import page fails to load with status code 403 as user")
+        r = self.upload("[]")
+        self.assertEqual(403, r.status_code, "POSTing roster import page fails to load with status code 403 as user")
+
+        permissions.login(self.client, self.supervisor)
+        r = self.client.get(self.route)
+        self.assertEqual(200, r.status_code, "GETing roster import page fails to load with status code 200 as supervisor")
+
+    def test_importsRoster(self):
+        permissions.login(self.client, self.supervisor)
+        r = self.upload('[{"name": "CS 361", "sections": ["801"], "members": ["a@a.com"]}]')
+        self.assertEqual(200, r.status_code, "Roster import fails to load with status code 200")
+        self.assertEqual(1, r.context["created"], "Roster import page fails to report created courses")
+        self.assertTrue(CourseMembership.objects.filter(course__name="CS 361", account=self.ta).exists(),
+                        "Roster import page fails to assign members")
+
+    def test_badRoster(self):
+        permissions.login(self.client, self.supervisor)
+        r = self.client.post(self.route)
+        self.assertEqual(400, r.status_code, "Roster import without a file fails to load with status code 400")
+        r = self.upload('{"name": "CS 361"}')
+        self.assertEqual(400, r.status_code, "Roster import of malformed roster fails to load with status code 400")
+        r = self.upload('[{"name": "CS 361", "members": ["b@b.com"]}]')
+        self.assertEqual(400, r.status_code, "Roster import of invalid roster fails to load with status code 400")
+        self.assertFalse(Course.objects.exists(), "Roster import page writes an invalid roster")
+
+class ExportScheduleTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.route = "/courses/export/"
+        self.ta = Account.objects.create(name="TA", email="a@a.com", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(email="b@b.com", role=Account.Role.SUPERVISOR)
+        course = Course.objects.create(name="CS 361")
+        CourseMembership.objects.create(account=self.ta, course=course, sections=2)
+        Section.objects.create(course=course, num="801", ta=self.ta)
+
+    def test_permissions(self):
+        r = self.client.get(self.route, follow=True)
+        self.assertEqual([("/login/", 302)], r.redirect_chain, "GETing schedule export fails to redirect to login page when logged out")
+        permissions.login(self.client, self.ta)
+        r = self.client.get(self.route)
+        self.assertEqual(403, r.status_code, "GETing schedule export fails to load with status code 403 as user")
+
+    def test_formats(self):
+        permissions.login(self.client, self.supervisor)
+        r = self.client.get(self.route)
+        self.assertTrue(r.streaming, "Schedule export fails to stream its response")
+        self.assertEqual("text/csv", r["Content-Type"], "Schedule export fails to default to CSV")
+        # Iterating the response itself also reads the async view's stream when ASYNC_VIEWS is on
+        lines = b"".join(r).decode().splitlines()
+        self.assertEqual(["course,section,ta,ta_email,instructor,grader,capacity", "CS 361,801,TA,a@a.com,,False,2"], lines,
+                         "Schedule export fails to write one CSV row per section")
+        r = self.client.get(self.route, {"format": "jsonl"})
+        rows = [json.loads(line) for line in b"".join(r).decode().splitlines()]
+        self.assertEqual(1, len(rows), "Schedule export fails to write one JSON Lines row per section")
+        r = self.client.get(self.route, {"format": "xml"})
+        self.assertEqual(400, r.status_code, "Schedule export of unknown format fails to load with status code 400")
+
 class ViewCourseTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -551,6 +712,41 @@ class DeleteSectionTest(TestCase):
         self.assertEqual([(f"/courses/{self.course.pk}/", 302)], r.redirect_chain, "Deleting valid section with correct course as supervisor fails to redirect to course page")
         self.assertNotIn(self.course, r.context["sections"], "Deleting valid section with incorrect course as supervisor fails to delete section")
 
+class AssignCandidatesTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.course = Course.objects.create(name="CS 361")
+        self.route = f"/courses/{self.course.pk}/assign/candidates/"
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        self.instructor = Account.objects.create(name="Instructor", role=Account.Role.INSTRUCTOR)
+        Account.objects.bulk_create(Account(name=f"TA {i:02}", role=Account.Role.TA) for i in range(CANDIDATES_PER_PAGE + 1))
+
+    def test_permissions(self):
+        permissions.login(self.client, self.instructor)
+        r = self.client.get(self.route)
+        self.assertEqual(403, r.status_code, "Candidates endpoint fails to load with status code 403 as instructor")
+
+    def test_pagination(self):
+        permissions.login(self.client, self.supervisor)
+        data = self.client.get(self.route, {"role": Account.Role.TA.value}).json()
+        self.assertEqual(CANDIDATES_PER_PAGE, len(data["results"]), "Candidates endpoint fails to limit results to page size")
+        self.assertTrue(data["has_next"], "Candidates endpoint fails to report next page")
+        data = self.client.get(self.route, {"role": Account.Role.TA.value, "page": 2}).json()
+        self.assertEqual(["TA 25"], [user["name"] for user in data["results"]], "Candidates endpoint fails to load second page")
+        self.assertFalse(data["has_next"], "Candidates endpoint reports nonexistent next page")
+
+    def test_prefix(self):
+        permissions.login(self.client, self.supervisor)
+        data = self.client.get(self.route, {"q": "inst"}).json()
+        self.assertEqual([{"pk": self.instructor.pk, "name": "Instructor", "role": "Instructor"}], data["results"],
+                         "Candidates endpoint fails to filter by name prefix")
+
+    def test_badParameters(self):
+        permissions.login(self.client, self.supervisor)
+        for params in [{"page": "zero"}, {"page": 0}, {"role": Account.Role.SUPERVISOR.value}, {"role": 999}]:
+            r = self.client.get(self.route, params)
+            self.assertEqual(400, r.status_code, f"Candidates endpoint fails to reject parameters {params}")
+
 class UnassignFromCourseTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -597,6 +793,90 @@ class UnassignFromCourseTest(TestCase):
         self.assertEqual([(f"/courses/{self.memberful_course.id}/", 302)], r.redirect_chain, "Course unassignment page fails to redirect to course page for memberful course")
         self.assertEqual(0, self.memberful_course.members.count(), "Course unassignment page fails to remove course membership for memberful course")
 
+class SectionMeetingsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.course = Course.objects.create(name="CS 361")
+        self.section = Section.objects.create(course=self.course, num="801")
+        self.route = f"/courses/{self.course.pk}/sections/{self.section.pk}/meetings/"
+        self.ta = Account.objects.create(name="TA", email="a@a.com", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(email="b@b.com", role=Account.Role.SUPERVISOR)
+
+    def test_permissions(self):
+        permissions.login(self.client, self.ta)
+        r = self.client.get(self.route)
+        self.assertEqual(403, r.status_code, "GETing section meetings page fails to load with status code 403 as user")
+        permissions.login(self.client, self.supervisor)
+        r = self.client.get(self.route)
+        self.assertEqual(200, r.status_code, "GETing section meetings page fails to load with status code 200 as supervisor")
+
+    def test_saveMeetings(self):
+        permissions.login(self.client, self.supervisor)
+        r = self.client.post(self.route, {"meetings": "MW 10:00-10:50"}, follow=True)
+        self.assertEqual([(f"/courses/{self.course.pk}/", 302)], r.redirect_chain, "Saving section meetings fails to redirect to course page")
+        self.assertEqual(2, self.section.meetings.count(), "Saving section meetings fails to create meetings")
+        r = self.client.get(self.route)
+        self.assertEqual("MW 10:00-10:50", r.context["meetings"], "Section meetings page fails to show current meetings")
+        r = self.client.post(self.route, {"meetings": "MW 10:00"})
+        self.assertEqual(400, r.status_code, "Saving malformed section meetings fails to load with status code 400")
+        self.assertEqual(2, self.section.meetings.count(), "Saving malformed section meetings changes meetings")
+
+    def test_assignWarning(self):
+        CourseMembership.objects.create(account=self.ta, course=self.course, sections=2)
+        taught = Section.objects.create(course=self.course, num="802", ta=self.ta)
+        SectionMeeting.objects.create(section=taught, weekday=SectionMeeting.Weekday.MONDAY, start=time(10), end=time(11))
+        SectionMeeting.objects.create(section=self.section, weekday=SectionMeeting.Weekday.MONDAY, start=time(10, 30), end=time(11))
+        permissions.login(self.client, self.supervisor)
+        r = self.client.get(f"/courses/{self.course.pk}/sections/{self.section.pk}/assign/")
+        self.assertEqual("CS 361 802", r.context["users"][0]["conflict"], "Section assignment page fails to warn about clashing TAs")
+
+class AutoAssignTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.course = Course.objects.create(name="CS 361")
+        self.route = f"/courses/{self.course.pk}/autoassign/"
+        self.supervisor = Account.objects.create(email="a@a.com", role=Account.Role.SUPERVISOR)
+        self.instructor = Account.objects.create(email="b@b.com", role=Account.Role.INSTRUCTOR)
+        self.stranger = Account.objects.create(email="c@c.com", role=Account.Role.INSTRUCTOR)
+        self.ta = Account.objects.create(name="TA", email="d@d.com", role=Account.Role.TA)
+        CourseMembership.objects.create(account=self.instructor, course=self.course)
+        CourseMembership.objects.create(account=self.ta, course=self.course, sections=2)
+        for num in ("801", "802", "803"):
+            Section.objects.create(course=self.course, num=num)
+
+    def test_permissions(self):
+        for account, route, status, description in [
+            (self.ta, self.route, 403, "course auto-assign as TA"),
+            (self.stranger, self.route, 403, "course auto-assign as instructor of another course"),
+            (self.instructor, "/courses/autoassign/", 403, "term auto-assign as instructor"),
+            (self.instructor, self.route, 200, "course auto-assign as instructor"),
+            (self.supervisor, "/courses/autoassign/", 200, "term auto-assign as supervisor"),
+        ]:
+            permissions.login(self.client, account)
+            r = self.client.get(route)
+            self.assertEqual(status, r.status_code, f"GETing {description} fails to load with status code {status}")
+
+    def test_preview(self):
+        permissions.login(self.client, self.instructor)
+        r = self.client.get(self.route)
+        self.assertEqual(2, len(r.context["assignments"]), "Auto-assign preview fails to propose assignments")
+        self.assertEqual(1, len(r.context["unfilled"]), "Auto-assign preview fails to list sections left open")
+        self.assertFalse(Section.objects.filter(ta__isnull=False).exists(), "Auto-assign preview saves assignments")
+
+    def test_commit(self):
+        permissions.login(self.client, self.instructor)
+        r = self.client.post(self.route)
+        self.assertEqual(200, r.status_code, "Auto-assign commit fails to load with status code 200")
+        self.assertEqual(2, Section.objects.filter(ta=self.ta).count(), "Auto-assign commit fails to save assignments")
+
+    def test_bySkills(self):
+        permissions.login(self.client, self.instructor)
+        r = self.client.get(self.route, {"skills": "1"})
+        self.assertTrue(r.context["by_skills"], "Auto-assign preview ignores the skills option")
+        r = self.client.post(self.route, {"skills": "1"})
+        self.assertTrue(r.context["by_skills"], "Auto-assign commit ignores the skills option")
+        self.assertEqual(2, Section.objects.filter(ta=self.ta).count(), "Skill-weighted auto-assign commit fails to save assignments")
+
 class UnassignFromSectionTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -639,4 +919,460 @@ class UnassignFromSectionTest(TestCase):
         r = self.client.post(self.assigned_route, follow=True)
         self.assertEqual([(f"/courses/{self.course.id}/", 302)], r.redirect_chain, "Section unassignment page fails to redirect to course page for assigned section")
         self.assigned_section.refresh_from_db(fields=["ta"])
-        self.assertIsNone(self.assigned_section.ta, "Section unassignment page fails to unassign section for assigned section")
\ No newline at end of file
+        self.assertIsNone(self.assigned_section.ta, "Section unassignment page fails to unassign section for assigned section")
+
+class SearchViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.route = "/search/"
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        Account.objects.bulk_create(Account(name=f"Hopper {i:02}", role=Account.Role.TA, email=f"hopper{i}@uwm.edu") \
+                                    for i in range(SEARCH_PER_PAGE + 1))
+        Course.objects.create(name="Hopper Studies")
+        search.rebuild()
+
+    def test_login(self):
+        r = self.client.get(self.route, follow=True)
+        self.assertEqual([("/login/", 302)], r.redirect_chain, "Search fails to redirect to login page when logged out")
+
+    def test_pagination(self):
+        permissions.login(self.client, self.supervisor)
+        r = self.client.get(self.route, {"q": "hopper", "type": "users"})
+        self.assertEqual(SEARCH_PER_PAGE, len(r.context["results"]), "Search fails to limit results to page size")
+        self.assertTrue(r.context["has_next"], "Search fails to report next page")
+        r = self.client.get(self.route, {"q": "hopper", "type": "users", "page": 2})
+        self.assertEqual(1, len(r.context["results"]), "Search fails to load second page")
+        self.assertFalse(r.context["has_next"], "Search reports nonexistent next page")
+
+    def test_courseAccess(self):
+        permissions.login(self.client, self.ta)
+        r = self.client.get(self.route, {"q": "hopper studies"})
+        self.assertEqual([], r.context["results"], "Search shows courses to non-members")
+        permissions.login(self.client, self.supervisor)
+        r = self.client.get(self.route, {"q": "hopper studies"})
+        self.assertEqual(["course"], [result["kind"] for result in r.context["results"]], "Search fails to show courses to supervisor")
+
+    def test_badParameters(self):
+        permissions.login(self.client, self.supervisor)
+        for params in [{"page": "zero"}, {"page": 0}, {"type": "sections"}]:
+            r = self.client.get(self.route, {"q": "hopper", **params})
+            self.assertEqual(400, r.status_code, f"Search fails to reject parameters {params}")
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.course = Course.objects.create(name="CS 361")
+        self.route = f"/courses/{self.course.pk}/"
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        CourseMembership.objects.create(account=self.ta, course=self.course)
+
+    def test_notModified(self):
+        permissions.login(self.client, self.ta)
+        etag = self.client.get(self.route)["ETag"]
+        r = self.client.get(self.route, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, r.status_code, "Course page fails to answer a matching ETag with 304")
+        # The session, the requester's role and the version stamps
+        self.assertEqual(3, r.wsgi_request.query_stats.count, "Course page runs its queries before answering 304")
+
+    def test_modified(self):
+        permissions.login(self.client, self.supervisor)
+        etag = self.client.get(self.route)["ETag"]
+        self.client.post(self.route, {"num": "801"})
+        r = self.client.get(self.route, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, r.status_code, "Course page answers 304 after a section is added")
+        self.assertNotEqual(etag, r["ETag"], "Course page keeps its ETag after a section is added")
+
+    def test_perRequester(self):
+        permissions.login(self.client, self.supervisor)
+        etag = self.client.get(self.route)["ETag"]
+        permissions.login(self.client, self.ta)
+        r = self.client.get(self.route, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, r.status_code, "Course page answers 304 to another requester's ETag")
+
+    def test_accessStillChecked(self):
+        permissions.login(self.client, self.ta)
+        etag = self.client.get(self.route)["ETag"]
+        self.client.logout()
+        r = self.client.get(self.route, HTTP_IF_NONE_MATCH=etag, follow=True)
+        self.assertEqual([("/login/", 302)], r.redirect_chain, "Course page answers 304 without a login")
+        permissions.login(self.client, self.ta)
+        CourseMembership.objects.filter(account=self.ta).delete()
+        versions.bump_courses(self.course.pk)
+        r = self.client.get(self.route, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(403, r.status_code, "Course page answers 304 after access is revoked")
+
+    def test_ifModifiedSince(self):
+        # Stamps are only published as Last-Modified once their second has passed
+        VersionStamp.objects.bulk_create([VersionStamp(scope=versions.COURSES, stamp=10**18), VersionStamp(scope=versions.ACCOUNTS, stamp=10**18)],
+                                         update_conflicts=True, unique_fields=["scope"], update_fields=["stamp"])
+        permissions.login(self.client, self.ta)
+        last_modified = self.client.get("/courses/")["Last-Modified"]
+        r = self.client.get("/courses/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(304, r.status_code, "Courses list fails to answer an unchanged If-Modified-Since with 304")
+        courses.create("CS 362")
+        r = self.client.get("/courses/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(200, r.status_code, "Courses list answers 304 after a course is created")
+
+class FragmentCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.course = Course.objects.create(name="CS 361")
+        self.route = f"/courses/{self.course.pk}/"
+        self.ta = Account.objects.create(name="Alice", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        CourseMembership.objects.create(account=self.ta, course=self.course)
+        self.section = Section.objects.create(course=self.course, num="801")
+
+    def section_queries(self, r) -> list[str]:
+        return [sql for sql, _ in r.wsgi_request.query_stats.queries if f'FROM "{Section._meta.db_table}"' in sql]
+
+    def test_coursePageCached(self):
+        permissions.login(self.client, self.ta)
+        self.assertTrue(self.section_queries(self.client.get(self.route)), "Course page fails to load sections on first render")
+        r = self.client.get(self.route)
+        self.assertEqual([], self.section_queries(r), "Course page reloads sections despite a cached fragment")
+        self.assertContains(r, "801", msg_prefix="Course page fails to render cached sections")
+
+    def test_invalidatedOnAssign(self):
+        permissions.login(self.client, self.ta)
+        self.client.get(self.route)
+        sections.assign(self.section, self.ta)
+        self.assertContains(self.client.get(self.route), f'<a href="/users/{self.ta.pk}/">Alice</a>',
+                            msg_prefix="Course page serves a stale fragment after a TA is assigned")
+
+    def test_writeOnAnotherWorker(self):
+        permissions.login(self.client, self.ta)
+        self.client.get(self.route)
+        self.client.get("/")
+        # Each worker has a locmem cache of its own, and only the database is shared
+        with override_settings(CACHES={"default": {**settings.CACHES["default"], "LOCATION": "another-worker"}}):
+            sections.create(self.course, "802")
+        self.assertContains(self.client.get(self.route), "802", msg_prefix="Course page serves a stale fragment after another worker's write")
+        self.assertContains(self.client.get("/"), "802", msg_prefix="Homepage serves stale rows after another worker's write")
+
+    def test_roleVariants(self):
+        permissions.login(self.client, self.supervisor)
+        self.assertContains(self.client.get(self.route), "delete this section", msg_prefix="Course page hides supervisor tools")
+        permissions.login(self.client, self.ta)
+        self.assertNotContains(self.client.get(self.route), "delete this section",
+                               msg_prefix="Course page serves the supervisor fragment to a TA")
+
+    def test_homepageCached(self):
+        permissions.login(self.client, self.ta)
+        self.assertTrue(self.section_queries(self.client.get("/")), "Homepage fails to load sections on first render")
+        r = self.client.get("/")
+        self.assertEqual([], self.section_queries(r), "Homepage reloads sections despite cached rows")
+        self.assertContains(r, "801", msg_prefix="Homepage fails to render cached rows")
+        sections.create(self.course, "802")
+        self.assertContains(self.client.get("/"), "802", msg_prefix="Homepage serves stale rows after a section is added")
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        # urls.py picks its page views on import, so it is reloaded around the setting
+        self.addCleanup(self.reload_urls)
+        self.enterContext(override_settings(ASYNC_VIEWS=True))
+        self.reload_urls()
+
+        cache.clear()
+        self.async_client = AsyncClient()
+        self.course = Course.objects.create(name="CS 361")
+        self.route = f"/courses/{self.course.pk}/"
+        self.ta = Account.objects.create(name="Alice", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        CourseMembership.objects.create(account=self.ta, course=self.course)
+        Section.objects.create(course=self.course, num="801", ta=self.ta)
+
+    def reload_urls(self):
+        importlib.reload(urls)
+        clear_url_caches()
+
+    def test_routed(self):
+        for route, view in [("/", async_views.HomepageView), ("/users/", async_views.ListUsersView),
+                            ("/courses/", async_views.ListCoursesView), (self.route, async_views.ViewCourseView),
+                            ("/courses/export/", async_views.ExportScheduleView)]:
+            self.assertIs(view, resolve(route).func.view_class, f"{route} fails to use its async view")
+
+    async def test_pages(self):
+        await sync_to_async(permissions.login)(self.async_client, self.ta)
+        for route, text in [("/", "801"), ("/users/", "Alice"), ("/courses/", "CS 361"), (self.route, "Alice")]:
+            r = await self.async_client.get(route)
+            self.assertEqual(200, r.status_code, f"Async {route} fails to load with status code 200")
+            self.assertIn(text, r.content.decode(), f"Async {route} fails to show {text}")
+
+    async def test_cachedFragments(self):
+        await sync_to_async(permissions.login)(self.async_client, self.ta)
+        first = await self.async_client.get(self.route)
+        second = await self.async_client.get(self.route)
+        for text in ["801", "Alice"]:
+            self.assertIn(text, second.content.decode(), f"Async course page drops {text} from its cached fragments")
+        self.assertLess(second.asgi_request.query_stats.count, first.asgi_request.query_stats.count,
+                        "Async course page reloads sections and members for cached fragments")
+
+    async def test_streamsExport(self):
+        await sync_to_async(permissions.login)(self.async_client, self.supervisor)
+        r = await self.async_client.get("/courses/export/", {"format": "jsonl"})
+        self.assertTrue(r.is_async, "Async schedule export streams from a sync iterator, which ASGI reads whole first")
+        rows = [json.loads(line) async for line in r.streaming_content]
+        self.assertEqual([("CS 361", "801", "Alice")], [(row["course"], row["section"], row["ta"]) for row in rows],
+                         "Async schedule export fails to write one row per section")
+
+    async def test_evictedFragments(self):
+        # A fragment evicted between the lookup and the render must not be cached again from the data skipped for it
+        fetch = async_views.acached
+        async def fetch_then_evict(fragments):
+            found = await fetch(fragments)
+            await cache.aclear()
+            return found
+
+        await sync_to_async(permissions.login)(self.async_client, self.ta)
+        for route, text in [("/", "801"), (self.route, "801"), (self.route, "Alice")]:
+            await self.async_client.get(route)
+            with mock.patch.object(async_views, "acached", fetch_then_evict):
+                evicted = await self.async_client.get(route)
+            self.assertIn(text, evicted.content.decode(), f"Async {route} drops {text} when its fragment is evicted mid-request")
+            r = await self.async_client.get(route)
+            self.assertIn(text, r.content.decode(), f"Async {route} caches an empty fragment after an eviction")
+
+    async def test_permissions(self):
+        r = await self.async_client.get(self.route)
+        self.assertEqual(302, r.status_code, "Async course page fails to redirect to login while logged out")
+        await sync_to_async(permissions.login)(self.async_client, self.supervisor)
+        r = await self.async_client.post(self.route, {"num": "802"})
+        self.assertEqual(200, r.status_code, "Async course page fails to create a section")
+        self.assertTrue(await Section.objects.filter(course=self.course, num="802").aexists(), "Async course page fails to save a section")
+
+@override_settings(CACHE_REQUESTERS=True)
+class CacheStatsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.route = "/cache/stats/"
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+
+    def test_counters(self):
+        permissions.login(self.client, self.supervisor)
+        self.client.post(self.route)
+        self.client.get("/courses/")
+        stats = self.client.get(self.route).json()
+        self.assertEqual("LocMemCache", stats["backend"], "Cache stats fail to report the configured backend")
+        # The stats request looks up its requester too
+        self.assertEqual(2, stats["namespaces"]["requester"]["hits"], "Cache stats fail to count requester lookups")
+        self.assertIn("plan", stats["namespaces"], "Cache stats fail to list every namespace")
+
+    def test_reset(self):
+        permissions.login(self.client, self.supervisor)
+        self.client.get("/courses/")
+        stats = self.client.post(self.route).json()
+        self.assertEqual(0, stats["namespaces"]["requester"]["hits"], "Cache stats fail to reset counters")
+
+    def test_supervisorOnly(self):
+        self.assertEqual(401, self.client.get(self.route).status_code, "Cache stats are shown without a login")
+        permissions.login(self.client, self.ta)
+        self.assertEqual(403, self.client.get(self.route).status_code, "Cache stats are shown to a TA")
+
+class APITest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA, phone="555-0100")
+        self.course = Course.objects.create(name="CS 361")
+        self.other_course = Course.objects.create(name="CS 999")
+        CourseMembership.objects.create(account=self.ta, course=self.course)
+        self.section = Section.objects.create(course=self.course, num="801", ta=self.ta)
+        Section.objects.create(course=self.other_course, num="801")
+        SectionMeeting.objects.create(section=self.section, weekday=SectionMeeting.Weekday.MONDAY, start=time(10), end=time(10, 50))
+
+    def test_login(self):
+        r = self.client.get("/api/v1/courses/")
+        self.assertEqual(401, r.status_code, "API fails to respond with status code 401 when logged out")
+
+    def test_index(self):
+        endpoints = {endpoint["path"]: endpoint for endpoint in self.client.get("/api/v1/").json()["endpoints"]}
+        self.assertEqual(4, endpoints["/api/v1/sections/"]["query_budget"], "API index fails to publish query budgets")
+        self.assertEqual(["course", "ta", "meetings"], endpoints["/api/v1/sections/"]["expand"], "API index fails to list expansions")
+
+    def test_courseAccess(self):
+        permissions.login(self.client, self.ta)
+        data = self.client.get("/api/v1/courses/").json()
+        self.assertEqual([self.course.pk], [course["id"] for course in data["results"]], "Courses API shows courses to non-members")
+        r = self.client.get(f"/api/v1/courses/{self.other_course.pk}/")
+        self.assertEqual(404, r.status_code, "Course API fails to hide courses from non-members")
+        data = self.client.get("/api/v1/sections/").json()
+        self.assertEqual([self.section.pk], [section["id"] for section in data["results"]], "Sections API shows sections of other courses")
+
+    def test_expand(self):
+        permissions.login(self.client, self.ta)
+        data = self.client.get("/api/v1/sections/", {"fields": "num", "expand": "ta,meetings"}).json()
+        self.assertEqual([{
+            "num": "801",
+            "ta": {"id": self.ta.pk, "name": "TA", "role": "TA", "email": "", "office_hours": ""},
+            "meetings": [{"weekday": "Monday", "start": "10:00", "end": "10:50"}],
+        }], data["results"], "Sections API fails to select fields and expand relations")
+
+    def test_pagination(self):
+        permissions.login(self.client, self.supervisor)
+        data = self.client.get("/api/v1/accounts/", {"limit": 1}).json()
+        self.assertEqual(["Supervisor"], [account["name"] for account in data["results"]], "Accounts API fails to limit page size")
+        data = self.client.get("/api/v1/accounts/", {"limit": 1, "cursor": data["next"]}).json()
+        self.assertEqual((["TA"], None), ([account["name"] for account in data["results"]], data["next"]),
+                         "Accounts API fails to follow the cursor to the last page")
+
+    def test_filters(self):
+        permissions.login(self.client, self.supervisor)
+        data = self.client.get("/api/v1/memberships/", {"account": self.ta.pk}).json()
+        self.assertEqual([self.course.pk], [membership["course"] for membership in data["results"]], "Memberships API fails to filter by account")
+        data = self.client.get("/api/v1/accounts/", {"role": Account.Role.TA.value}).json()
+        self.assertEqual(["TA"], [account["name"] for account in data["results"]], "Accounts API fails to filter by role")
+
+    def test_privateFields(self):
+        permissions.login(self.client, self.ta)
+        r = self.client.get(f"/api/v1/accounts/{self.supervisor.pk}/", {"fields": "phone"})
+        self.assertEqual(400, r.status_code, "Account API shows private fields to other users")
+        data = self.client.get(f"/api/v1/accounts/{self.ta.pk}/", {"fields": "phone"}).json()
+        self.assertEqual({"phone": "555-0100"}, data, "Account API hides private fields from their owner")
+
+    def test_badParameters(self):
+        permissions.login(self.client, self.supervisor)
+        for route, params in [("/api/v1/courses/", {"fields": "instructor"}), ("/api/v1/courses/", {"expand": "ta"}),
+                              ("/api/v1/accounts/", {"limit": 0}), ("/api/v1/accounts/", {"cursor": "!"}),
+                              ("/api/v1/sections/", {"course": "CS 361"})]:
+            r = self.client.get(route, params)
+            self.assertEqual(400, r.status_code, f"API fails to reject parameters {params} on {route}")
+
+# Query budgets
+
+def seed_department(size: int, prefix: str = "") -> dict[str, Any]:
+    supervisor = Account.objects.create(name=f"{prefix}Supervisor", role=Account.Role.SUPERVISOR,
+                                        email=f"{prefix}supervisor@uwm.edu", password="supervisor")
+    instructor = Account.objects.create(name=f"{prefix}Instructor", role=Account.Role.INSTRUCTOR,
+                                        email=f"{prefix}instructor@uwm.edu", password="instructor")
+    tas = [Account.objects.create(name=f"{prefix}TA {i}", role=Account.Role.TA,
+                                  email=f"{prefix}ta{i}@uwm.edu", password="ta") for i in range(size)]
+    course_list = []
+
+    for i in range(size):
+        course = Course.objects.create(name=f"{prefix}CS {i}")
+        CourseMembership.objects.create(account=instructor, course=course)
+        for ta in tas:
+            CourseMembership.objects.create(account=ta, course=course, sections=size)
+        for j in range(size):
+            Section.objects.create(course=course, num=f"{j:03}", ta=tas[j] if j % 2 else None)
+        course_list.append(course)
+
+    return {
+        "supervisor": supervisor,
+        "instructor": instructor,
+        "tas": tas,
+        "courses": course_list,
+        "sections": list(course_list[0].sections.all()),
+    }
+
+def assert_query_budget(self: TransactionTestCase, account: Union[Account, None], method: str, route: str, data: dict[str, Any] = None) -> QueryStats:
+    # Budgets are for a cold cache, so a request can't pass by reusing what an earlier one computed,
+    # and logging in doesn't leave the requester cached either. They are also for production's transactions,
+    # which TestCase would turn into savepoints inside its own.
+    self.assertFalse(connection.in_atomic_block, "Query budgets are checked inside a test transaction")
+    client = Client()
+    if account is not None:
+        permissions.login(client, account)
+    cache.clear()
+
+    r = getattr(client, method)(route, data or {})
+    stats = r.wsgi_request.query_stats
+    self.assertIsNotNone(stats.budget, f"{method.upper()} {route} has no declared query budget")
+    self.assertLessEqual(stats.count, stats.budget, f"{method.upper()} {stats}")
+    return stats
+
+class QueryBudgetTest(TransactionTestCase):
+    def get_requests(self, department: dict[str, Any], prefix: str) -> list[tuple[Union[Account, None], str, str, dict[str, Any]]]:
+        supervisor, instructor, ta = department["supervisor"], department["instructor"], department["tas"][0]
+        course, other_course = department["courses"][0], department["courses"][-1]
+        assigned_section, unassigned_section = department["sections"][1], department["sections"][0]
+
+        return [
+            (None, "get", "/login/", {}),
+            (None, "post", "/login/", {"email": supervisor.email, "password": supervisor.password}),
+            (instructor, "post", "/logout/", {}),
+            (ta, "get", "/", {}),
+            (instructor, "get", "/", {}),
+            (supervisor, "get", "/", {}),
+            (ta, "get", "/users/", {}),
+            (supervisor, "get", "/users/", {}),
+            (ta, "get", "/courses/", {}),
+            (ta, "get", "/search/", {"q": f"{prefix}CS"}),
+            (supervisor, "get", "/cache/stats/", {}),
+            (supervisor, "post", "/cache/stats/", {}),
+            (None, "get", "/api/v1/", {}),
+            (ta, "get", "/api/v1/courses/", {"expand": "sections,memberships"}),
+            (supervisor, "get", f"/api/v1/courses/{course.pk}/", {"expand": "sections,memberships"}),
+            (instructor, "get", "/api/v1/sections/", {"expand": "course,ta,meetings"}),
+            (supervisor, "get", "/api/v1/memberships/", {"expand": "course,account", "course": course.pk}),
+            (ta, "get", "/api/v1/accounts/", {"limit": 2, "cursor": "MQ=="}),
+            (ta, "get", f"/api/v1/accounts/{ta.pk}/", {}),
+            (supervisor, "get", "/search/", {"q": f"{prefix}TA", "type": "users", "page": "2"}),
+            (supervisor, "get", "/courses/", {}),
+            (instructor, "get", f"/users/{ta.pk}/", {}),
+            (supervisor, "post", f"/users/{ta.pk}/", {"name": f"{prefix}Renamed"}),
+            (supervisor, "get", "/users/create/", {}),
+            (supervisor, "post", "/users/create/", {"name": "New", "role": Account.Role.TA.value,
+                                                    "email": f"{prefix}new@uwm.edu", "password": "new"}),
+            (supervisor, "get", "/users/import/", {}),
+            (supervisor, "post", "/users/import/", {"accounts": SimpleUploadedFile("users.csv", (
+                f"name,role,email,password\nImported,2,{prefix}imported@uwm.edu,pw\nTaken,2,{ta.email},pw\n"
+            ).encode())}),
+            (supervisor, "get", "/courses/import/", {}),
+            (supervisor, "post", "/courses/import/", {"roster": SimpleUploadedFile("roster.json", json.dumps([
+                {"name": f"{prefix}CS 900", "sections": ["801", "802"], "members": [instructor.email, ta.email]},
+                {"name": f"{prefix}CS 901", "sections": ["801"], "members": [{"email": ta.email, "grader": True}]},
+            ]).encode())}),
+            (supervisor, "get", "/courses/export/", {"format": "jsonl"}),
+            (supervisor, "get", "/courses/create/", {}),
+            (supervisor, "post", "/courses/create/", {"name": f"{prefix}CS 999"}),
+            (ta, "get", f"/courses/{course.pk}/", {}),
+            (instructor, "get", f"/courses/{course.pk}/", {}),
+            (supervisor, "get", f"/courses/{course.pk}/", {}),
+            (supervisor, "post", f"/courses/{course.pk}/", {"num": f"{prefix}999"}),
+            (supervisor, "get", f"/courses/{course.pk}/edit/", {}),
+            (supervisor, "post", f"/courses/{course.pk}/edit/", {"name": f"{prefix}CS 998"}),
+            (supervisor, "get", f"/courses/{course.pk}/assign/", {}),
+            (supervisor, "post", f"/courses/{course.pk}/assign/", {"user": instructor.pk, "sections": "1"}),
+            (supervisor, "get", f"/courses/{course.pk}/assign/candidates/", {"q": prefix, "role": Account.Role.TA.value}),
+            (supervisor, "get", f"/courses/{course.pk}/membership/{ta.pk}/", {}),
+            (supervisor, "post", f"/courses/{course.pk}/membership/{ta.pk}/", {"grader": "", "sections": "3"}),
+            (instructor, "get", f"/courses/{course.pk}/sections/{unassigned_section.pk}/assign/", {}),
+            (instructor, "post", f"/courses/{course.pk}/sections/{assigned_section.pk}/assign/", {"user": ta.pk}),
+            (instructor, "post", f"/courses/{course.pk}/sections/{unassigned_section.pk}/assign/", {"user": ta.pk}),
+            (instructor, "post", f"/courses/{course.pk}/sections/{assigned_section.pk}/unassign/", {}),
+            (supervisor, "get", f"/courses/{course.pk}/sections/{unassigned_section.pk}/meetings/", {}),
+            (supervisor, "post", f"/courses/{course.pk}/sections/{assigned_section.pk}/meetings/", {"meetings": "MW 10:00-10:50"}),
+            (supervisor, "post", f"/courses/{course.pk}/sections/{unassigned_section.pk}/delete/", {}),
+            (supervisor, "post", f"/courses/{course.pk}/unassign/{ta.pk}/", {}),
+            (supervisor, "get", "/courses/autoassign/", {}),
+            (instructor, "get", f"/courses/{course.pk}/autoassign/", {"skills": "1"}),
+            (supervisor, "post", f"/courses/{other_course.pk}/autoassign/", {}),
+            (supervisor, "post", f"/courses/{other_course.pk}/delete/", {}),
+            (supervisor, "post", f"/users/{department['tas'][-1].pk}/delete/", {}),
+        ]
+
+    def test_budgetsHold(self):
+        small = self.get_requests(seed_department(2, "small-"), "small-")
+        large = self.get_requests(seed_department(6, "large-"), "large-")
+
+        for (account, method, route, data), large_request in zip(small, large):
+            with self.subTest(method=method, route=route):
+                small_stats = assert_query_budget(self, account, method, route, data)
+                large_stats = assert_query_budget(self, *large_request)
+                self.assertEqual(small_stats.count, large_stats.count,
+                                 f"{method.upper()} {large_stats} grows with dataset size (was {small_stats.count})")
+
+    def test_coldRequesterBudgets(self):
+        ta = Account.objects.create(name="TA", role=Account.Role.TA, email="ta@ta.ta")
+        supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR, email="supervisor@uwm.edu")
+        for shared in (True, False):
+            with self.subTest(shared=shared), self.settings(CACHE_REQUESTERS=shared):
+                assert_query_budget(self, ta, "get", f"/users/{supervisor.pk}/")
+                assert_query_budget(self, supervisor, "post", f"/users/{ta.pk}/", {"name": "Renamed", "email": f"renamed{shared}@ta.ta"})
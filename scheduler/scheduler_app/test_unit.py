@@ -1,11 +1,35 @@
-from typing import Any, Union
+import io
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+from typing import Any, Callable, Union
+from unittest import mock
 
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.db.models import F
 from django.forms.models import model_to_dict
-from django.http.response import HttpResponseForbidden
-from django.test import Client, TestCase
+from django.http.response import HttpResponse, HttpResponseForbidden
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from .classes import courses, permissions, sections, users
-from .models import Account, Course, CourseMembership, Section
+from scheduler import urls
+
+from .classes import cache as app_cache, courses, exports, imports, permissions, resources, scheduling, search, sections, sessions, users, versions
+from . import database, dataset
+from .management.commands import loadtest
+from .middleware import QueryStats, ReplicaMiddleware
+from .models import Account, Course, CourseMembership, Section, SectionMeeting, VersionStamp
 
 # Model methods
 
@@ -47,6 +71,57 @@ class ListCoursesTest(TestCase):
         self.assertIn(self.accessible_course, supervisor_courses, "Get courses function fails to include accessible course for supervisor")
         self.assertIn(self.inaccessible_course, supervisor_courses, "Get courses function does not include inaccessible course for supervisor")
 
+class CourseAccessTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CS 361")
+        self.other_course = Course.objects.create(name="CS 395")
+        self.user = Account.objects.create(role=Account.Role.TA)
+        self.supervisor = Account.objects.create(role=Account.Role.SUPERVISOR)
+        CourseMembership.objects.create(account=self.user, course=self.course)
+
+    def test_memberAccess(self):
+        self.assertTrue(courses.has_access(self.user, self.course), "Course access check denies course member")
+        self.assertFalse(courses.has_access(self.user, self.other_course.pk), "Course access check allows non-member")
+
+    def test_supervisorAccess(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(courses.has_access(self.supervisor, self.other_course), "Course access check denies supervisor")
+
+    def test_memoized(self):
+        requester = permissions.get_requester(self.user.pk)
+        with self.assertNumQueries(1):
+            courses.has_access(requester, self.course)
+            courses.has_access(requester, self.course.pk)
+
+class DashboardTest(TestCase):
+    def setUp(self):
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA)
+        self.course = Course.objects.create(name="CS 361")
+        self.empty_course = Course.objects.create(name="CS 395")
+        self.other_course = Course.objects.create(name="CS 520")
+        for course in [self.course, self.empty_course]:
+            CourseMembership.objects.create(account=self.ta, course=course)
+        self.sections = [Section.objects.create(course=self.course, num="802"),
+                         Section.objects.create(course=self.course, num="801", ta=self.ta)]
+        Section.objects.create(course=self.other_course, num="801")
+
+    def test_sectionsAndCounts(self):
+        dashboard = list(courses.dashboard(self.ta))
+        self.assertEqual([self.course, self.empty_course], dashboard, "Dashboard fails to list the user's courses")
+        self.assertEqual([2, 0], [course.section_count for course in dashboard], "Dashboard miscounts course sections")
+        self.assertEqual(self.sections[::-1], dashboard[0].section_list, "Dashboard fails to load course sections in order")
+
+    def test_fixedQueries(self):
+        with self.assertNumQueries(2):
+            [section.ta for course in courses.dashboard(self.ta) for section in course.section_list]
+
+    def test_sectionsLoadLazily(self):
+        with self.assertNumQueries(1, msg="Dashboard loads sections before any course's rows are rendered"):
+            dashboard = courses.dashboard(self.ta)
+        self.assertNotEqual(dashboard[0].version, dashboard[1].version, "Dashboard fails to version each course separately")
+        sections.unassign(self.sections[1])
+        self.assertNotEqual(dashboard[0].version, courses.dashboard(self.ta)[0].version, "Dashboard version ignores section changes")
+
 class CreateCourseTest(TestCase):
     def setUp(self):
         self.user = Account.objects.create(role=Account.Role.TA)
@@ -101,6 +176,11 @@ class ViewCourseTest(TestCase):
         self.assertEqual(0, len(errors), "Section creation function fails to create valid section without errors")
         self.assertEqual(1, sections.count(num), "Section creation function fails to create valid section")
 
+    def test_sameNumOtherCourse(self):
+        errors = sections.create(self.inaccessible_course, self.section.num)
+        self.assertEqual(0, len(errors), "Section creation function rejects number used only in another course")
+        self.assertEqual(2, sections.count(self.section.num), "Section creation function fails to create section with number used in another course")
+
 class AssignToCourseTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -131,6 +211,11 @@ class AssignToCourseTest(TestCase):
         courses.assign(self.course, self.ta)
         self.assertEqual(1, len(courses.assign(self.course, self.ta)), msg="assigned same TA to course when it should not have")
 
+    def test_uniqueMembership(self):
+        CourseMembership.objects.create(account=self.ta, course=self.course)
+        with self.assertRaises(IntegrityError, msg="database allows duplicate course membership"):
+            CourseMembership.objects.create(account=self.ta, course=self.course)
+
     def test_noCourse(self):
         self.assertEqual(1, len(courses.assign(None, self.inst)), msg="somehow assigned a ta to no course")
 
@@ -142,6 +227,67 @@ class AssignToCourseTest(TestCase):
         self.assertEqual(1, len(courses.assign(self.course, supervisor)), msg="user is not a TA or instructor and cannot be assigned")
       
 
+class CourseCandidatesTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CS 361")
+        self.member = Account.objects.create(name="Alice", role=Account.Role.TA)
+        self.ta = Account.objects.create(name="Albert", role=Account.Role.TA)
+        self.instructor = Account.objects.create(name="Bob", role=Account.Role.INSTRUCTOR)
+        Account.objects.create(name="Alan", role=Account.Role.SUPERVISOR)
+        CourseMembership.objects.create(account=self.member, course=self.course)
+
+    def test_excludesMembersAndSupervisors(self):
+        self.assertEqual([self.ta.pk, self.instructor.pk], [row["pk"] for row in courses.candidates(self.course)],
+                         "Course candidates function fails to exclude course members and supervisors")
+
+    def test_filters(self):
+        self.assertEqual([self.ta.pk], [row["pk"] for row in courses.candidates(self.course, "al")],
+                         "Course candidates function fails to filter by name prefix")
+        self.assertEqual([self.instructor.pk], [row["pk"] for row in courses.candidates(self.course, role=Account.Role.INSTRUCTOR)],
+                         "Course candidates function fails to filter by role")
+
+class ImportRosterTest(TestCase):
+    def setUp(self):
+        self.instructor = Account.objects.create(name="Instructor", role=Account.Role.INSTRUCTOR, email="instructor@uwm.edu")
+        self.other_instructor = Account.objects.create(name="Other", role=Account.Role.INSTRUCTOR, email="other@uwm.edu")
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA, email="ta@uwm.edu")
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR, email="supervisor@uwm.edu")
+        Course.objects.create(name="CS 250")
+        self.roster = [
+            {"name": "CS 361", "sections": ["801", "802"],
+             "members": ["instructor@uwm.edu", {"email": "ta@uwm.edu", "grader": True, "sections": 2}]},
+            {"name": "CS 395", "description": "Capstone", "sections": [], "members": ["other@uwm.edu", "ta@uwm.edu"]},
+        ]
+
+    def test_importsRoster(self):
+        created, errors = courses.import_roster(self.roster)
+        self.assertEqual([], errors, "Roster import function produces errors for a valid roster")
+        self.assertEqual(2, created, "Roster import function fails to report created courses")
+        course = Course.objects.get(name="CS 361")
+        self.assertEqual(["801", "802"], sorted(course.sections.values_list("num", flat=True)),
+                         "Roster import function fails to create sections")
+        membership = CourseMembership.objects.get(course=course, account=self.ta)
+        self.assertEqual((True, 2), (membership.grader, membership.sections), "Roster import function fails to assign member flags")
+        self.assertEqual("Capstone", Course.objects.get(name="CS 395").description, "Roster import function fails to assign description")
+
+    def test_rejectsInvalidRoster(self):
+        self.roster[0]["members"] += ["other@uwm.edu", "ta@uwm.edu", "supervisor@uwm.edu", "nobody@uwm.edu"]
+        self.roster[0]["sections"].append("801")
+        self.roster[1]["name"] = "CS 250"
+        created, errors = courses.import_roster(self.roster)
+        self.assertEqual(0, created, "Roster import function reports courses created from an invalid roster")
+        self.assertEqual(6, len(errors), "Roster import function fails to report every problem in the roster")
+        self.assertEqual(1, Course.objects.count(), "Roster import function writes part of an invalid roster")
+
+    def test_boundedQueries(self):
+        roster = [{"name": f"CS {i}", "sections": ["801"], "members": ["instructor@uwm.edu", "ta@uwm.edu"]} for i in range(10)]
+        with CaptureQueriesContext(connection) as context:
+            courses.import_roster(roster)
+        statements = [query["sql"].split()[0] for query in context.captured_queries]
+        self.assertEqual(2, statements.count("SELECT"), "Roster import function looks up courses or accounts per entry")
+        # Courses, sections and memberships, then the version stamps
+        self.assertEqual(4, statements.count("INSERT"), "Roster import function fails to insert in bulk")
+
 class UnassignFromCourseTest(TestCase):
     def setUp(self):
         self.memberless_course = Course.objects.create()
@@ -227,6 +373,114 @@ class PermissionsCheckerTest(TestCase):
         r = self.user_view(self.client)
         self.assertEqual("/login/", r.url, "Requesting check_permissions view when logged into deleted account fails to redirect to login page")
 
+@override_settings(CACHE_REQUESTERS=True)
+class RequesterCacheTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = Account.objects.create(name="TA", role=Account.Role.TA)
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        permissions.login(self.client, self.user)
+
+    def test_cachedAfterLogin(self):
+        with self.assertNumQueries(0):
+            requester = permissions.get_requester(self.user.pk)
+        self.assertEqual((self.user.pk, Account.Role.TA, "TA"), (requester.pk, requester.role, requester.name),
+                         "Requester cache fails to return logged-in account identity")
+
+    def test_loadsOnMiss(self):
+        cache.clear()
+        with self.assertNumQueries(1):
+            permissions.get_requester(self.user.pk)
+        with self.assertNumQueries(0):
+            permissions.get_requester(self.user.pk)
+
+    def test_invalidatedOnEdit(self):
+        users.edit(self.supervisor, self.user, {"name": "Renamed", "role": Account.Role.INSTRUCTOR.value})
+        requester = permissions.get_requester(self.user.pk)
+        self.assertEqual(("Renamed", Account.Role.INSTRUCTOR), (requester.name, requester.role),
+                         "Requester cache serves stale identity after user edit")
+
+    def test_invalidatedOnDelete(self):
+        pk = self.user.pk
+        users.delete(self.user)
+        self.assertIsNone(permissions.get_requester(pk), "Requester cache serves deleted account")
+
+    def test_uncachedPerProcess(self):
+        # update() skips the signal that forgets the identity, as a save on another worker would with locmem
+        Account.objects.filter(pk=self.user.pk).update(role=Account.Role.SUPERVISOR)
+        with self.settings(CACHE_REQUESTERS=False):
+            self.assertEqual(Account.Role.SUPERVISOR, permissions.get_requester(self.user.pk).role,
+                             "Requester lookup serves a cached role without a shared cache")
+            cache.clear()
+            permissions.login(self.client, self.user)
+            permissions.get_requester(self.user.pk)
+            self.assertIsNone(cache.get(permissions.REQUESTERS.key(self.user.pk)), "Requester lookup caches identities without a shared cache")
+
+class VersionsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA)
+        self.course = Course.objects.create(name="CS 361")
+        self.scopes = [versions.course(self.course.pk), versions.COURSES, versions.account(self.ta.pk), versions.ACCOUNTS]
+
+    def test_stable(self):
+        with self.assertNumQueries(2, msg="Version stamps take more than one query to read"):
+            self.assertEqual(versions.get(self.scopes), versions.get(self.scopes), "Version stamps change without a write")
+
+    def test_sharedBetweenWorkers(self):
+        versions.bump_courses(self.course.pk)
+        stamps = versions.get(self.scopes)
+        # Another worker has a locmem cache of its own, but the same database
+        cache.clear()
+        self.assertEqual(stamps, versions.get(self.scopes), "Version stamps are only visible to the worker that bumped them")
+
+    def test_courseWrites(self):
+        for write in [lambda: courses.edit(self.course, {"name": "CS 362"}),
+                      lambda: courses.assign(self.course, self.ta),
+                      lambda: sections.create(self.course, "801"),
+                      lambda: sections.assign(self.course.sections.get(), self.ta),
+                      lambda: sections.set_meetings(self.course.sections.get(), "MW 10:00-10:50"),
+                      lambda: sections.unassign(self.course.sections.get()),
+                      lambda: sections.delete(self.course.sections.get()),
+                      lambda: courses.unassign(self.course, self.ta)]:
+            course, table, account, accounts = versions.get(self.scopes)
+            write()
+            new_course, new_table, new_account, new_accounts = versions.get(self.scopes)
+            self.assertTrue(new_course > course and new_table > table, "Course writes fail to bump the course version")
+            self.assertEqual((account, accounts), (new_account, new_accounts), "Course writes bump account versions")
+
+    def test_accountWrites(self):
+        course, table, account, accounts = versions.get(self.scopes)
+        users.edit(self.supervisor, self.ta, {"name": "Renamed"})
+        new_course, new_table, new_account, new_accounts = versions.get(self.scopes)
+        self.assertTrue(new_account > account and new_accounts > accounts, "Account edits fail to bump the account version")
+        self.assertEqual((course, table), (new_course, new_table), "Account edits bump course versions")
+
+    def test_autoassign(self):
+        CourseMembership.objects.create(account=self.ta, course=self.course)
+        Section.objects.create(course=self.course, num="801")
+        stamp = versions.get(self.scopes)[0]
+        scheduling.commit(self.course)
+        self.assertGreater(versions.get(self.scopes)[0], stamp, "Auto-assign fails to bump the versions of courses it fills")
+
+class AtomicBumpTest(TransactionTestCase):
+    # Under autocommit, a write whose bump fails must not be left committed behind a stamp that never moved
+    def test_writeRolledBack(self):
+        def fail(*scopes):
+            raise RuntimeError("Bump failed")
+
+        course = Course.objects.create(name="CS 361")
+        with mock.patch.object(versions, "bump", fail):
+            for write in [lambda: courses.create("CS 395"), lambda: courses.edit(course, {"name": "CS 362"}),
+                          lambda: sections.create(course, "801"), lambda: users.create(
+                              {"name": "TA", "role": "2", "email": "ta@uwm.edu", "password": "password"})]:
+                with self.assertRaises(RuntimeError):
+                    write()
+        self.assertEqual(["CS 361"], list(Course.objects.values_list("name", flat=True)), "Course write commits without its bump")
+        self.assertFalse(Section.objects.exists(), "Section write commits without its bump")
+        self.assertFalse(Account.objects.exists(), "Account write commits without its bump")
+
 class LoginTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -281,6 +535,37 @@ class DetailsLoginTest(TestCase):
         self.assertEqual(0, len(errors), "Details login function produces error when given right details")
         self.assertFalse(invalid_login, "Details login function says right details are invalid login")
 
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class PasswordHashingTest(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create(role=Account.Role.TA, email="ta@uwm.edu", password="password")
+
+    def test_rehashesPlaintext(self):
+        self.assertEqual(self.account, permissions.authenticate("ta@uwm.edu", "password"), "Authentication fails for unhashed password")
+        self.account.refresh_from_db()
+        self.assertTrue(permissions.is_hashed(self.account.password), "Authentication fails to hash unhashed password")
+        self.assertTrue(check_password("password", self.account.password), "Authentication stores wrong password hash")
+
+    def test_rejectsWrongPassword(self):
+        self.assertIsNone(permissions.authenticate("ta@uwm.edu", "wrong"), "Authentication accepts wrong unhashed password")
+        self.account.password = make_password("password")
+        self.account.save()
+        self.assertIsNone(permissions.authenticate("ta@uwm.edu", "wrong"), "Authentication accepts wrong hashed password")
+
+    def test_rehashesOnCostChange(self):
+        self.account.password = make_password("password")
+        self.account.save()
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            permissions.authenticate("ta@uwm.edu", "password")
+        self.account.refresh_from_db()
+        self.assertEqual("2000", self.account.password.split("$")[1], "Authentication fails to rehash password hashed at old cost")
+
+    def test_singleLookup(self):
+        self.account.password = make_password("password")
+        self.account.save()
+        with self.assertNumQueries(1):
+            permissions.authenticate("ta@uwm.edu", "password")
+
 # Users
 
 class CreateUserTest(TestCase):
@@ -346,9 +631,93 @@ class CreateUserTest(TestCase):
         errors = users.create(user_details)
         account = self.get_user(user_details)
         data = model_to_dict(account)
+        password = user_details.pop("password")
+        self.assertTrue(check_password(password, data["password"]), "User creation function fails to assign field password")
         for field, value in user_details.items():
             self.assertEqual(value, data[field], f"User creation function fails to assign field {field}")
 
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class ImportAccountsTest(TestCase):
+    def setUp(self):
+        Account.objects.create(name="Existing", role=Account.Role.TA, email="taken@uwm.edu", password="password")
+        self.rows = [
+            {"name": "TA", "role": "2", "email": "ta@uwm.edu", "password": "password", "phone": "phone"},
+            {"name": "", "role": "2", "email": "blank@uwm.edu", "password": "password"},
+            {"name": "Taken", "role": "2", "email": "taken@uwm.edu", "password": "password"},
+            {"name": "Repeat", "role": "1", "email": "ta@uwm.edu", "password": "password"},
+            {"name": "Hashed", "role": "1", "email": "hashed@uwm.edu", "password": make_password("secret")},
+        ]
+
+    def test_reportsBadRows(self):
+        created, report = users.import_accounts(self.rows)
+        self.assertEqual(2, created, "Account import function fails to create every valid row")
+        self.assertEqual([2, 3, 4], [row for row, _ in report], "Account import function fails to report each invalid row")
+        self.assertEqual(["Please enter an unused email!"], report[2][1],
+                         "Account import function fails to catch emails repeated within the file")
+
+    def test_hashesPasswords(self):
+        users.import_accounts(self.rows)
+        ta = Account.objects.get(email="ta@uwm.edu")
+        self.assertTrue(check_password("password", ta.password), "Account import function fails to hash passwords")
+        self.assertEqual("phone", ta.phone, "Account import function fails to assign optional fields")
+        hashed = Account.objects.get(email="hashed@uwm.edu")
+        self.assertTrue(check_password("secret", hashed.password), "Account import function rehashes already hashed passwords")
+
+    def test_batchedQueries(self):
+        rows = [{"name": f"TA {i}", "role": "2", "email": f"ta{i}@uwm.edu", "password": "password"} for i in range(10)]
+        with CaptureQueriesContext(connection) as context:
+            created, _ = users.import_accounts(rows, batch_size=5)
+        statements = [query["sql"].split()[0] for query in context.captured_queries]
+        self.assertEqual(10, created, "Account import function fails to create every batch")
+        self.assertEqual(1, statements.count("SELECT"), "Account import function looks up emails per row")
+        # Two batches, each with its version stamps
+        self.assertEqual(4, statements.count("INSERT"), "Account import function fails to insert in batches")
+
+    def test_readRows(self):
+        stream = io.StringIO("Name,Role,Email,Password\n Jane ,2,jane@uwm.edu,pw\n")
+        self.assertEqual([{"name": "Jane", "role": "2", "email": "jane@uwm.edu", "password": "pw"}],
+                         list(imports.read_rows(stream, "csv")), "Row reader fails to normalize CSV rows")
+        stream = io.StringIO('{"name": "Jane", "role": 2, "phone": null}\n\n')
+        self.assertEqual([{"name": "Jane", "role": "2", "phone": ""}],
+                         list(imports.read_rows(stream, "jsonl")), "Row reader fails to normalize JSON Lines rows")
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class ImportAccountsLockTest(TransactionTestCase):
+    # Outside TestCase's own transaction, so the import's transactions are the only ones open
+    def test_hashesOutsideTransactions(self):
+        primary, locked = connections[DEFAULT_DB_ALIAS], []
+        def hash_password(password):
+            locked.append(primary.in_atomic_block)
+            return make_password(password)
+
+        rows = [{"name": f"TA {i}", "role": "2", "email": f"ta{i}@uwm.edu", "password": "password"} for i in range(4)]
+        with mock.patch.object(users, "make_password", hash_password):
+            created, _ = users.import_accounts(rows, batch_size=2)
+        self.assertEqual(4, created, "Account import function fails to create every batch")
+        self.assertEqual([False] * 4, locked, "Account import function hashes passwords while holding the write lock")
+
+class UserMembersTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CS 361")
+        self.other_course = Course.objects.create(name="CS 395")
+        self.unrelated_course = Course.objects.create(name="CS 520")
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA)
+        self.instructor = Account.objects.create(name="Instructor", role=Account.Role.INSTRUCTOR)
+        self.stranger = Account.objects.create(name="Stranger", role=Account.Role.TA)
+        for course in [self.course, self.other_course]:
+            CourseMembership.objects.create(account=self.ta, course=course)
+            CourseMembership.objects.create(account=self.instructor, course=course)
+        CourseMembership.objects.create(account=self.stranger, course=self.unrelated_course)
+
+    def test_distinctCoMembers(self):
+        members = list(users.members(self.ta))
+        self.assertEqual([{"pk": self.instructor.pk, "name": "Instructor"}, {"pk": self.ta.pk, "name": "TA"}], members,
+                         "Members function fails to return each co-member of the requester's courses once")
+
+    def test_singleQuery(self):
+        with self.assertNumQueries(1):
+            list(users.members(self.ta))
+
 class EditUserTest(TestCase):
     def setUp(self):
         self.user = Account.objects.create(
@@ -388,6 +757,7 @@ class EditUserTest(TestCase):
         
         user = model_to_dict(self.user)
         del user["id"]
+        self.assertTrue(check_password(data.pop("password"), user["password"]), "User edit function fails to correctly change field password")
         for field, value in data.items():
             self.assertEqual(value, user[field], f"User edit function fails to correctly change field {field}")
     
@@ -466,6 +836,303 @@ class AssignToSectionTest(TestCase):
         with self.assertRaises(TypeError, msg="No section argument given"):
             sections.assign(self.ta)
 
+class ConflictIndexTest(TestCase):
+    def setUp(self):
+        self.index = sections.ConflictIndex()
+        self.index.add(1, (0, time(13), time(14)), "CS 361 802")
+        self.index.add(1, (0, time(8), time(12)), "CS 361 801")
+        self.index.add(1, (0, time(9), time(10)), "CS 395 801")
+
+    def test_overlap(self):
+        self.assertEqual("CS 361 802", self.index.conflict(1, (0, time(13, 30), time(15))), "Conflict index misses an overlapping meeting")
+        self.assertEqual("CS 361 801", self.index.conflict(1, (0, time(11), time(12, 30))),
+                         "Conflict index misses a meeting hidden behind a shorter one that starts later")
+
+    def test_sortedAdds(self):
+        index = sections.ConflictIndex()
+        for hour, label in ((8, "CS 361 801"), (9, "CS 395 801"), (13, "CS 361 802")):
+            index.add(1, (0, time(hour), time(12 if hour == 8 else hour + 1)), label)
+        self.assertEqual(self.index.days, index.days, "Conflict index depends on the order meetings are added in")
+        self.assertEqual("CS 361 801", index.conflict(1, (0, time(11), time(12, 30))), "Conflict index loses the latest end when appending")
+
+    def test_noOverlap(self):
+        self.assertIsNone(self.index.conflict(1, (0, time(12), time(13))), "Conflict index treats back-to-back meetings as overlapping")
+        self.assertIsNone(self.index.conflict(1, (1, time(9), time(10))), "Conflict index compares meetings on different days")
+        self.assertIsNone(self.index.conflict(2, (0, time(9), time(10))), "Conflict index compares meetings of different TAs")
+
+class SectionMeetingsTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CS 361")
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA)
+        CourseMembership.objects.create(account=self.ta, course=self.course, sections=2)
+        self.taught = Section.objects.create(course=self.course, num="801", ta=self.ta)
+        self.section = Section.objects.create(course=self.course, num="802")
+        sections.set_meetings(self.taught, "MW 10:00-10:50")
+
+    def test_parseMeetings(self):
+        meetings, errors = sections.parse_meetings("tr 9:30-10:45; F 12:00-12:50")
+        self.assertEqual([], errors, "Meeting parser rejects valid meetings")
+        self.assertEqual([(1, time(9, 30), time(10, 45)), (3, time(9, 30), time(10, 45)), (4, time(12), time(12, 50))], meetings,
+                         "Meeting parser fails to expand day codes")
+        _, errors = sections.parse_meetings("MW 10:00, X 9:00-10:00, M 11:00-10:00, M 25:00-26:00")
+        self.assertEqual(4, len(errors), "Meeting parser fails to reject malformed meetings")
+        _, errors = sections.parse_meetings("M 10:00-11:00, W 10:30-11:30, MF 10:30-11:30")
+        self.assertEqual(["Please enter MF 10:30-11:30 at a time that doesn't overlap M 10:00-11:00!"], errors,
+                         "Meeting parser fails to reject a section's meetings that overlap each other")
+
+    def test_meetingTimes(self):
+        sections.set_meetings(self.section, "F 12:00-12:50, MW 10:00-10:50")
+        self.assertEqual("MW 10:00-10:50, F 12:00-12:50", self.section.meeting_times(), "Section fails to group meeting days")
+
+    def test_assignConflict(self):
+        sections.set_meetings(self.section, "W 10:30-11:20")
+        self.assertEqual(["TA already teaches CS 361 801 at that time!"], sections.assign(self.section, self.ta),
+                         "Section assignment fails to reject a TA with a clashing section")
+        self.assertIsNone(Section.objects.get(pk=self.section.pk).ta, "Section assignment saves a clashing TA")
+        sections.set_meetings(self.section, "W 11:00-11:50")
+        self.assertEqual([], sections.assign(self.section, self.ta), "Section assignment rejects a TA without a clash")
+
+    def test_setMeetingsConflict(self):
+        self.assertEqual(1, len(sections.set_meetings(self.section, "M 10:00-11:00, M 10:30-11:30")),
+                         "Meeting editing fails to reject meetings that overlap each other")
+        self.assertFalse(self.section.meetings.exists(), "Meeting editing saves meetings that overlap each other")
+        self.section.ta = self.ta
+        self.section.save()
+        self.assertEqual(1, len(sections.set_meetings(self.section, "M 10:15-11:00")),
+                         "Meeting editing fails to reject a time that clashes with the TA's other sections")
+        self.assertEqual([], sections.set_meetings(self.taught, "M 10:15-11:00"),
+                         "Meeting editing compares a section's new times with its own old ones")
+
+    def test_autoAssignConflict(self):
+        other = Section.objects.create(course=self.course, num="803")
+        sections.set_meetings(self.section, "M 10:00-10:50")
+        sections.set_meetings(other, "R 10:00-10:50")
+        assignments, unfilled = scheduling.plan(self.course)
+        self.assertEqual([(other, self.ta)], assignments, "Auto-assign plan books a TA into a clashing section")
+        self.assertEqual([self.section], unfilled, "Auto-assign plan fails to leave the clashing section open")
+
+class TAsWithCapacityTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CS 361")
+        self.other_course = Course.objects.create(name="CS 395")
+        self.busy_ta = Account.objects.create(name="Busy", role=Account.Role.TA)
+        self.free_ta = Account.objects.create(name="Free", role=Account.Role.TA)
+        self.instructor = Account.objects.create(name="Instructor", role=Account.Role.INSTRUCTOR)
+        CourseMembership.objects.create(account=self.busy_ta, course=self.course, sections=2)
+        CourseMembership.objects.create(account=self.free_ta, course=self.course, sections=1)
+        CourseMembership.objects.create(account=self.instructor, course=self.course)
+        CourseMembership.objects.create(account=self.busy_ta, course=self.other_course, sections=1)
+        Section.objects.create(course=self.course, num="801", ta=self.busy_ta)
+        Section.objects.create(course=self.course, num="802", ta=self.busy_ta)
+        Section.objects.create(course=self.other_course, num="801", ta=self.busy_ta)
+
+    def test_onlyTAs(self):
+        tas = [membership.account for membership in sections.tas_with_capacity(self.course)]
+        self.assertEqual([self.busy_ta, self.free_ta], tas, "TA capacity resolver fails to list exactly the TAs of the course")
+
+    def test_capacity(self):
+        busy, free = sections.tas_with_capacity(self.course)
+        self.assertEqual((2, 2, 0), (busy.sections, busy.assigned, busy.remaining), "TA capacity resolver miscounts a full TA")
+        self.assertEqual((1, 0, 1), (free.sections, free.assigned, free.remaining), "TA capacity resolver miscounts a free TA")
+
+    def test_singleQuery(self):
+        with self.assertNumQueries(1):
+            [membership.account.name for membership in sections.tas_with_capacity(self.course)]
+
+    def test_assignRespectsCapacity(self):
+        section = Section.objects.create(course=self.course, num="803")
+        self.assertEqual(["User is assigned to too many sections!"], sections.assign(section, self.busy_ta),
+                         "Section assignment function assigns TA beyond their capacity")
+        self.assertEqual([], sections.assign(section, self.free_ta), "Section assignment function rejects TA with capacity")
+
+class ScheduleTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CS 361")
+        self.instructor = Account.objects.create(name="Instructor", role=Account.Role.INSTRUCTOR)
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA, email="ta@uwm.edu")
+        CourseMembership.objects.create(account=self.instructor, course=self.course)
+        CourseMembership.objects.create(account=self.ta, course=self.course, grader=True, sections=2)
+        Section.objects.create(course=self.course, num="802")
+        Section.objects.create(course=self.course, num="801", ta=self.ta)
+
+    def test_rows(self):
+        self.assertEqual([
+            ("CS 361", "801", "TA", "ta@uwm.edu", "Instructor", True, 2),
+            ("CS 361", "802", None, None, "Instructor", None, None),
+        ], list(sections.schedule()), "Schedule function fails to join sections with their TA and instructor")
+
+    def test_singleQuery(self):
+        with self.assertNumQueries(1):
+            list(sections.schedule().iterator(chunk_size=1))
+
+    def test_lines(self):
+        rows = sections.schedule()
+        self.assertEqual("course,section,ta,ta_email,instructor,grader,capacity\r\n", next(exports.lines(sections.SCHEDULE_FIELDS, rows, "csv")),
+                         "Export lines function fails to start CSV with a header")
+        line = json.loads(next(exports.lines(sections.SCHEDULE_FIELDS, rows, "jsonl")))
+        self.assertEqual({"course": "CS 361", "section": "801", "ta": "TA", "ta_email": "ta@uwm.edu", "instructor": "Instructor",
+                          "grader": True, "capacity": 2}, line, "Export lines function fails to write JSON Lines objects")
+
+class AutoAssignTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CS 361")
+        self.other_course = Course.objects.create(name="CS 395")
+        self.busy_ta = Account.objects.create(name="Busy", role=Account.Role.TA)
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA)
+        CourseMembership.objects.create(account=self.busy_ta, course=self.course, sections=2)
+        CourseMembership.objects.create(account=self.ta, course=self.course, sections=1)
+        CourseMembership.objects.create(account=self.ta, course=self.other_course, sections=1)
+        Section.objects.create(course=self.course, num="800", ta=self.busy_ta)
+        self.open_sections = [Section.objects.create(course=self.course, num=f"80{i}") for i in range(1, 4)]
+        Section.objects.create(course=self.other_course, num="801")
+
+    def test_flowNetwork(self):
+        # Taking the first edge out of node 2 blocks node 3, so the solver has to reroute through a reverse edge
+        network = scheduling.FlowNetwork(6)
+        for node in (2, 3):
+            network.add_edge(0, node, 1)
+        for start, end in ((2, 4), (2, 5), (3, 4)):
+            network.add_edge(start, end, 1)
+        for node in (4, 5):
+            network.add_edge(node, 1, 1)
+        self.assertEqual(2, network.max_flow(0, 1), "Flow network fails to find the maximum flow")
+
+    def test_respectsCapacity(self):
+        assignments, unfilled = scheduling.plan(self.course)
+        tas = [ta for _, ta in assignments]
+        self.assertEqual(1, tas.count(self.busy_ta), "Auto-assign plan exceeds a TA's remaining capacity")
+        self.assertEqual(1, tas.count(self.ta), "Auto-assign plan fails to use every TA with capacity")
+        self.assertEqual(1, len(unfilled), "Auto-assign plan fails to report sections left open")
+
+    def test_wholeTerm(self):
+        assignments, _ = scheduling.plan()
+        self.assertEqual(3, len(assignments), "Auto-assign plan fails to fill sections across every course")
+        self.assertIn(self.other_course.pk, [section.course_id for section, _ in assignments],
+                      "Auto-assign plan counts capacity across courses instead of per course")
+
+    def clashing(self, *times: str) -> Course:
+        course = Course.objects.create(name="CS 458")
+        for name, capacity in (("A", 2), ("B", 1)):
+            CourseMembership.objects.create(account=Account.objects.create(name=name, role=Account.Role.TA), course=course, sections=capacity)
+        for num, text in enumerate(times, start=1):
+            sections.set_meetings(Section.objects.create(course=course, num=f"80{num}"), text)
+        return course
+
+    def test_sameTimeSections(self):
+        course = self.clashing("MW 10:00-10:50", "MW 10:00-10:50")
+        for by_skills in (False, True):
+            assignments, unfilled = scheduling.plan(course, by_skills)
+            self.assertEqual([], unfilled, "Auto-assign plan gives one TA two sections at the same time instead of using another TA")
+            self.assertEqual(["A", "B"], sorted(ta.name for _, ta in assignments), "Auto-assign plan fails to fill sections at the same time")
+
+    def test_overlappingSections(self):
+        course = self.clashing("MW 10:00-10:50", "W 10:30-11:20")
+        for by_skills in (False, True):
+            assignments, unfilled = scheduling.plan(course, by_skills)
+            self.assertEqual([], unfilled, "Auto-assign plan leaves open a section that overlaps another TA's pick")
+            self.assertEqual(["A", "B"], sorted(ta.name for _, ta in assignments), "Auto-assign plan gives one TA overlapping sections")
+
+    def test_planDoesNotWrite(self):
+        scheduling.plan()
+        self.assertEqual(4, Section.objects.filter(ta__isnull=True).count(), "Auto-assign plan saves assignments")
+
+    def test_previewCached(self):
+        cache.clear()
+        planned = scheduling.preview(self.course)
+        # Only the version stamps the cached plan is tagged with
+        with self.assertNumQueries(1):
+            self.assertEqual(planned, scheduling.preview(self.course), "Auto-assign preview fails to reuse a cached plan")
+        sections.assign(self.open_sections[0], self.ta)
+        self.assertNotIn(self.open_sections[0], scheduling.preview(self.course)[1] + [section for section, _ in scheduling.preview(self.course)[0]],
+                         "Auto-assign preview serves a plan from before a section was filled")
+
+    def test_commit(self):
+        assignments, _ = scheduling.commit(self.course)
+        for section, ta in assignments:
+            self.assertEqual(ta.pk, Section.objects.get(pk=section.pk).ta_id, "Auto-assign commit fails to save assignments")
+        self.assertEqual(self.busy_ta.pk, Section.objects.get(num="800").ta_id, "Auto-assign commit changes existing assignments")
+        self.assertEqual(([], [section for section in Section.objects.filter(course=self.course, ta__isnull=True)]),
+                         scheduling.plan(self.course), "Auto-assign commit leaves fillable sections open")
+
+class ConcurrentAutoAssignTest(TransactionTestCase):
+    def test_commitsQueue(self):
+        course = Course.objects.create(name="CS 361")
+        for i in range(4):
+            CourseMembership.objects.create(account=Account.objects.create(name=f"TA {i}", role=Account.Role.TA), course=course, sections=2)
+        for i in range(6):
+            Section.objects.create(course=course, num=f"80{i}")
+        assigned = []
+
+        errors = concurrently(lambda: assigned.extend(scheduling.commit()[0]))
+        self.assertEqual([], [str(e) for e in errors], "Concurrent auto-assign commits fail on the database lock")
+        self.assertEqual(6, len(assigned), "Concurrent auto-assign commits fill a section more than once")
+
+class SkillAssignTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name="CS 361", skills="Python, Git; Unit testing")
+        self.novice = Account.objects.create(name="Novice", role=Account.Role.TA, skills="java")
+        self.expert = Account.objects.create(name="Expert", role=Account.Role.TA, skills="git, PYTHON,  unit   testing")
+        self.partial = Account.objects.create(name="Partial", role=Account.Role.TA, skills="python")
+        for ta in (self.novice, self.expert, self.partial):
+            CourseMembership.objects.create(account=ta, course=self.course, sections=2)
+        for num in ("801", "802", "803"):
+            Section.objects.create(course=self.course, num=num)
+
+    def test_tokenize(self):
+        self.assertEqual({"python", "git", "unit testing"}, scheduling.tokenize(" Python,git;Unit  Testing, "),
+                         "Skill tokenizer fails to normalize skills")
+
+    def test_skillIndex(self):
+        index = scheduling.SkillIndex()
+        self.assertEqual(index.mask("git, python"), index.mask("Python / Git"), "Skill index maps equal skill sets to different masks")
+        self.assertEqual(1, (index.mask("python") & index.mask("git, python")).bit_count(), "Skill index fails to share bits between skills")
+
+    def test_minCostFlow(self):
+        network = scheduling.CostFlowNetwork(5)
+        network.add_edge(0, 2, 2, 0)
+        network.add_edge(0, 3, 2, 0)
+        network.add_edge(2, 4, 2, 5)
+        network.add_edge(3, 4, 1, 1)
+        network.add_edge(4, 1, 2, 0)
+        self.assertEqual((2, 6), network.min_cost_flow(0, 1), "Cost flow network fails to find the cheapest maximum flow")
+
+    def test_overlappingSections(self):
+        # Ruling out partly overlapping pairs is greedy, so small random courses find the cases where it costs sections
+        rng = random.Random(6)
+        times = ["M 09:30-10:20", "M 10:00-10:50", "M 10:30-11:20", "M 11:00-11:50", "M 11:30-12:20"]
+        for trial in range(40):
+            course = Course.objects.create(name=f"CS {trial}", skills="python, git")
+            for ta in range(rng.randint(1, 3)):
+                account = Account.objects.create(name=f"TA {trial}.{ta}", role=Account.Role.TA,
+                                                 skills=rng.choice(["python", "git", "python, git", ""]))
+                CourseMembership.objects.create(account=account, course=course, sections=rng.randint(1, 2))
+            for num in range(rng.randint(2, 4)):
+                sections.set_meetings(Section.objects.create(course=course, num=f"{num}"), rng.choice(times))
+
+            flow, _ = scheduling.plan(course)
+            skills, _ = scheduling.plan(course, by_skills=True)
+            self.assertGreaterEqual(len(skills), len(flow), f"Skill-based plan fills fewer sections of {course.name} than the plain one")
+
+    def test_prefersSkilledTAs(self):
+        assignments, unfilled = scheduling.plan(self.course, by_skills=True)
+        tas = sorted(ta.name for _, ta in assignments)
+        self.assertEqual([], unfilled, "Skill-weighted plan fills fewer sections than the TAs can cover")
+        self.assertEqual(["Expert", "Expert", "Partial"], tas, "Skill-weighted plan fails to prefer TAs with the required skills")
+
+    def test_sameTimeSections(self):
+        for section in Section.objects.filter(course=self.course):
+            sections.set_meetings(section, "MW 10:00-10:50")
+        assignments, unfilled = scheduling.plan(self.course, by_skills=True)
+        self.assertEqual(len(scheduling.plan(self.course)[0]), len(assignments), "Skill-weighted plan fills fewer sections than the flow plan")
+        self.assertEqual(["Expert", "Novice", "Partial"], sorted(ta.name for _, ta in assignments),
+                         "Skill-weighted plan gives one TA sections at the same time")
+
+    def test_respectsCapacity(self):
+        CourseMembership.objects.filter(account=self.expert).update(sections=1)
+        assignments, _ = scheduling.plan(self.course, by_skills=True)
+        self.assertEqual(["Expert", "Partial", "Partial"], sorted(ta.name for _, ta in assignments),
+                         "Skill-weighted plan exceeds a TA's capacity")
+
 class UnassignFromSectionTest(TestCase):
     def setUp(self):
         self.course = Course.objects.create()
@@ -491,3 +1158,356 @@ class DeleteSectionTest(TestCase):
     def test_deletesSection(self):
         sections.delete(self.section)
         self.assertEqual(0, sections.count(self.section.num), "Section deletion function fails to delete section")
+
+
+# Search
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        users.create({"name": "Grace Hopper", "role": Account.Role.TA, "email": "hopper@uwm.edu", "password": "password"})
+        users.create({"name": "Alan Turing", "role": Account.Role.TA, "email": "turing@uwm.edu", "password": "password"})
+        self.hopper = Account.objects.get(email="hopper@uwm.edu")
+        self.turing = Account.objects.get(email="turing@uwm.edu")
+        courses.create("Compilers")
+        self.course = Course.objects.get(name="Compilers")
+
+    def names(self, query: str, requester: Account = None, kind: Union[int, None] = None) -> list[str]:
+        return [result["name"] for result in search.search(requester or self.supervisor, query, kind)]
+
+    def test_prefix(self):
+        self.assertEqual(["Grace Hopper"], self.names("hop"), "Search function fails to match a name prefix")
+        self.assertEqual(["Alan Turing"], self.names("turing@uwm"), "Search function fails to match an email")
+        self.assertEqual([], self.names("grace turing"), "Search function fails to require every word")
+
+    def test_ranking(self):
+        courses.edit(self.course, {"name": "Compilers", "description": "Taught in the style of Grace Hopper"})
+        self.assertEqual(["Grace Hopper", "Compilers"], self.names("hopper"),
+                         "Search function fails to rank name matches above description matches")
+        self.assertEqual(["Compilers"], self.names("hopper", kind=search.COURSE), "Search function fails to filter by kind")
+
+    def test_incremental(self):
+        users.edit(self.supervisor, self.hopper, {"name": "Grace Brewster Hopper", "skills": "COBOL"})
+        self.assertEqual(["Grace Brewster Hopper"], self.names("cobol"), "Search function fails to pick up edited accounts")
+        users.delete(self.turing)
+        self.assertEqual([], self.names("turing"), "Search function still returns deleted accounts")
+        courses.delete(self.course)
+        self.assertEqual([], self.names("compilers"), "Search function still returns deleted courses")
+
+    def test_imports(self):
+        users.import_accounts([{"name": "Ada Lovelace", "role": "2", "email": "ada@uwm.edu", "password": "password"}])
+        courses.import_roster([{"name": "Analytical Engines"}])
+        self.assertEqual(["Ada Lovelace"], self.names("lovelace"), "Search function fails to pick up imported accounts")
+        self.assertEqual(["Analytical Engines"], self.names("analytical"), "Search function fails to pick up imported courses")
+
+    def test_courseAccess(self):
+        self.assertEqual([], self.names("compilers", self.hopper), "Search function shows courses to non-members")
+        CourseMembership.objects.create(account=self.hopper, course=self.course)
+        self.assertEqual(["Compilers"], self.names("compilers", self.hopper), "Search function hides courses from members")
+
+    def test_operators(self):
+        for query in ['"', "hopper OR", "NEAR(grace", "*", "name:grace", "-"]:
+            search.search(self.supervisor, query)
+        self.assertEqual([], search.search(self.supervisor, "  "), "Search function fails to ignore a blank query")
+
+    def test_rebuild(self):
+        Account.objects.create(name="Edsger Dijkstra", role=Account.Role.TA, email="dijkstra@uwm.edu")
+        self.assertEqual([], self.names("dijkstra"), "Search function indexes accounts saved outside the account functions")
+        search.rebuild()
+        self.assertEqual(["Edsger Dijkstra"], self.names("dijkstra"), "Search rebuild fails to index every account")
+
+# Cache
+
+class NamespaceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.namespace = app_cache.Namespace("test", 60)
+        self.addCleanup(app_cache.namespaces.pop, "test")
+
+    def test_counters(self):
+        self.assertIsNone(self.namespace.get(1), "Cache namespace returns a value that was never set")
+        self.namespace.set(1, "one")
+        self.assertEqual("one", self.namespace.get(1), "Cache namespace fails to return a set value")
+        self.namespace.get_many([1, 2])
+        self.namespace.delete(1)
+        stats = app_cache.stats()["namespaces"]["test"]
+        self.assertEqual((2, 2, 1, 1, 0.5), (stats["hits"], stats["misses"], stats["sets"], stats["deletes"], stats["hit_rate"]),
+                         "Cache stats fail to count namespace hits, misses, sets and deletes")
+        app_cache.reset_stats()
+        self.assertIsNone(app_cache.stats()["namespaces"]["test"]["hit_rate"], "Cache stats fail to reset counters")
+
+    def test_namespacedKeys(self):
+        other = app_cache.Namespace("other", 60)
+        self.addCleanup(app_cache.namespaces.pop, "other")
+        self.namespace.set(1, "test")
+        self.assertIsNone(other.get(1), "Cache namespaces share keys")
+
+    def test_tagInvalidates(self):
+        computed = []
+        compute = lambda: computed.append(1) or len(computed)
+        self.assertEqual(1, self.namespace.get_or_set("plan", compute, tag="a"), "Cache namespace fails to store a computed value")
+        self.assertEqual(1, self.namespace.get_or_set("plan", compute, tag="a"), "Cache namespace recomputes a cached value")
+        self.assertEqual(2, self.namespace.get_or_set("plan", compute, tag="b"), "Cache namespace serves a value under a stale tag")
+
+    @override_settings(APP_CACHE_TIMEOUTS={"test": 0})
+    def test_timeoutSetting(self):
+        self.namespace.set(1, "one")
+        self.assertIsNone(self.namespace.get(1), "Cache namespace ignores its timeout from settings")
+
+# Sessions
+
+class PurgeSessionsTest(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        Session.objects.bulk_create([Session(session_key=f"expired{i}", session_data="", expire_date=now - timedelta(days=1)) for i in range(5)])
+        Session.objects.create(session_key="live", session_data="", expire_date=now + timedelta(days=1))
+
+    def test_chunks(self):
+        self.assertEqual([2, 2, 1], list(sessions.purge_expired(2)), "Session purge fails to delete in chunks")
+        self.assertEqual(["live"], list(Session.objects.values_list("session_key", flat=True)), "Session purge fails to keep live sessions")
+
+    def test_cachedSessions(self):
+        client = Client()
+        with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db"):
+            cache.clear()
+            permissions.login(client, Account.objects.create(name="TA", role=Account.Role.TA))
+            with CaptureQueriesContext(connection) as queries:
+                client.get("/courses/")
+        self.assertFalse([query for query in queries if "django_session" in query["sql"]], "Cached sessions are still read from the database")
+
+# Resources
+
+class ResourcePaginationTest(TestCase):
+    def setUp(self):
+        self.accounts = Account.objects.bulk_create(Account(name=f"TA {i}", role=Account.Role.TA) for i in range(5))
+
+    def test_cursor(self):
+        rows, cursor = resources.paginate(Account.objects.all(), limit=2)
+        self.assertEqual(self.accounts[:2], rows, "Paginate function fails to return the first page")
+        rows, cursor = resources.paginate(Account.objects.all(), cursor, 2)
+        self.assertEqual(self.accounts[2:4], rows, "Paginate function fails to resume after the cursor")
+        rows, cursor = resources.paginate(Account.objects.all(), cursor, 2)
+        self.assertEqual((self.accounts[4:], None), (rows, cursor), "Paginate function reports a page past the last")
+
+    def test_badInput(self):
+        for cursor in ["!", "bm90IGEgbnVtYmVy"]:
+            with self.assertRaises(ValueError, msg=f"Paginate function fails to reject cursor {cursor}"):
+                resources.paginate(Account.objects.all(), cursor)
+        for limit in ["0", "many", str(resources.MAX_LIMIT + 1)]:
+            with self.assertRaises(ValueError, msg=f"Limit parser fails to reject {limit}"):
+                resources.parse_limit(limit)
+
+class ResourceFieldsTest(TestCase):
+    def setUp(self):
+        self.supervisor = Account.objects.create(name="Supervisor", role=Account.Role.SUPERVISOR)
+        self.ta = Account.objects.create(name="TA", role=Account.Role.TA, phone="555-0100")
+
+    def test_privateFields(self):
+        self.assertNotIn("phone", resources.ACCOUNT.visible(self.ta), "Account resource shows private fields to other users")
+        self.assertIn("phone", resources.ACCOUNT.visible(self.ta, own=True), "Account resource hides private fields from their owner")
+        with self.assertRaises(ValueError, msg="Account resource fails to reject private fields for other users"):
+            resources.ACCOUNT.select(self.ta, "name,phone")
+
+    def test_sparseFields(self):
+        fields, expand = resources.ACCOUNT.select(self.supervisor, "name, phone")
+        account = resources.ACCOUNT.queryset(Account.objects.all(), fields, expand).get(pk=self.ta.pk)
+        self.assertEqual({"email", "role", "skills", "address", "office_hours", "password"}, account.get_deferred_fields(),
+                         "Account resource fails to load only the selected fields")
+        self.assertEqual({"name": "TA", "phone": "555-0100"}, resources.ACCOUNT.serialize(self.supervisor, account, fields),
+                         "Account resource fails to serialize only the selected fields")
+
+    def test_expansions(self):
+        course = Course.objects.create(name="CS 361")
+        Section.objects.bulk_create(Section(course=course, num=f"{i:03}", ta=self.ta) for i in range(3))
+        fields, expand = resources.COURSE.select(self.ta, "name", "sections")
+        with self.assertNumQueries(2, msg="Course resource fails to prefetch expanded sections"):
+            data = resources.COURSE.serialize(self.ta, resources.COURSE.queryset(Course.objects.all(), fields, expand).get(), fields, expand)
+        self.assertEqual(["000", "001", "002"], [section["num"] for section in data["sections"]],
+                         "Course resource fails to embed expanded sections")
+        with self.assertRaises(ValueError, msg="Course resource fails to reject unknown expansions"):
+            resources.COURSE.select(self.ta, "", "instructors")
+
+# Database
+
+class SQLitePragmasTest(TestCase):
+    def pragmas(self) -> list[int]:
+        with connection.cursor() as cursor:
+            return [cursor.execute(f"PRAGMA {name}").fetchone()[0] for name in ("busy_timeout", "cache_size")]
+
+    def test_applied(self):
+        defaults = {name: settings.SQLITE_PRAGMAS[name] for name in ("busy_timeout", "cache_size")}
+        self.assertEqual(list(defaults.values()), self.pragmas(), "SQLite pragmas fail to apply to the test connection")
+        # In-memory test databases stay open, so the hook is rerun by hand on the current connection
+        with override_settings(SQLITE_PRAGMAS={"busy_timeout": 1234, "cache_size": -4096}):
+            database.configure_sqlite(None, connection)
+        self.assertEqual([1234, -4096], self.pragmas(), "SQLite pragmas fail to follow settings")
+        with override_settings(SQLITE_PRAGMAS=defaults):
+            database.configure_sqlite(None, connection)
+
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.router = database.PrimaryReplicaRouter()
+        self.router.replica = database.REPLICA
+        self.middleware = ReplicaMiddleware(self.view)
+        self.middleware.enabled = True
+        self.reads = []
+
+    def view(self, request):
+        self.reads.append(self.router.db_for_read(Account))
+        if request.method == "POST":
+            self.router.db_for_write(Account)
+            self.reads.append(self.router.db_for_read(Account))
+        return HttpResponse()
+
+    def request(self, method: str, session: SessionStore):
+        request = getattr(RequestFactory(), method)("/")
+        request.session = session
+        self.middleware(request)
+
+    def test_outsideRequests(self):
+        self.assertEqual(database.PRIMARY, self.router.db_for_read(Account), "Router reads from the replica outside a request")
+
+    def test_readsAfterWrites(self):
+        session = SessionStore()
+        self.request("get", session)
+        self.assertEqual([database.REPLICA], self.reads, "Router fails to send GET reads to the replica")
+        self.request("post", session)
+        self.assertEqual([database.PRIMARY, database.PRIMARY], self.reads[1:], "Router sends a POST's reads to the replica")
+        self.request("get", session)
+        self.assertEqual(database.PRIMARY, self.reads[-1], "Router sends reads to the replica right after their session writes")
+        self.request("get", SessionStore())
+        self.assertEqual(database.REPLICA, self.reads[-1], "Router pins other sessions to the primary")
+
+    def test_sessionsOnPrimary(self):
+        token = database.routing.set(database.Routing(replica=True))
+        try:
+            self.assertEqual(database.PRIMARY, self.router.db_for_read(Session), "Router reads sessions from the replica")
+        finally:
+            database.routing.reset(token)
+
+def concurrently(func: Callable[[], Any], threads: int = 4) -> list[Exception]:
+    """Run func from several threads at once, each on its own connection to a file copy of the test database.
+
+    Locks on the in-memory test database are shared-cache table locks, which never wait out busy_timeout, so
+    contention between writers only behaves as it does in production on a file.
+    """
+
+    barrier = threading.Barrier(threads)
+    wrapper, settings_dict = type(connections[DEFAULT_DB_ALIAS]), connection.settings_dict
+    errors = []
+
+    def run(path: str):
+        connections[DEFAULT_DB_ALIAS] = wrapper({**settings_dict, "NAME": path}, DEFAULT_DB_ALIAS)
+        try:
+            barrier.wait()
+            func()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections[DEFAULT_DB_ALIAS].close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "concurrent.sqlite3")
+        database.sync_replica(path)
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(run, [path] * threads))
+        connections[DEFAULT_DB_ALIAS].close()
+
+    return errors
+
+class ConcurrentWritersTest(TransactionTestCase):
+    def test_readThenWrite(self):
+        def write():
+            # Reading first is what made deferred transactions fail to upgrade their lock
+            for _ in range(5):
+                with transaction.atomic():
+                    count = Account.objects.count()
+                    Account.objects.create(name=f"TA {count}", role=Account.Role.TA)
+
+        self.assertEqual([], [str(e) for e in concurrently(write)], "Concurrent writers inside atomic() fail to wait for the write lock")
+
+class SyncReplicaTest(TransactionTestCase):
+    # Backing up blocks on a transaction open on the same connection, so this test can't run inside one
+    def test_copiesPrimary(self):
+        Account.objects.create(name="TA", role=Account.Role.TA)
+        with tempfile.TemporaryDirectory() as directory:
+            database.sync_replica(os.path.join(directory, "replica.sqlite3"))
+            replica = sqlite3.connect(os.path.join(directory, "replica.sqlite3"))
+            count, = replica.execute(f"SELECT COUNT(*) FROM {Account._meta.db_table}").fetchone()
+            replica.close()
+        self.assertEqual(1, count, "Replica sync fails to copy the primary")
+
+    def test_stampsMatchData(self):
+        # Rows read from a replica that hasn't caught up must not be cached under the primary's newer stamp
+        course = Course.objects.create(name="CS 361")
+        synced, = versions.get([versions.course(course.pk)])
+        with tempfile.TemporaryDirectory() as directory:
+            database.sync_replica(os.path.join(directory, "replica.sqlite3"))
+            course.name = "CS 362"
+            course.save()
+            replica = sqlite3.connect(os.path.join(directory, "replica.sqlite3"))
+            name, = replica.execute(f"SELECT name FROM {Course._meta.db_table} WHERE id = ?", [course.pk]).fetchone()
+            stamp, = replica.execute(f"SELECT stamp FROM {VersionStamp._meta.db_table} WHERE scope = ?",
+                                     [versions.course(course.pk)]).fetchone()
+            replica.close()
+        self.assertEqual(("CS 361", synced), (name, stamp), "Replica stamps fail to match the rows synced with them")
+        self.assertNotEqual(versions.get([versions.course(course.pk)]), [stamp], "Replica shares the primary's stamp before syncing its write")
+
+# Middleware
+
+class QueryStatsTest(TestCase):
+    def test_countsQueries(self):
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            list(Account.objects.all())
+            Course.objects.count()
+        self.assertEqual(2, stats.count, "Query stats fail to count queries executed while wrapped")
+        self.assertEqual(2, len(stats.queries), "Query stats fail to record executed SQL")
+
+    def test_skipsTransactionControl(self):
+        stats = QueryStats()
+        for sql in ["BEGIN IMMEDIATE", 'SAVEPOINT "s1"', 'RELEASE SAVEPOINT "s1"', "SELECT 1"]:
+            stats(lambda *args: None, sql, None, False, {})
+        self.assertEqual(["SELECT 1"], [sql for sql, _ in stats.queries], "Query stats count transaction control as queries")
+
+    def test_overBudget(self):
+        stats = QueryStats()
+        stats.count = 3
+        self.assertFalse(stats.over_budget, "Query stats report unbudgeted view as over budget")
+        stats.budget = 3
+        self.assertFalse(stats.over_budget, "Query stats report view at its budget as over budget")
+        stats.budget = 2
+        self.assertTrue(stats.over_budget, "Query stats fail to report view over its budget")
+
+# Dataset
+
+class DatasetTest(TestCase):
+    def snapshot(self) -> list[list[tuple]]:
+        return [list(Account.objects.order_by("pk").values_list("pk", "name", "role", "email", "skills", "password")),
+                list(Course.objects.order_by("pk").values_list("pk", "name", "skills")),
+                list(CourseMembership.objects.order_by("course", "account").values_list("course", "account", "grader", "sections")),
+                list(Section.objects.order_by("pk").values_list("pk", "course", "num", "ta")),
+                list(SectionMeeting.objects.order_by("section", "weekday").values_list("section", "weekday", "start", "end"))]
+
+    def test_shape(self):
+        counts = dataset.generate(100, batch_size=7)
+        self.assertEqual({"supervisors": 1, "instructors": 10, "tas": 89, "courses": 25}, dataset.shape(100), "Dataset shape fails to scale with accounts")
+        self.assertEqual(100, Account.objects.count(), "Dataset fails to create every account")
+        self.assertEqual(counts["sections"], Section.objects.count(), "Dataset miscounts its sections")
+        self.assertEqual(25, CourseMembership.objects.filter(account__role=Account.Role.INSTRUCTOR).count(), "Dataset fails to give every course one instructor")
+        self.assertFalse(Section.objects.exclude(ta=None).exclude(ta__coursemembership__course=F("course")).exists(),
+                         "Dataset assigns sections to TAs outside the course")
+        self.assertIsNotNone(permissions.authenticate(Account.objects.last().email, dataset.PASSWORD), "Dataset accounts fail to log in with its password")
+
+    def test_deterministic(self):
+        dataset.generate(100, seed=3)
+        first = self.snapshot()
+        for model in (Section, Course, Account):
+            model.objects.all().delete()
+        dataset.generate(100, seed=3, batch_size=9)
+        self.assertEqual(first, self.snapshot(), "Dataset differs between runs with the same seed")
+
+    def test_loadTestCoversRoutes(self):
+        routes = list(loadtest.served(urls.urlpatterns))
+        self.assertIn(("GET", "api/v1/courses/"), routes, "Load test fails to find included routes")
+        self.assertEqual([], [route for route in routes if route not in loadtest.SCENARIOS], "Load test has no scenario for some routes")
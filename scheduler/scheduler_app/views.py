@@ -1,30 +1,45 @@
+from typing import Tuple, Union
+
+from django.core.paginator import Paginator
 from django.forms.models import model_to_dict
-from django.http.response import Http404, HttpResponseBadRequest, HttpResponseForbidden
+from django.http.response import Http404, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.utils.functional import SimpleLazyObject
 from django.views import View
 
-from .classes import courses, permissions, sections, users
-from .classes.permissions import check_permissions
+from .classes import cache, courses, exports, imports, permissions, scheduling, search, sections, users, versions
+from .classes.permissions import Requester, check_permissions
+from .middleware import query_budget
 from .models import Account, Course, CourseMembership, Section
 
+USERS_PER_PAGE = 50
+CANDIDATES_PER_PAGE = 25
+SEARCH_PER_PAGE = 20
+# Fragments are keyed by version stamps, read before the data they render. Stamps are database rows, so a write on
+# any worker retires every worker's copy and the timeout only bounds how long stale ones take up space.
+FRAGMENT_TIMEOUT = 24 * 60 * 60
 
 class HomepageView(View):
+    @query_budget(5)
     @check_permissions(check_supervisor=False)
-    def get(self, request, requester: Account):
+    def get(self, request, requester: Requester):
         return render(request, "homepage.html", {
-            "user": requester,
+            "user": requester.account,
             "supervisor": requester.role == Account.Role.SUPERVISOR,
-            "courses": courses.get(requester),
+            "courses": courses.dashboard(requester) if requester.role != Account.Role.SUPERVISOR else [],
+            "fragment_timeout": FRAGMENT_TIMEOUT,
         })
 
 
 class LoginView(View):
+    @query_budget(1)
     def get(self, request):
         if "account" in request.session:
             return redirect("/")
 
         return render(request, "login.html", {"nav": True})
 
+    @query_budget(3)
     def post(self, request):
         if "account" in request.session:
             return redirect("/")
@@ -32,10 +47,6 @@ class LoginView(View):
         errors, invalid_login = permissions.login_with_details(request, request.POST)
 
         if not errors:
-            request.session["account"] = Account.objects.get(
-                email=request.POST["email"],
-                password=request.POST["password"],
-            ).pk
             return redirect("/")
 
         return render(request, "login.html", {
@@ -45,6 +56,7 @@ class LoginView(View):
 
 
 class LogoutView(View):
+    @query_budget(1)
     def post(self, request):
         if "account" in request.session:
             del request.session["account"]
@@ -53,19 +65,21 @@ class LogoutView(View):
 
 
 class ListUsersView(View):
+    @query_budget(6)
     @check_permissions(check_supervisor=False)
-    def get(self, request, requester: Account):
+    @versions.conditional(lambda: [versions.ACCOUNTS, versions.COURSES])
+    def get(self, request, requester: Requester):
         """Render template of all users as a list."""
 
         return render(request, "users_list.html", {
-            "users": users.get(requester),
+            "users": Paginator(users.get(requester), USERS_PER_PAGE).get_page(request.GET.get("page")),
             "supervisor": requester.role == Account.Role.SUPERVISOR,
-            "members": set(member for course in courses.get(requester) \
-                            for member in course.members.all()),
+            "members": users.members(requester),
         })
 
 
 class DeleteUserView(View):
+        @query_budget(8)
         @check_permissions()
         def post(self, *args, account=0):
             try:
@@ -79,8 +93,10 @@ class DeleteUserView(View):
 
 
 class ViewUserView(View):
+    @query_budget(4)
     @check_permissions(check_supervisor=False)
-    def get(self, request, requester: Account, account=0):
+    @versions.conditional(lambda account=0: [versions.account(account)])
+    def get(self, request, requester: Requester, account=0):
         try:
             account = Account.objects.get(pk=account)
         except Account.DoesNotExist:
@@ -93,8 +109,9 @@ class ViewUserView(View):
             **model_to_dict(account),
         })
 
+    @query_budget(7)
     @check_permissions(check_supervisor=False)
-    def post(self, request, requester: Account, account=0):
+    def post(self, request, requester: Requester, account=0):
         if requester.role != Account.Role.SUPERVISOR and account != requester.pk:
             return HttpResponseForbidden("You are not a supervisor.")
 
@@ -115,10 +132,12 @@ class ViewUserView(View):
 
 
 class CreateUserView(View):
+    @query_budget(2)
     @check_permissions()
     def get(self, request, *args):
         return render(request, "user_create.html", {"roles": Account.Role.choices})
 
+    @query_budget(6)
     @check_permissions()
     def post(self, request, *args):
         if (errors := users.create(request.POST)):
@@ -130,9 +149,41 @@ class CreateUserView(View):
             return redirect("/users/?user_created=true")
 
 
+class ImportUsersView(View):
+    @query_budget(2)
+    @check_permissions()
+    def get(self, request, *args):
+        return render(request, "users_import.html", {"formats": imports.FORMATS})
+
+    # Covers one batch of IMPORT_BATCH_SIZE accounts, which bulk_create splits into five INSERTs under SQLite's
+    # parameter limit. Larger files go over by each further batch's inserts.
+    @query_budget(10)
+    @check_permissions()
+    def post(self, request, *args):
+        errors, created, report = [], 0, []
+
+        if (upload := request.FILES.get("accounts")) is None:
+            errors.append("Please choose a file to import!")
+        else:
+            try:
+                rows = imports.read_rows(imports.open_upload(upload), imports.detect_format(upload.name))
+                created, report = users.import_accounts(rows)
+            except ValueError as e:
+                errors.append(f"Could not read file: {e}")
+
+        return render(request, "users_import.html", {
+            "formats": imports.FORMATS,
+            "errors": errors,
+            "created": created,
+            "report": report,
+        }, status=400 if errors else 200)
+
+
 class ListCoursesView(View):
+    @query_budget(6)
     @check_permissions(check_supervisor=False)
-    def get(self, request, requester: Account):
+    @versions.conditional(lambda: [versions.COURSES, versions.ACCOUNTS])
+    def get(self, request, requester: Requester):
         return render(request, "courses_list.html", {
             "courses": [{"pk": course.pk, "name": course.name} \
                         for course in courses.get(requester)],
@@ -145,10 +196,12 @@ class ListCoursesView(View):
 
 
 class CreateCourseView(View):
+    @query_budget(2)
     @check_permissions()
     def get(self, request, *args):
         return render(request, "course_create.html")
 
+    @query_budget(6)
     @check_permissions()
     def post(self, request, *args):
         errors = courses.create(request.POST.get("name", ""))
@@ -159,9 +212,91 @@ class CreateCourseView(View):
             return redirect("/courses/?course_created=true")
 
 
+class ImportRosterView(View):
+    @query_budget(2)
+    @check_permissions()
+    def get(self, request, *args):
+        return render(request, "courses_import.html")
+
+    @query_budget(9)
+    @check_permissions()
+    def post(self, request, *args):
+        errors, created = [], 0
+
+        if (upload := request.FILES.get("roster")) is None:
+            errors.append("Please choose a roster to import!")
+        else:
+            try:
+                created, errors = courses.import_roster(imports.read_roster(imports.open_upload(upload)))
+            except ValueError as e:
+                errors.append(f"Could not read roster: {e}")
+
+        return render(request, "courses_import.html", {
+            "errors": errors,
+            "created": created,
+        }, status=400 if errors else 200)
+
+
+class ExportScheduleView(View):
+    # The schedule query itself runs while the response streams, after the budget is checked
+    @query_budget(2)
+    @check_permissions()
+    def get(self, request, *args):
+        if (format := request.GET.get("format", "csv")) not in exports.FORMATS:
+            return HttpResponseBadRequest(f"Please choose one of {', '.join(exports.FORMATS)}!")
+
+        rows = sections.schedule().iterator(chunk_size=sections.SCHEDULE_CHUNK_SIZE)
+        response = StreamingHttpResponse(exports.lines(sections.SCHEDULE_FIELDS, rows, format),
+                                         content_type=exports.FORMATS[format])
+        response["Content-Disposition"] = f'attachment; filename="schedule.{format}"'
+        return response
+
+
+class CacheStatsView(View):
+    @query_budget(2)
+    @check_permissions(redirect_to_login=False)
+    def get(self, request, *args):
+        return JsonResponse(cache.stats())
+
+    @query_budget(2)
+    @check_permissions(redirect_to_login=False)
+    def post(self, request, *args):
+        """Zero this process's counters, so a tuning run starts from a clean slate."""
+
+        cache.reset_stats()
+        return JsonResponse(cache.stats())
+
+
+class SearchView(View):
+    @query_budget(3)
+    @check_permissions(check_supervisor=False)
+    def get(self, request, requester: Requester):
+        query = request.GET.get("q", "").strip()
+
+        try:
+            page = int(request.GET.get("page", "1"))
+        except ValueError:
+            return HttpResponseBadRequest("Please enter a valid page and type!")
+        if page < 1 or (type := request.GET.get("type", "")) not in ("", *search.KINDS):
+            return HttpResponseBadRequest("Please enter a valid page and type!")
+
+        # Fetch one extra row to know whether another page exists without a COUNT query
+        results = search.search(requester, query, search.KINDS.get(type), (page - 1) * SEARCH_PER_PAGE, SEARCH_PER_PAGE + 1)
+
+        return render(request, "search.html", {
+            "query": query,
+            "type": type,
+            "results": results[:SEARCH_PER_PAGE],
+            "page": page,
+            "has_next": len(results) > SEARCH_PER_PAGE,
+        })
+
+
 class ViewCourseView(View):
+    @query_budget(9)
     @check_permissions(check_supervisor=False)
-    def get(self, request, requester: Account, course=0):
+    @versions.conditional(lambda course=0: [versions.course(course), versions.ACCOUNTS])
+    def get(self, request, requester: Requester, course=0):
         try:
             course = Course.objects.get(pk=course)
         except Course.DoesNotExist:
@@ -170,18 +305,23 @@ class ViewCourseView(View):
         supervisor = requester.role == Account.Role.SUPERVISOR
         instructor = requester.role == Account.Role.INSTRUCTOR
 
-        if not supervisor and course not in courses.get(requester):
+        if not courses.has_access(requester, course):
             return HttpResponseForbidden("You do not have access to this course.")
 
+        # Everything below is lazy, so the sections and members fragments only query when they aren't cached
         return render(request, "course.html", {
             "course": course,
             "supervisor": supervisor,
             "instructor": instructor,
-            "sections": course.sections.all(),
-            "course_instructor": course.members.filter(role=Account.Role.INSTRUCTOR).first(),
-            "tas": CourseMembership.objects.filter(account__role=Account.Role.TA, course=course),
+            "variant": "supervisor" if supervisor else "instructor" if instructor else "member",
+            "version": request.version,
+            "fragment_timeout": FRAGMENT_TIMEOUT,
+            "sections": course.sections.select_related("ta").prefetch_related("meetings"),
+            "course_instructor": SimpleLazyObject(lambda: course.members.filter(role=Account.Role.INSTRUCTOR).first()),
+            "tas": CourseMembership.objects.filter(account__role=Account.Role.TA, course=course).select_related("account"),
         })
 
+    @query_budget(10)
     @check_permissions()
     def post(self, request, *args, course=0):
         try:
@@ -195,14 +335,18 @@ class ViewCourseView(View):
             "course": course,
             "supervisor": True,
             "instructor": False,
-            "sections": course.sections.all(),
+            "variant": "supervisor",
+            "version": versions.tag([versions.course(course.pk), versions.ACCOUNTS]),
+            "fragment_timeout": FRAGMENT_TIMEOUT,
+            "sections": course.sections.select_related("ta").prefetch_related("meetings"),
             "errors": errors,
-            "course_instructor": course.members.filter(role=Account.Role.INSTRUCTOR).first(),
-            "tas": CourseMembership.objects.filter(account__role=Account.Role.TA, course=course),
+            "course_instructor": SimpleLazyObject(lambda: course.members.filter(role=Account.Role.INSTRUCTOR).first()),
+            "tas": CourseMembership.objects.filter(account__role=Account.Role.TA, course=course).select_related("account"),
         }, status=400 if errors else 200)
 
 
 class EditCourseView(View):
+    @query_budget(3)
     @check_permissions()
     def get(self, request, *args, course=0):
         try:
@@ -212,6 +356,7 @@ class EditCourseView(View):
 
         return render(request, "course_edit.html", {"course": course})
 
+    @query_budget(7)
     @check_permissions()
     def post(self, request, *args, course=0):
         try:
@@ -231,6 +376,7 @@ class EditCourseView(View):
 
 
 class DeleteCourseView(View):
+    @query_budget(10)
     @check_permissions()
     def post(self, *args, course=0):
         try:
@@ -244,6 +390,7 @@ class DeleteCourseView(View):
 
 
 class DeleteSectionView(View):
+    @query_budget(7)
     @check_permissions()
     def post(self, *args, section=0, **kwargs):
         try:
@@ -256,9 +403,19 @@ class DeleteSectionView(View):
         return redirect(f"/courses/{section.course.pk}/")
 
 
+def get_candidates(course: Course, prefix: str = "", role: Account.Role = None, page: int = 1) -> tuple[list[dict], bool]:
+    # Fetch one extra row to know whether another page exists without a COUNT query
+    start = (page - 1) * CANDIDATES_PER_PAGE
+    rows = list(courses.candidates(course, prefix, role)[start:start + CANDIDATES_PER_PAGE + 1])
+
+    return [{**row, "role": Account.Role(row["role"]).label} for row in rows[:CANDIDATES_PER_PAGE]], \
+            len(rows) > CANDIDATES_PER_PAGE
+
+
 class AssignToCourseView(View):
+    @query_budget(4)
     @check_permissions()
-    def get(self, request, requester: Account, course=0):
+    def get(self, request, requester: Requester, course=0):
         try:
             course = Course.objects.get(pk=course)
         except Course.DoesNotExist:
@@ -266,13 +423,13 @@ class AssignToCourseView(View):
 
         return render(request, "course_assignment.html", {
             "course": course,
-            "users": [{"pk": user.pk, "name": user.name, "role": user.get_role_display()} \
-                        for user in Account.objects.exclude(role=Account.Role.SUPERVISOR)
-                        if user not in course.members.all()],
+            "roles": [role for role in Account.Role.choices if role[0] != Account.Role.SUPERVISOR],
+            "users": get_candidates(course)[0],
         })
 
+    @query_budget(6)
     @check_permissions()
-    def post(self, request, requester: Account, course=0):
+    def post(self, request, requester: Requester, course=0):
         try:
             course = Course.objects.get(pk=course)
         except Course.DoesNotExist:
@@ -284,15 +441,99 @@ class AssignToCourseView(View):
         return render(request, "course_assignment.html", {
             "errors": errors,
             "course": course,
-            "users": [{"pk": user.pk, "name": user.name, "role": user.get_role_display()} \
-                        for user in Account.objects.exclude(role=Account.Role.SUPERVISOR)
-                        if user not in course.members.all()],
+            "roles": [role for role in Account.Role.choices if role[0] != Account.Role.SUPERVISOR],
+            "users": get_candidates(course)[0],
+        })
+
+
+class AssignCandidatesView(View):
+    @query_budget(4)
+    @check_permissions()
+    def get(self, request, requester: Requester, course=0):
+        try:
+            course = Course.objects.get(pk=course)
+        except Course.DoesNotExist:
+            raise Http404("Course does not exist!")
+
+        try:
+            page = int(request.GET.get("page", "1"))
+            role = Account.Role(int(role)) if (role := request.GET.get("role", "")) else None
+        except ValueError:
+            return HttpResponseBadRequest("Please enter a valid page and role!")
+        if page < 1 or role == Account.Role.SUPERVISOR:
+            return HttpResponseBadRequest("Please enter a valid page and role!")
+
+        results, has_next = get_candidates(course, request.GET.get("q", ""), role, page)
+
+        return JsonResponse({"results": results, "page": page, "has_next": has_next})
+
+
+def get_autoassign_course(requester: Requester, course: Union[int, None]) -> Tuple[Union[Course, None], bool]:
+    # Instructors can fill their own courses; only supervisors can fill the whole term at once
+    if requester.role == Account.Role.TA or (course is None and requester.role != Account.Role.SUPERVISOR):
+        return None, False
+    if course is None:
+        return None, True
+
+    try:
+        course = Course.objects.get(pk=course)
+    except Course.DoesNotExist:
+        raise Http404("Course does not exist!")
+
+    return course, courses.has_access(requester, course)
+
+
+class AutoAssignView(View):
+    @query_budget(9)
+    @check_permissions(check_supervisor=False)
+    def get(self, request, requester: Requester, course=None):
+        course, allowed = get_autoassign_course(requester, course)
+        if not allowed:
+            return HttpResponseForbidden("You do not have permission to perform this action.")
+
+        by_skills = "skills" in request.GET
+        assignments, unfilled = scheduling.preview(course, by_skills)
+
+        return render(request, "autoassign.html", {
+            "course": course,
+            "by_skills": by_skills,
+            "assignments": assignments,
+            "unfilled": unfilled,
+        })
+
+    @query_budget(10)
+    @check_permissions(check_supervisor=False)
+    def post(self, request, requester: Requester, course=None):
+        course, allowed = get_autoassign_course(requester, course)
+        if not allowed:
+            return HttpResponseForbidden("You do not have permission to perform this action.")
+
+        by_skills = "skills" in request.POST
+        assignments, unfilled = scheduling.commit(course, by_skills)
+
+        return render(request, "autoassign.html", {
+            "course": course,
+            "by_skills": by_skills,
+            "assignments": assignments,
+            "unfilled": unfilled,
+            "committed": True,
         })
 
 
+def get_section_candidates(course: Course, section: Section) -> list[dict]:
+    # TAs whose other sections clash with this one stay listed, with a warning; sections.assign rejects them
+    tas = list(sections.tas_with_capacity(course).filter(remaining__gt=0))
+    index = sections.schedule_index([ta.account.pk for ta in tas])
+    meetings = sections.meetings_of([section])[section.pk]
+
+    return [{"pk": ta.account.pk, "name": ta.account.name, "role": ta.account.get_role_display(),
+             "conflict": index.conflicts(ta.account.pk, meetings)} for ta in tas]
+
+
 class AssignToSectionView(View):
+    @query_budget(7)
     @check_permissions(check_supervisor=False)
-    def get(self, request, requester: Account, course=0, section=0):
+    def get(self, request, requester: Requester, course=0, section=0):
         if requester.role == Account.Role.TA:
             return HttpResponseForbidden("You do not have permission to perform this action.")
         
@@ -308,13 +549,12 @@ class AssignToSectionView(View):
             "course": course,
             "section": section,
             "instructor": requester.role == Account.Role.INSTRUCTOR,
-            "users": [{"pk": user.pk, "name": user.name, "role": user.get_role_display()} \
-                        for user in course.members.filter(role=Account.Role.TA)
-                        if user.sections.count() < CourseMembership.objects.get(course=course, account=user).sections],
+            "users": get_section_candidates(course, section),
         })
 
+    @query_budget(11)
     @check_permissions(check_supervisor=False)
-    def post(self, request, requester: Account, course=0, section=0):
+    def post(self, request, requester: Requester, course=0, section=0):
         if requester.role == Account.Role.TA:
             return HttpResponseForbidden("You do not have permission to perform this action.")
         
@@ -336,14 +576,47 @@ class AssignToSectionView(View):
                 "course": course,
                 "section": section,
                 "instructor": requester.role == Account.Role.INSTRUCTOR,
-                "users": [{"pk": user.pk, "name": user.name, "role": user.get_role_display()} \
-                    for user in course.members.filter(role=Account.Role.TA)
-                    if user.sections.count() < CourseMembership.objects.get(course=course, account=user).sections],
+                "users": get_section_candidates(course, section),
             })
         else:
             return redirect(f"/courses/{course.id}/")
 
+class SectionMeetingsView(View):
+    @query_budget(4)
+    @check_permissions()
+    def get(self, request, *args, course=0, section=0):
+        try:
+            section = Section.objects.select_related("course").prefetch_related("meetings").get(pk=section, course=course)
+        except Section.DoesNotExist:
+            raise Http404("Section does not exist!")
+
+        return render(request, "section_meetings.html", {
+            "course": section.course,
+            "section": section,
+            "meetings": section.meeting_times(),
+        })
+
+    @query_budget(6)
+    @check_permissions()
+    def post(self, request, *args, course=0, section=0):
+        try:
+            section = Section.objects.select_related("course", "ta").get(pk=section, course=course)
+        except Section.DoesNotExist:
+            raise Http404("Section does not exist!")
+
+        if (errors := sections.set_meetings(section, meetings := request.POST.get("meetings", ""))):
+            return render(request, "section_meetings.html", {
+                "course": section.course,
+                "section": section,
+                "meetings": meetings,
+                "errors": errors,
+            }, status=400)
+
+        return redirect(f"/courses/{section.course.pk}/")
+
+
 class UnassignFromCourseView(View):
+    @query_budget(6)
     @check_permissions()
     def post(self, *args, course=0, account=0):
         try:
@@ -359,8 +632,9 @@ class UnassignFromCourseView(View):
         return redirect(f"/courses/{course.id}/")
 
 class UnassignFromSectionView(View):
+    @query_budget(7)
     @check_permissions(check_supervisor=False)
-    def post(self, request, requester: Account, course=0, section=0):
+    def post(self, request, requester: Requester, course=0, section=0):
         if requester.role == Account.Role.TA:
             return HttpResponseForbidden("You do not have permission to perform this action.")
         
@@ -378,8 +652,9 @@ class UnassignFromSectionView(View):
             return HttpResponseBadRequest("Section is unassigned!")
 
 class EditMembershipView(View):
+    @query_budget(5)
     @check_permissions()
-    def get(self, request, requester: Account, course=0, account=0):
+    def get(self, request, requester: Requester, course=0, account=0):
         try:
             course = Course.objects.get(id=course)
             account = Account.objects.get(id=account)
@@ -394,8 +669,9 @@ class EditMembershipView(View):
             "membership": CourseMembership.objects.get(course=course, account=account),
         })
     
+    @query_budget(7)
     @check_permissions()
-    def post(self, request, requester: Account, course=0, account=0):
+    def post(self, request, requester: Requester, course=0, account=0):
         try:
             course = Course.objects.get(id=course)
             account = Account.objects.get(id=account)